@@ -0,0 +1,212 @@
+"""Compare SubFilter on solved tables with filtering submission by submission.
+
+A synthetic history of one user is filtered with a set of typical `;gitlog`
+and `;stalk` arguments, once by the loop `SubFilter.filter_subs` used before
+solved tables and once by building a `SolvedTable` and applying the masks.
+The unit tests check that both give the same submissions.
+
+Usage:
+    python -m tests.benchmarks.subfilter --count 20000
+"""
+
+import argparse
+import random
+import time
+from types import SimpleNamespace
+
+from tle.util import codeforces_api as cf, codeforces_common as cf_common
+from tle.util.cache import ContestInfo, SolvedTable
+from tle.util.codeforces_common import SubFilter, is_nonstandard_contest
+
+
+def reference_filter_subs(sf, submissions):
+    """SubFilter.filter_subs as one loop over the submissions, as it was
+    before filtering tables."""
+    contest_by_id = cf_common.cf_cache.contest_cache.contest_by_id
+    submissions = sorted(submissions, key=lambda sub: sub.creationTimeSeconds)
+    problems = set()
+    solved = []
+    for submission in submissions:
+        problem = submission.problem
+        contest = contest_by_id.get(problem.contestId)
+        key = (problem.name, contest.startTimeSeconds if contest else 0)
+        if submission.verdict == 'OK' and key not in problems:
+            problems.add(key)
+            solved.append(submission)
+
+    filtered = []
+    for submission in solved:
+        problem = submission.problem
+        contest = contest_by_id.get(problem.contestId)
+        if sf.rated:
+            problem_ok = (
+                contest
+                and contest.id < cf.GYM_ID_THRESHOLD
+                and not is_nonstandard_contest(contest)
+                and not problem.matches_all_tags(['*special'])
+            )
+            rating_ok = problem.rating and sf.rlo <= problem.rating <= sf.rhi
+        else:
+            problem_ok = (
+                not contest
+                or contest.id >= cf.GYM_ID_THRESHOLD
+                or not (
+                    is_nonstandard_contest(contest)
+                    or problem.matches_all_tags(['*special'])
+                )
+            )
+            rating_ok = True
+        if (
+            submission.author.participantType in sf.types
+            and sf.dlo <= submission.creationTimeSeconds < sf.dhi
+            and rating_ok
+            and problem.matches_all_tags(sf.tags)
+            and not problem.matches_any_tag(sf.bantags)
+            and (sf.team or len(submission.author.members) == 1)
+            and problem_ok
+            and (not sf.contests or (contest and contest.matches(sf.contests)))
+            and (
+                not sf.indices
+                or any(index.lower() == problem.index.lower() for index in sf.indices)
+            )
+        ):
+            filtered.append(submission)
+    return filtered
+
+
+CONTEST_NAMES = [
+    'Codeforces Round #{} (Div. 2)',
+    'Codeforces Round #{} (Div. 1)',
+    'Educational Codeforces Round {}',
+    'Kotlin Heroes: Episode {}',
+    'April Fools Day Contest {}',
+    'Gym {}',
+]
+TAGS = ['dp', 'greedy', 'math', 'graphs', 'dfs and similar', '*special problem']
+FILTER_ARGS = [
+    [],
+    ['+team'],
+    ['+contest', '+virtual'],
+    ['+practice', 'r>=1600', 'r<=2400'],
+    ['d>=01012012', 'd<01012016'],
+    ['+dp', '~greedy'],
+    ['+graph'],
+    ['~s', '+team'],
+    ['i+a', 'i+D'],
+    ['c+div2', 'c+educational'],
+    ['c+round1', '+outof'],
+]
+
+
+def random_history(rng, count):
+    """Return a contest dict and `count` submissions of one user, newest
+    first."""
+    contest_by_id = {}
+    for contest_id in [*range(1, 301), *range(100_001, 100_051)]:
+        name = rng.choice(CONTEST_NAMES).format(contest_id)
+        contest_by_id[contest_id] = cf.Contest(
+            id=contest_id,
+            name=name,
+            startTimeSeconds=1_300_000_000 + contest_id * 100_000,
+            durationSeconds=7200,
+            type='CF',
+            phase='FINISHED',
+            preparedBy=None,
+        )
+    contest_ids = [*contest_by_id, 5000]
+    submissions = []
+    for i in range(count):
+        contest_id = rng.choice(contest_ids)
+        index = rng.choice('ABCDEF')
+        problem = cf.Problem(
+            contestId=contest_id,
+            problemsetName=None,
+            index=index,
+            name=f'{contest_id}{index}',
+            type='PROGRAMMING',
+            points=None,
+            rating=rng.choice([None, *range(800, 3600, 100)]),
+            tags=rng.sample(TAGS, rng.randrange(4)),
+        )
+        author = cf.Party(
+            contestId=contest_id,
+            members=[cf.Member(handle='alice')] * rng.choice([1, 1, 1, 0, 3]),
+            participantType=rng.choice(
+                ['CONTESTANT', 'OUT_OF_COMPETITION', 'VIRTUAL', 'PRACTICE', 'MANAGER']
+            ),
+            teamId=None,
+            teamName=None,
+            ghost=False,
+            room=None,
+            startTimeSeconds=None,
+        )
+        submissions.append(
+            cf.Submission(
+                id=i,
+                contestId=contest_id,
+                problem=problem,
+                author=author,
+                programmingLanguage='C++',
+                verdict=rng.choice(['OK', 'OK', 'WRONG_ANSWER', None]),
+                # Several submissions per second, to cover ties.
+                creationTimeSeconds=1_300_000_000 + i * 20_000 + rng.randrange(2),
+                relativeTimeSeconds=0,
+            )
+        )
+    return contest_by_id, submissions[::-1]
+
+
+def use_contests(contest_by_id):
+    """Make `contest_by_id` the contents of the contest cache."""
+    info_by_id = {id: ContestInfo.of(contest) for id, contest in contest_by_id.items()}
+    contest_cache = SimpleNamespace(
+        contest_by_id=contest_by_id,
+        info_by_id=info_by_id,
+        get_info=info_by_id.__getitem__,
+    )
+    cf_common.cf_cache = SimpleNamespace(contest_cache=contest_cache)
+    return contest_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Time SubFilter on solved tables against the per-submission loop.'
+    )
+    parser.add_argument(
+        '--count', type=int, default=20_000, help='number of submissions'
+    )
+    parser.add_argument('--seed', type=int, default=1, help='random seed')
+    args = parser.parse_args()
+
+    contest_by_id, submissions = random_history(random.Random(args.seed), args.count)
+    contest_cache = use_contests(contest_by_id)
+    filters = []
+    for filter_args in FILTER_ARGS:
+        sf = SubFilter()
+        sf.parse(filter_args)
+        filters.append(sf)
+
+    start = time.perf_counter()
+    expected = [reference_filter_subs(sf, submissions) for sf in filters]
+    reference_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    table = SolvedTable(contest_cache)
+    table.add(submissions)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = [sf.filter_table(table) for sf in filters]
+    filter_time = time.perf_counter() - start
+
+    if results != expected:
+        raise SystemExit('Solved tables and the reference filter disagree')
+    print(
+        f'{len(filters)} filters over {args.count} submissions: '
+        f'per submission {reference_time:.3f}s, '
+        f'table build {build_time:.3f}s, masks {filter_time:.4f}s'
+    )
+
+
+if __name__ == '__main__':
+    main()
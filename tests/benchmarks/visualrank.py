@@ -0,0 +1,64 @@
+"""Compare drawing the points of a large visualrank plot as an image with an
+Agg scatter.
+
+Random rating changes of one contest are plotted once with
+`gc.scatter_image`, as `_plot_visualrank` does above
+`_VISUALRANK_IMAGE_ABOVE` points, and once as a scatter.
+
+Usage:
+    python -m tests.benchmarks.visualrank --count 40000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from tle.cogs import graphs
+from tle.util import graph_common as gc
+
+
+def visualrank_args(count):
+    """Return the arguments of `_plot_visualrank` for `count` random
+    contestants."""
+    rng = np.random.default_rng(0)
+    ranks = np.arange(1, count + 1, dtype=np.int32)
+    old_ratings = rng.integers(800, 3200, count).astype(np.int32)
+    deltas = rng.integers(-150, 150, count).astype(np.int32)
+    colors = gc.rating_colors(old_ratings)
+    return ('Round', ranks, deltas, colors, {}, (-50, count + 50), (-250, 250))
+
+
+def best_time(func, *args, rounds=3):
+    func(*args)
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Time visualrank plots drawn as an image against a scatter.'
+    )
+    parser.add_argument(
+        '--count', type=int, default=40_000, help='number of contestants'
+    )
+    args = parser.parse_args()
+
+    gc.setup_style()
+    plot_args = visualrank_args(args.count)
+    graphs._VISUALRANK_IMAGE_ABOVE = 0
+    image_time = best_time(graphs._plot_visualrank, *plot_args)
+    graphs._VISUALRANK_IMAGE_ABOVE = args.count
+    scatter_time = best_time(graphs._plot_visualrank, *plot_args)
+    print(
+        f'Visualrank of {args.count} points: '
+        f'scatter {scatter_time * 1000:.0f}ms, image {image_time * 1000:.0f}ms'
+    )
+
+
+if __name__ == '__main__':
+    main()
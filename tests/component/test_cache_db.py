@@ -1,6 +1,7 @@
 """Component tests for tle.util.db.cache_db_conn — async in-memory aiosqlite."""
 
-from tle.util.codeforces_api import Problem, RatingChange
+from tle.util.codeforces_api import Problem, ProblemResult, RanklistRow, RatingChange
+from tle.util.db.cache_db_conn import RanklistEncoder
 
 
 class TestTableCreation:
@@ -10,7 +11,15 @@ class TestTableCreation:
         )
         rows = await cursor.fetchall()
         table_names = {row[0] for row in rows}
-        expected = {'contest', 'problem', 'rating_change', 'problem2'}
+        expected = {
+            'contest',
+            'problem',
+            'rating_change',
+            'problem2',
+            'tag',
+            'ranklist',
+            'predicted_rating_change',
+        }
         assert expected.issubset(table_names)
 
 
@@ -70,6 +79,24 @@ class TestProblemCache:
         fetched = await cache_db.fetch_problems()
         assert fetched[0].tags == ['dp', 'math', 'greedy']
 
+    async def test_tags_replaced(self, cache_db):
+        await cache_db.cache_problems([self._make_problem(tags=['dp', 'math'])])
+        await cache_db.cache_problems([self._make_problem(tags=['greedy'])])
+        fetched = await cache_db.fetch_problems()
+        assert fetched[0].tags == ['greedy']
+
+    async def test_tags_shared(self, cache_db):
+        problems = [
+            self._make_problem(name='A', tags=['dp']),
+            self._make_problem(name='B', tags=['math', 'dp']),
+        ]
+        await cache_db.cache_problems(problems)
+        a, b = sorted(await cache_db.fetch_problems(), key=lambda p: p.name)
+        assert b.tags == ['math', 'dp']
+        assert a.tags[0] is b.tags[1]
+        cursor = await cache_db.conn.execute('SELECT COUNT(*) FROM tag')
+        assert await cursor.fetchone() == (2,)
+
     async def test_empty_tags(self, cache_db):
         prob = self._make_problem(tags=[])
         await cache_db.cache_problems([prob])
@@ -101,6 +128,15 @@ class TestRatingChanges:
         assert len(fetched) == 1
         assert fetched[0].handle == 'tourist'
 
+    async def test_contest_ids_with_rating_changes(self, cache_db):
+        changes = [
+            self._make_change(contestId=2, handle='alice'),
+            self._make_change(contestId=1, handle='alice'),
+            self._make_change(contestId=2, handle='bob'),
+        ]
+        await cache_db.save_rating_changes(changes)
+        assert await cache_db.get_contest_ids_with_rating_changes() == [1, 2]
+
     async def test_has_saved(self, cache_db):
         change = self._make_change()
         await cache_db.save_rating_changes([change])
@@ -127,9 +163,24 @@ class TestRatingChanges:
             self._make_change(contestId=2, handle='bob'),
         ]
         await cache_db.save_rating_changes(changes)
-        all_changes = list(await cache_db.get_all_rating_changes())
+        all_changes = [change async for change in cache_db.iter_all_rating_changes()]
         assert len(all_changes) == 2
 
+    async def test_iter_all_in_batches(self, cache_db, monkeypatch):
+        from tle.util.db import cache_db_conn
+
+        monkeypatch.setattr(cache_db_conn, '_BATCH_SIZE', 2)
+        changes = [
+            self._make_change(handle=f'user{i}', ratingUpdateTimeSeconds=i)
+            for i in range(5)
+        ]
+        await cache_db.save_rating_changes(changes)
+        streamed = [change async for change in cache_db.iter_all_rating_changes()]
+        assert [change.handle for change in streamed] == [f'user{i}' for i in range(5)]
+        assert await cache_db.get_latest_rating_by_handle() == {
+            f'user{i}': 3050 for i in range(5)
+        }
+
     async def test_clear_all(self, cache_db):
         change = self._make_change()
         await cache_db.save_rating_changes([change])
@@ -147,6 +198,89 @@ class TestRatingChanges:
         assert await cache_db.has_rating_changes_saved(2) is True
 
 
+class TestRanklist:
+    async def test_save_and_fetch(
+        self, cache_db, make_contest, make_problem, make_party
+    ):
+        contest = make_contest(id=5, phase='SYSTEM_TEST')
+        problems = [make_problem(contestId=5, tags=['dp'])]
+        row = RanklistRow(
+            party=make_party(contestId=5, room=3),
+            rank=1,
+            points=500.0,
+            penalty=10,
+            problemResults=[ProblemResult(500.0, None, 1, 'PRELIMINARY', 600)],
+        )
+        await cache_db.save_ranklist(contest, problems, [row], 123.5, True, -4)
+        (saved,) = await cache_db.fetch_ranklists()
+        assert saved.contest == contest
+        assert saved.problems == problems
+        assert saved.standings == [row]
+        assert saved.fetch_time == 123.5
+        assert saved.is_rated is True
+        assert saved.correction == -4
+
+    async def test_save_replaces(self, cache_db, make_contest):
+        await cache_db.save_ranklist(make_contest(id=5), [], [], 1, False)
+        await cache_db.save_ranklist(make_contest(id=5), [], [], 2, False)
+        (saved,) = await cache_db.fetch_ranklists()
+        assert saved.fetch_time == 2
+        assert saved.correction is None
+
+    async def test_encoder_reuses_rows(self, cache_db, make_contest, make_party):
+        rows = [
+            RanklistRow(make_party(contestId=5), rank, 100.0 / rank, 0, [])
+            for rank in (1, 2)
+        ]
+        encoder = RanklistEncoder()
+        await cache_db.save_ranklist(
+            make_contest(id=5), [], rows, 1, False, encoder=encoder
+        )
+        first = encoder._encoded[id(rows[0])][1]
+        rows[1] = rows[1]._replace(penalty=5)
+        await cache_db.save_ranklist(
+            make_contest(id=5), [], rows, 2, False, encoder=encoder
+        )
+        assert encoder._encoded[id(rows[0])][1] is first
+        (saved,) = await cache_db.fetch_ranklists()
+        assert saved.standings == rows
+
+    async def test_clear(self, cache_db, make_contest):
+        await cache_db.save_ranklist(make_contest(id=5), [], [], 1, False)
+        await cache_db.clear_ranklist(5)
+        assert await cache_db.fetch_ranklists() == []
+
+
+class TestPredictedRatingChanges:
+    async def test_save_replaces_contest(self, cache_db):
+        await cache_db.save_predicted_rating_changes(1, [('alice', 1500, 10)], 1)
+        await cache_db.save_predicted_rating_changes(2, [('alice', 1510, 5)], 1)
+        await cache_db.save_predicted_rating_changes(1, [('bob', 1600, -3)], 2)
+        assert await cache_db.get_predicted_rating_changes(1) == [('bob', 1600, -3)]
+        assert await cache_db.get_predicted_rating_changes(2) == [('alice', 1510, 5)]
+
+    async def test_prediction_errors(self, cache_db, make_rating_change):
+        await cache_db.save_predicted_rating_changes(
+            1, [('alice', 1500, 10), ('bob', 1500, 20), ('carol', 1500, 30)], 1
+        )
+        await cache_db.save_rating_changes(
+            [
+                make_rating_change(
+                    contestId=1, handle='alice', oldRating=1500, newRating=1512
+                ),
+                make_rating_change(
+                    contestId=1, handle='carol', oldRating=0, newRating=1400
+                ),
+            ]
+        )
+        assert await cache_db.get_prediction_errors(1) == [('alice', 10, 12)]
+
+    async def test_clear(self, cache_db):
+        await cache_db.save_predicted_rating_changes(1, [('alice', 1500, 10)], 1)
+        await cache_db.clear_predicted_rating_changes(1)
+        assert await cache_db.get_predicted_rating_changes(1) == []
+
+
 class TestProblemset:
     def _make_problem(self, **kwargs):
         defaults = dict(
@@ -196,6 +330,41 @@ class TestProblemset:
         assert len(fetched) == 1
         assert fetched[0].contestId == 2
 
+    async def test_tags_by_contest(self, cache_db):
+        await cache_db.cache_problemset(
+            [
+                self._make_problem(contestId=1, index='A', tags=['dp']),
+                self._make_problem(contestId=2, index='A', tags=['math']),
+            ]
+        )
+        assert (await cache_db.fetch_problemset(2))[0].tags == ['math']
+        await cache_db.clear_problemset(contest_id=1)
+        assert [p.tags for p in await cache_db.fetch_problems2()] == [['math']]
+
+    async def test_iter_in_batches(self, cache_db, monkeypatch):
+        from tle.util.db import cache_db_conn
+
+        monkeypatch.setattr(cache_db_conn, '_BATCH_SIZE', 2)
+        await cache_db.cache_problemset(
+            [
+                self._make_problem(contestId=1, index=index, tags=['dp'])
+                for index in 'ABCDE'
+            ]
+        )
+        streamed = [problem async for problem in cache_db.iter_problems2()]
+        assert sorted(problem.index for problem in streamed) == list('ABCDE')
+        assert len({id(problem.tags) for problem in streamed}) == 1
+
+    async def test_same_tags_share_list(self, cache_db):
+        await cache_db.cache_problemset(
+            [
+                self._make_problem(contestId=1, index='A', tags=['dp', 'math']),
+                self._make_problem(contestId=1, index='B', tags=['dp', 'math']),
+            ]
+        )
+        a, b = await cache_db.fetch_problemset(1)
+        assert a.tags is b.tags
+
     async def test_empty_check(self, cache_db):
         assert await cache_db.problemset_empty() is True
         prob = self._make_problem()
@@ -213,7 +382,7 @@ class TestProblemset:
 
 
 class TestUsersWithContests:
-    async def test_get_users_with_n_plus_contests(self, cache_db):
+    async def test_get_rating_activity(self, cache_db):
         changes = [
             RatingChange(
                 contestId=1,
@@ -244,6 +413,103 @@ class TestUsersWithContests:
             ),
         ]
         await cache_db.save_rating_changes(changes)
-        users = await cache_db.get_users_with_more_than_n_contests(0, 2)
-        assert 'alice' in users
-        assert 'bob' not in users
+        assert sorted(await cache_db.get_rating_activity()) == [
+            (1400, 1000, 1),
+            (1700, 2000, 2),
+        ]
+
+
+class TestLatestRating:
+    def _make_change(self, contest_id, handle, time, new_rating):
+        return RatingChange(
+            contest_id, f'Round #{contest_id}', handle, 1, time, 1500, new_rating
+        )
+
+    async def _fetch(self, cache_db):
+        cursor = await cache_db.conn.execute(
+            'SELECT handle, rating, time, contest_count FROM latest_rating'
+            ' ORDER BY handle'
+        )
+        return await cursor.fetchall()
+
+    async def test_kept_current_on_save(self, cache_db):
+        await cache_db.save_rating_changes(
+            [
+                self._make_change(2, 'alice', 2000, 1700),
+                self._make_change(1, 'alice', 1000, 1600),
+                self._make_change(1, 'bob', 1000, 1400),
+            ]
+        )
+        assert await self._fetch(cache_db) == [
+            ('alice', 1700, 2000, 2),
+            ('bob', 1400, 1000, 1),
+        ]
+        await cache_db.save_rating_changes([self._make_change(2, 'alice', 2000, 1800)])
+        assert (await self._fetch(cache_db))[0] == ('alice', 1800, 2000, 2)
+
+    async def test_kept_current_on_clear(self, cache_db):
+        await cache_db.save_rating_changes(
+            [
+                self._make_change(1, 'alice', 1000, 1600),
+                self._make_change(2, 'alice', 2000, 1700),
+                self._make_change(2, 'bob', 2000, 1400),
+            ]
+        )
+        await cache_db.clear_rating_changes(contest_id=2)
+        assert await self._fetch(cache_db) == [('alice', 1600, 1000, 1)]
+        await cache_db.clear_rating_changes()
+        assert await self._fetch(cache_db) == []
+
+    async def test_get_latest_ratings(self, cache_db, monkeypatch):
+        from tle.util.db import cache_db_conn
+
+        monkeypatch.setattr(cache_db_conn, '_MAX_PARAMS', 2)
+        await cache_db.save_rating_changes(
+            [self._make_change(1, f'user{i}', 1000, 1500 + i) for i in range(5)]
+        )
+        ratings = await cache_db.get_latest_ratings(['user0', 'user3', 'user4', 'x'])
+        assert ratings == {'user0': 1500, 'user3': 1503, 'user4': 1504}
+
+    async def test_filled_for_older_databases(self, cache_db):
+        await cache_db.save_rating_changes(
+            [
+                self._make_change(1, 'alice', 1000, 1600),
+                self._make_change(2, 'alice', 2000, 1700),
+            ]
+        )
+        await cache_db.conn.execute('DELETE FROM latest_rating')
+        await cache_db.create_tables()
+        assert await self._fetch(cache_db) == [('alice', 1700, 2000, 2)]
+
+
+class TestTagMigration:
+    async def test_migrates_json_tags(self):
+        import aiosqlite
+
+        from tle.util.db.cache_db_conn import CacheDbConn
+
+        db = CacheDbConn(':memory:')
+        db._conn = await aiosqlite.connect(':memory:')
+        try:
+            await db.conn.execute(
+                'CREATE TABLE problem (contest_id INTEGER, problemset_name TEXT,'
+                ' [index] TEXT, name TEXT NOT NULL, type TEXT, points REAL,'
+                ' rating INTEGER, tags TEXT, PRIMARY KEY (name))'
+            )
+            await db.conn.execute(
+                'INSERT INTO problem VALUES'
+                " (1, NULL, 'A', 'P', 'PROGRAMMING', NULL, 800, ?)",
+                ('["math", "dp"]',),
+            )
+            await db.create_tables()
+            (problem,) = await db.fetch_problems()
+            assert problem.tags == ['math', 'dp']
+            cursor = await db.conn.execute('SELECT tags FROM problem')
+            assert await cursor.fetchall() == [(None,)]
+
+            await db.cache_problems([problem._replace(rating=900)])
+            (problem,) = await db.fetch_problems()
+            assert problem.rating == 900
+            assert problem.tags == ['math', 'dp']
+        finally:
+            await db.close()
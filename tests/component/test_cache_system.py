@@ -1,5 +1,5 @@
 """Component tests for cache sub-systems — ContestCache, ProblemCache,
-RatingChangesCache, ProblemsetCache.
+RatingChangesCache, RanklistCache, ProblemsetCache, SolvedCache.
 
 Tests data management methods directly, NOT the periodic task infrastructure.
 
@@ -9,12 +9,26 @@ this at test collection time we import cache classes lazily inside fixtures.
 """
 
 import asyncio
-from unittest.mock import patch
+import logging
+from unittest.mock import AsyncMock, patch
 
 import pytest
 
-from tle.util.codeforces_api import Contest, Problem, RatingChange
-from tle.util.events import ContestListRefresh, EventSystem, Listener
+from tle.util.codeforces_api import (
+    Contest,
+    Member,
+    Party,
+    Problem,
+    RanklistRow,
+    RatingChange,
+    Submission,
+)
+from tle.util.events import (
+    ContestListRefresh,
+    EventSystem,
+    Listener,
+    RatingChangesUpdate,
+)
 
 
 def _make_contest(id=1, name='Round #1', start=1_000_000, dur=7200, phase='FINISHED'):
@@ -175,6 +189,54 @@ class TestContestCache:
             await cache_system.contest_cache._try_disk()
         assert 10 in cache_system.contest_cache.contest_by_id
 
+    async def test_update_derives_info(self, cache_system):
+        cache = cache_system.contest_cache
+        cache.writers_by_id = {2: frozenset({'alice'})}
+        contests = [
+            _make_contest(
+                id=1, name='Educational Codeforces Round 1 (Rated for Div. 2)'
+            ),
+            _make_contest(id=2, name='Codeforces Round #2 (Div. 1 + Div. 2)'),
+            _make_contest(id=3, name='Kotlin Heroes: Episode 3'),
+        ]
+        with patch('tle.util.codeforces_common.event_sys', EventSystem()):
+            await cache._update(contests, from_api=False)
+
+        educational = cache.get_info(1)
+        assert educational.educational
+        assert educational.divisions == (2,)
+        assert not educational.nonstandard
+        assert educational.matches(['EDU']) and not educational.matches(['div1'])
+        combined = cache.get_info(2)
+        assert combined.divisions == (1, 2)
+        assert combined.normalized_name == 'codeforcesround2div1div2'
+        assert combined.writers == {'alice'}
+        assert cache.get_info(3).nonstandard
+        assert cache.get_info(3).writers == frozenset()
+
+    async def test_get_info_of_uncached(self, cache_system):
+        cache = cache_system.contest_cache
+        cache.writers_by_id = {7: frozenset({'alice'})}
+        contest = _make_contest(id=7, name='Educational Codeforces Round 7')
+        info = cache.get_info_of(contest)
+        assert info.educational
+        assert info.writers == {'alice'}
+        assert 7 not in cache.info_by_id
+
+    async def test_load_writers(self, cache_system, tmp_path):
+        from tle.util.cache.contest import ContestNotFound
+
+        path = tmp_path / 'writers.json'
+        path.write_text('[{"id": 5, "writers": ["Alice", "bob"]}]')
+        cache = cache_system.contest_cache
+        with patch('tle.constants.CONTEST_WRITERS_JSON_FILE_PATH', path):
+            cache._load_writers()
+        assert cache.get_writers(5) == {'alice', 'bob'}
+        assert cache.get_writers(6) == frozenset()
+        assert cache.get_writers(None) == frozenset()
+        with pytest.raises(ContestNotFound):
+            cache.get_info(5)
+
 
 # --- ProblemCache ---
 
@@ -227,16 +289,6 @@ class TestRatingChangesCache:
         )
         assert result == 1500
 
-    async def test_get_all_ratings(self, cache_system):
-        changes = [
-            _make_rating_change(contestId=1, handle='alice', new=1700),
-            _make_rating_change(contestId=2, handle='bob', new=1800),
-        ]
-        await cache_system.conn.save_rating_changes(changes)
-        await cache_system.rating_changes_cache._refresh_handle_cache()
-        ratings = cache_system.rating_changes_cache.get_all_ratings()
-        assert sorted(ratings) == [1700, 1800]
-
     async def test_refresh_handle_cache_from_db(self, cache_system):
         changes = [_make_rating_change(handle='charlie', new=2000)]
         await cache_system.conn.save_rating_changes(changes)
@@ -249,6 +301,294 @@ class TestRatingChangesCache:
         await cache_system.rating_changes_cache._save_changes([(contest, [change])])
         assert cache_system.rating_changes_cache.get_current_rating('dave') == 1900
 
+    async def test_save_changes_patches_saved_handles(self, cache_system):
+        cache = cache_system.rating_changes_cache
+        cache.handle_rating_cache = {'erin': 1400, 'dave': 1500}
+        contest = _make_contest(id=1)
+        change = _make_rating_change(contestId=1, handle='dave', new=1900)
+        await cache._save_changes([(contest, [change])])
+        assert cache.handle_rating_cache == {'erin': 1400, 'dave': 1900}
+
+
+class TestRatingDistribution:
+    @pytest.fixture
+    async def cache(self, cache_system):
+        changes = [
+            _make_rating_change(contestId=1, handle='alice', new=1700),
+            _make_rating_change(contestId=1, handle='bob', new=1250),
+            _make_rating_change(contestId=1, handle='carol', new=-50),
+            _make_rating_change(contestId=2, handle='alice', new=1750)._replace(
+                ratingUpdateTimeSeconds=2_000_000
+            ),
+        ]
+        await cache_system.conn.save_rating_changes(changes)
+        cache = cache_system.rating_changes_cache
+        await cache._refresh_handle_cache()
+        return cache
+
+    async def test_all_users(self, cache):
+        distribution = await cache.get_rating_distribution()
+        assert distribution.ratings.tolist() == [-50, 1250, 1750]
+        # Negative ratings are left out of the histogram.
+        assert distribution.histogram.tolist() == [0] * 12 + [1] + [0] * 4 + [1]
+        assert distribution.percentile(1250) == pytest.approx(100 / 3)
+        assert distribution.percentile(2000) == 100
+
+    async def test_filters(self, cache):
+        distribution = await cache.get_rating_distribution(min_contests=2)
+        assert distribution.ratings.tolist() == [1750]
+        distribution = await cache.get_rating_distribution(time_cutoff=1_500_000)
+        assert distribution.ratings.tolist() == [1750]
+        assert not await cache.get_rating_distribution(time_cutoff=3_000_000)
+
+    async def test_activity_cutoff(self, cache):
+        assert await cache.get_activity_cutoff(0) == 1_000_000
+        assert await cache.get_activity_cutoff(1_500_000) == 2_000_000
+        assert await cache.get_activity_cutoff(2_000_000) == 2_000_000
+        assert await cache.get_activity_cutoff(3_000_000) == 2_000_001
+        # Cutoffs selecting the same users share a distribution.
+        distribution = await cache.get_rating_distribution(time_cutoff=1_500_000)
+        assert await cache.get_rating_distribution(time_cutoff=1_900_000) is (
+            distribution
+        )
+
+    async def test_rebuilt_after_new_changes(self, cache):
+        distribution = await cache.get_rating_distribution()
+        assert await cache.get_rating_distribution() is distribution
+        contest = _make_contest(id=3)
+        change = _make_rating_change(contestId=3, handle='dave', new=1900)
+        await cache._save_changes([(contest, [change])])
+        assert len(await cache.get_rating_distribution()) == 4
+
+
+class TestContestRatingChanges:
+    @pytest.fixture
+    async def cache(self, cache_system):
+        changes = [
+            _make_rating_change(contestId=1, handle='alice', new=1700),
+            _make_rating_change(contestId=1, handle='bob', old=1300, new=1250),
+            _make_rating_change(contestId=2, handle='alice', new=1750),
+        ]
+        await cache_system.conn.save_rating_changes(changes)
+        return cache_system.rating_changes_cache
+
+    async def test_columns(self, cache):
+        changes = await cache.get_contest_rating_changes(1)
+        assert sorted(changes.handles.tolist()) == ['alice', 'bob']
+        deltas = dict(
+            zip(changes.handles.tolist(), changes.deltas.tolist(), strict=True)
+        )
+        assert deltas == {'alice': 200, 'bob': -50}
+        assert not await cache.get_contest_rating_changes(3)
+
+    async def test_kept_until_saved(self, cache):
+        changes = await cache.get_contest_rating_changes(1)
+        assert await cache.get_contest_rating_changes(1) is changes
+        change = _make_rating_change(contestId=1, handle='carol', new=1900)
+        await cache._save_changes([(_make_contest(id=1), [change])])
+        assert len(await cache.get_contest_rating_changes(1)) == 3
+
+    async def test_bounded(self, cache):
+        cache._MAX_CONTEST_COLUMNS = 2
+        for contest_id in range(1, 5):
+            await cache.get_contest_rating_changes(contest_id)
+        assert list(cache._contest_columns) == [3, 4]
+
+    def test_from_changes(self):
+        from tle.util.cache import ContestRatingChanges
+
+        changes = ContestRatingChanges.from_changes(
+            [_make_rating_change(handle='alice', old=1500, new=1450)]
+        )
+        assert changes.handles.tolist() == ['alice']
+        assert changes.deltas.tolist() == [-50]
+        assert not changes.select(changes.handles == 'bob')
+
+
+def _make_row(handle, rank, points):
+    party = Party(1, [Member(handle)], 'CONTESTANT', None, None, False, None, None)
+    return RanklistRow(party, rank, points, 0, [])
+
+
+class TestRatingChangesDetection:
+    @pytest.fixture
+    def cache(self, cache_system):
+        from tle.util.ranklist import Ranklist
+
+        contest = _make_contest(id=7)
+        standings = [
+            _make_row(handle, rank, 100 - rank)
+            for rank, handle in enumerate(['a', 'b', 'c', 'd', 'e'], 1)
+        ]
+        ranklist = Ranklist(contest, [], standings, 0, is_rated=True)
+        ranklist.set_deltas({'a': 1, 'b': 1, 'c': 1, 'd': 1})
+        cache_system.ranklist_cache.ranklist_by_contest[7] = ranklist
+        return cache_system.rating_changes_cache
+
+    def test_probe_handles(self, cache):
+        assert cache._get_probe_handles(_make_contest(id=7)) == ['b', 'c']
+        assert cache._get_probe_handles(_make_contest(id=8)) == []
+
+    async def test_fetch_once_published(self, cache):
+        contest = _make_contest(id=7)
+        rating = AsyncMock(return_value=[_make_rating_change(contestId=6)])
+        with patch('tle.util.codeforces_api.user.rating', rating):
+            assert not await cache._should_fetch(contest, 1000)
+            rating.return_value.append(_make_rating_change(contestId=7))
+            assert await cache._should_fetch(contest, 1100)
+
+    async def test_one_probe_per_check(self, cache):
+        contest = _make_contest(id=7)
+        rating = AsyncMock(return_value=[])
+        with patch('tle.util.codeforces_api.user.rating', rating):
+            for _ in range(3):
+                await cache._should_fetch(contest, 1000)
+        probed = [call.kwargs['handle'] for call in rating.call_args_list]
+        assert probed == ['b', 'c', 'b']
+
+    async def test_fetch_without_probes(self, cache):
+        assert await cache._should_fetch(_make_contest(id=8), 1000)
+
+    async def test_fetch_when_probe_fails(self, cache):
+        from tle.util.codeforces_api import HandleNotFoundError
+
+        rating = AsyncMock(side_effect=HandleNotFoundError('gone', 'b'))
+        with patch('tle.util.codeforces_api.user.rating', rating):
+            assert await cache._should_fetch(_make_contest(id=7), 1000)
+
+    async def test_periodic_full_fetch(self, cache):
+        contest = _make_contest(id=7)
+        rating = AsyncMock(return_value=[])
+        with patch('tle.util.codeforces_api.user.rating', rating):
+            assert not await cache._should_fetch(contest, 1000)
+            assert await cache._should_fetch(contest, 1000 + cache._FULL_FETCH_DELAY)
+
+
+# --- RanklistCache ---
+
+
+class TestRanklistCache:
+    @pytest.fixture
+    def ranklist(self):
+        from tle.util.ranklist import Ranklist
+
+        standings = [_make_row('alice', 1, 300), _make_row('bob', 2, 200)]
+        ranklist = Ranklist(
+            _make_contest(id=7, phase='SYSTEM_TEST'), [], standings, 100, is_rated=True
+        )
+        ranklist.predict({'alice': 1500, 'bob': 1600})
+        return ranklist
+
+    async def test_save_and_load(self, cache_system, ranklist):
+        cache = cache_system.ranklist_cache
+        await cache._save_ranklist(ranklist)
+
+        from tle.util.cache.ranklist import RanklistCache
+
+        restarted = RanklistCache(cache_system)
+        await restarted._load_saved_ranklists()
+        loaded = restarted.ranklist_by_contest[7]
+        assert loaded.standings == ranklist.standings
+        assert loaded.fetch_time == 100
+        assert loaded.delta_by_handle == ranklist.delta_by_handle
+        assert loaded.predicted_rating == ranklist.predicted_rating
+        assert loaded.predict_delta_at_rank('bob', 1) == (
+            ranklist.predict_delta_at_rank('bob', 1)
+        )
+
+    async def test_saves_deltas_only_when_recalculated(self, cache_system, ranklist):
+        cache = cache_system.ranklist_cache
+        await cache._save_ranklist(ranklist)
+        await cache_system.conn.clear_predicted_rating_changes(7)
+        await cache._save_ranklist(ranklist)
+        assert await cache_system.conn.get_predicted_rating_changes(7) == []
+
+    async def test_saves_standings_only_when_changed(self, cache_system, ranklist):
+        cache = cache_system.ranklist_cache
+        await cache._save_ranklist(ranklist)
+        with patch.object(
+            cache_system.conn, 'save_ranklist', wraps=cache_system.conn.save_ranklist
+        ) as save_ranklist:
+            await cache._save_ranklist(ranklist)
+            assert not save_ranklist.called
+            ranklist.update_standings(
+                ranklist.contest, [], [_make_row('alice', 1, 400)], 200
+            )
+            await cache._save_ranklist(ranklist)
+            assert save_ranklist.call_count == 1
+
+    async def test_monitor_throttles_saves(self, cache_system, ranklist, monkeypatch):
+        cache = cache_system.ranklist_cache
+        contest = ranklist.contest
+        cache.monitored_contests = [contest]
+
+        async def fetch(contests):
+            ranklist.update_standings(
+                contest, [], [_make_row('alice', 1, ranklist.fetch_time)], 1
+            )
+            ranklist.fetch_time += 1
+            return {contest.id: ranklist}
+
+        monkeypatch.setattr(cache, '_fetch', fetch)
+        with patch.object(
+            cache_system.conn, 'save_ranklist', wraps=cache_system.conn.save_ranklist
+        ) as save_ranklist:
+            await cache._monitor_task.func(cache, None)
+            await cache._monitor_task.func(cache, None)
+            assert save_ranklist.call_count == 1
+            cache._saved_standings[contest.id] = (0, 0)
+            await cache._monitor_task.func(cache, None)
+            assert save_ranklist.call_count == 2
+
+    async def test_monitor_skips_ranklists_dropped_during_fetch(
+        self, cache_system, ranklist, monkeypatch
+    ):
+        cache = cache_system.ranklist_cache
+        contest = ranklist.contest
+        cache.monitored_contests = [contest]
+        cache.ranklist_by_contest[contest.id] = ranklist
+
+        async def fetch(contests):
+            # The final rating changes arrive meanwhile.
+            await cache._drop_ranklist(contest.id)
+            return {contest.id: ranklist}
+
+        monkeypatch.setattr(cache, '_fetch', fetch)
+        await cache._monitor_task.func(cache, None)
+        assert cache.ranklist_by_contest == {}
+        assert await cache_system.conn.fetch_ranklists() == []
+
+    async def test_load_skips_contests_with_rating_changes(
+        self, cache_system, ranklist
+    ):
+        await cache_system.ranklist_cache._save_ranklist(ranklist)
+        await cache_system.conn.save_rating_changes([_make_rating_change(contestId=7)])
+        await cache_system.ranklist_cache._load_saved_ranklists()
+        assert cache_system.ranklist_cache.ranklist_by_contest == {}
+        assert await cache_system.conn.fetch_ranklists() == []
+        assert await cache_system.conn.get_predicted_rating_changes(7) == []
+
+    async def test_expire_logs_and_clears_predictions(
+        self, cache_system, ranklist, caplog
+    ):
+        cache = cache_system.ranklist_cache
+        cache.ranklist_by_contest[7] = ranklist
+        await cache._save_ranklist(ranklist)
+        change = _make_rating_change(contestId=7, handle='alice')
+        await cache_system.conn.save_rating_changes([change])
+
+        assert await cache_system.conn.get_predicted_rating_changes(7)
+
+        event = RatingChangesUpdate(contest=ranklist.contest, rating_changes=[change])
+        with caplog.at_level(logging.INFO):
+            await cache._expire_task.func(cache, event)
+        assert cache.ranklist_by_contest == {}
+        assert await cache_system.conn.fetch_ranklists() == []
+        assert await cache_system.conn.get_predicted_rating_changes(7) == []
+        error = abs(ranklist.delta_by_handle['alice'] - 100)
+        assert '1 compared' in caplog.text
+        assert f'max abs error {error}' in caplog.text
+
 
 # --- ProblemsetCache ---
 
@@ -266,3 +606,110 @@ class TestProblemsetCache:
         result = await cache_system.problemset_cache.get_problemset(1)
         assert len(result) == 1
         assert result[0].name == 'P1'
+
+
+# --- SolvedCache ---
+
+
+def _make_submission(id, problem, verdict='OK', time=None):
+    author = Party(
+        contestId=problem.contestId,
+        members=[Member(handle='alice')],
+        participantType='PRACTICE',
+        teamId=None,
+        teamName=None,
+        ghost=False,
+        room=None,
+        startTimeSeconds=None,
+    )
+    return Submission(
+        id=id,
+        contestId=problem.contestId,
+        problem=problem,
+        author=author,
+        programmingLanguage='C++',
+        verdict=verdict,
+        creationTimeSeconds=time if time is not None else id,
+        relativeTimeSeconds=0,
+    )
+
+
+class TestSolvedCache:
+    @pytest.fixture
+    def cache(self, cache_system):
+        cache_system.contest_cache.contest_by_id = {1: _make_contest(id=1)}
+        cache = cache_system.solved_cache
+        cache._UPDATE_COUNT = 2
+        return cache
+
+    @staticmethod
+    def _mock_status(history):
+        """Mock cf.user.status over `history`, given oldest first."""
+
+        async def status(*, handle, count=None):
+            newest = history[::-1]
+            return newest[:count] if count is not None else newest
+
+        return patch('tle.util.codeforces_api.user.status', AsyncMock(wraps=status))
+
+    async def test_dedups_first_accepted(self, cache):
+        a = _make_problem(index='A', name='A')
+        history = [
+            _make_submission(1, a, verdict='WRONG_ANSWER'),
+            _make_submission(2, a),
+            _make_submission(3, a),
+        ]
+        with self._mock_status(history):
+            table = await cache.get('alice')
+        assert [sub.id for sub in table.submissions] == [2]
+        assert table.time.tolist() == [2]
+        assert table.contest_id.tolist() == [1]
+
+    async def test_incremental_update(self, cache):
+        a = _make_problem(index='A', name='A')
+        b = _make_problem(index='B', name='B')
+        history = [_make_submission(1, a), _make_submission(2, b, verdict=None)]
+        with self._mock_status(history) as status:
+            table = await cache.get('Alice')
+            assert [sub.id for sub in table.submissions] == [1]
+
+            history[1] = history[1]._replace(verdict='OK')
+            history.append(_make_submission(3, a))
+            assert await cache.get('alice') is table
+        assert status.call_args.kwargs == {'handle': 'alice', 'count': 2}
+        assert [sub.id for sub in table.submissions] == [1, 2]
+
+    async def test_drops_rejudged(self, cache):
+        a = _make_problem(index='A', name='A')
+        history = [_make_submission(1, a), _make_submission(2, a)]
+        with self._mock_status(history):
+            table = await cache.get('alice')
+            assert [sub.id for sub in table.submissions] == [1]
+
+            history[0] = history[0]._replace(verdict='WRONG_ANSWER')
+            assert await cache.get('alice') is table
+        assert [sub.id for sub in table.submissions] == [2]
+        assert table.time.tolist() == [2]
+
+    async def test_refetch_without_overlap(self, cache):
+        a = _make_problem(index='A', name='A')
+        b = _make_problem(index='B', name='B')
+        history = [_make_submission(1, a)]
+        with self._mock_status(history) as status:
+            table = await cache.get('alice')
+            history += [_make_submission(2, a), _make_submission(3, a)]
+            history.append(_make_submission(4, b))
+            table = await cache.get('alice')
+        assert status.call_args.kwargs == {'handle': 'alice'}
+        assert [sub.id for sub in table.submissions] == [1, 4]
+
+    async def test_rederived_after_contest_reload(self, cache, cache_system):
+        a = _make_problem(index='A', name='A')
+        with self._mock_status([_make_submission(1, a)]):
+            table = await cache.get('alice')
+            assert not table.nonstandard[0]
+            cache_system.contest_cache.contest_by_id = {
+                1: _make_contest(id=1, name='Kotlin Heroes')
+            }
+            assert await cache.get('alice') is table
+        assert table.nonstandard[0]
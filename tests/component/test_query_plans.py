@@ -0,0 +1,168 @@
+"""Query plan regression tests for tle.util.db.
+
+Every query in cache_db_conn.py and user_db_conn.py is read from the source and
+run through EXPLAIN QUERY PLAN against freshly created tables. A query must not
+scan a large table unless its function is listed in `WHOLE_TABLE_READS`, and
+those must walk the table in index order instead of sorting it.
+"""
+
+import ast
+import itertools
+import re
+from pathlib import Path
+
+import pytest
+
+DB_DIR = Path(__file__).parents[2] / 'tle' / 'util' / 'db'
+
+# Tables that grow with the number of contests, problems or users.
+LARGE_TABLES = {
+    'cache_db_conn.py': {
+        'contest',
+        'problem',
+        'problem2',
+        'rating_change',
+        'latest_rating',
+        'predicted_rating_change',
+    },
+    'user_db_conn.py': {
+        'user_handle',
+        'cf_user_cache',
+        'duelist',
+        'duel',
+        'challenge',
+        'user_challenge',
+        'rated_vcs',
+        'rated_vc_users',
+        'starboard_message_v1',
+    },
+}
+
+# Functions that read a whole large table on purpose.
+WHOLE_TABLE_READS = {
+    'iter_contests': 'loads the contest cache',
+    '_iter_problems': 'loads the problem caches',
+    'iter_all_rating_changes': 'streams every rating change',
+    'get_latest_rating_by_handle': 'needs the latest change of every handle',
+    'get_latest_rating_version': 'aggregates over every handle',
+    'get_rating_activity': 'builds the rating distributions',
+    'get_contest_ids_with_rating_changes': 'lists every contest',
+    'problemset_empty': 'stops at the first row',
+    'get_gudgitters': 'ranks every gitgud user',
+    'get_duelists': 'ranks every duelist',
+}
+# Migrations, which run once and partly query tables that no longer exist.
+SKIPPED = {'create_tables', '_migrate_tags', '_fill_latest_rating'}
+# Values substituted for the fields of queries built with f-strings.
+FORMAT_VALUES = {
+    'table': ('problem', 'problem2'),
+    'where': ('', 'WHERE contest_id = ?'),
+}
+
+_SQL = re.compile(r'\s*(SELECT|UPDATE|DELETE|INSERT|REPLACE|WITH)\s', re.IGNORECASE)
+_INSERT_VALUES = re.compile(r'\s*(INSERT|REPLACE)\b(?!.*\bSELECT\b)', re.S | re.I)
+_TABLE_REF = re.compile(
+    r'\b(?:FROM|JOIN|UPDATE|INTO)\s+"?(\w+)"?(?:\s+(?:AS\s+)?(\w+))?', re.I
+)
+_KEYWORDS = {'WHERE', 'ON', 'LEFT', 'JOIN', 'INNER', 'ORDER', 'GROUP', 'SET', 'LIMIT'}
+
+
+def _expand(node: ast.JoinedStr) -> list[str]:
+    parts: list[tuple[str, ...]] = []
+    for value in node.values:
+        if isinstance(value, ast.Constant):
+            parts.append((value.value,))
+        else:
+            assert isinstance(value, ast.FormattedValue)
+            field = ast.unparse(value.value)
+            assert field in FORMAT_VALUES, f'add {field!r} to FORMAT_VALUES'
+            parts.append(FORMAT_VALUES[field])
+    return [''.join(combination) for combination in itertools.product(*parts)]
+
+
+def _extract_queries(filename: str) -> list[tuple[str, str]]:
+    """Return (function name, query) for the SQL strings in a db module."""
+    tree = ast.parse((DB_DIR / filename).read_text())
+    queries = []
+    for func in ast.walk(tree):
+        if not isinstance(func, ast.FunctionDef | ast.AsyncFunctionDef):
+            continue
+        if func.name in SKIPPED:
+            continue
+        # Docstrings and the pieces of f-strings are not queries of their own.
+        ignored = {id(stmt.value) for stmt in func.body if isinstance(stmt, ast.Expr)}
+        for node in ast.walk(func):
+            if isinstance(node, ast.JoinedStr):
+                ignored.update(id(value) for value in node.values)
+        for node in ast.walk(func):
+            if id(node) in ignored:
+                continue
+            if isinstance(node, ast.Constant) and isinstance(node.value, str):
+                candidates = [node.value]
+            elif (
+                isinstance(node, ast.JoinedStr)
+                and isinstance(node.values[0], ast.Constant)
+                and _SQL.match(node.values[0].value)
+            ):
+                candidates = _expand(node)
+            else:
+                continue
+            for query in candidates:
+                # Inserts of values have no plan to check.
+                if _SQL.match(query) and not _INSERT_VALUES.match(query):
+                    queries.append((func.name, query))
+    return queries
+
+
+QUERIES = [
+    (filename, func_name, query)
+    for filename in LARGE_TABLES
+    for func_name, query in _extract_queries(filename)
+]
+
+
+def _tables_by_name(query: str) -> dict[str, str]:
+    tables = {}
+    for table, alias in _TABLE_REF.findall(query):
+        tables[table] = table
+        if alias and alias.upper() not in _KEYWORDS:
+            tables[alias] = table
+    return tables
+
+
+async def _explain(db, query: str) -> list[str]:
+    query = query.replace('{}', '?')
+    cursor = await db.conn.execute(
+        f'EXPLAIN QUERY PLAN {query}', (None,) * query.count('?')
+    )
+    return [row[3] for row in await cursor.fetchall()]
+
+
+@pytest.mark.parametrize(
+    'filename,func_name,query',
+    QUERIES,
+    ids=[f'{func_name}-{i}' for i, (_, func_name, _) in enumerate(QUERIES)],
+)
+async def test_query_plan(cache_db, user_db, filename, func_name, query):
+    db = cache_db if filename == 'cache_db_conn.py' else user_db
+    plan = await _explain(db, query)
+    tables = _tables_by_name(query)
+    scanned = {
+        tables.get(match[1], match[1])
+        for detail in plan
+        if (match := re.match(r'SCAN (\w+)', detail))
+    }
+    large_scanned = scanned & LARGE_TABLES[filename]
+    if func_name in WHOLE_TABLE_READS:
+        assert not [detail for detail in plan if 'TEMP B-TREE' in detail], plan
+    else:
+        assert not large_scanned, f'{func_name} scans {large_scanned}: {plan}'
+
+
+def test_finds_queries():
+    func_names = {func_name for _, func_name, _ in QUERIES}
+    assert len(QUERIES) > 90
+    assert set(WHOLE_TABLE_READS) <= func_names
+    assert {'get_duels', 'get_cf_users_for_guild', 'get_rating_changes_for_handle'} <= (
+        func_names
+    )
@@ -183,6 +183,47 @@ class TestCfUserCache:
         assert fetched.titlePhoto.startswith('https:')
 
 
+class TestGuildStats:
+    async def test_built_from_db(self, user_db, make_user):
+        await user_db.set_handle(1, 'guild1', 'alice')
+        await user_db.set_handle(2, 'guild1', 'bob')
+        await user_db.cache_cf_user(make_user(handle='alice', country='Croatia'))
+        stats = await user_db.get_guild_stats('guild1')
+        assert stats.country_counts == {'Croatia': 1}
+        assert stats.get_ratings('Croatia') == [3000]
+        # Members without a cached profile keep their handle.
+        assert stats.members[2].handle == 'bob'
+        assert await user_db.get_guild_stats('guild1') is stats
+
+    async def test_updated_by_writes(self, user_db, make_user):
+        stats = await user_db.get_guild_stats('guild1')
+        await user_db.set_handle(1, 'guild1', 'alice')
+        assert stats.members[1].rating is None
+        await user_db.cache_cf_user(make_user(handle='alice', country='Croatia'))
+        assert stats.get_ratings('Croatia') == [3000]
+
+        await user_db.cache_cf_user(make_user(handle='bob', country='Slovenia'))
+        await user_db.set_handle(2, 'guild1', 'bob')
+        assert stats.country_counts == {'Croatia': 1, 'Slovenia': 1}
+
+        await user_db.set_inactive([('guild1', 1)])
+        assert stats.country_counts == {'Slovenia': 1}
+        assert await user_db.get_guild_stats('guild1') is stats
+
+    async def test_rebuilt_after_status_changes(self, user_db, make_user):
+        await user_db.set_handle(1, 'guild1', 'alice')
+        await user_db.cache_cf_user(make_user(handle='alice', country='Croatia'))
+        stats = await user_db.get_guild_stats('guild1')
+        await user_db.reset_status('guild1')
+        stats = await user_db.get_guild_stats('guild1')
+        assert stats.members == {}
+        await user_db.update_status('guild1', [1])
+        stats = await user_db.get_guild_stats('guild1')
+        assert stats.country_counts == {'Croatia': 1}
+        await user_db.remove_handle('ALICE', 'guild1')
+        assert (await user_db.get_guild_stats('guild1')).members == {}
+
+
 class TestChallenge:
     async def test_new_challenge(self, user_db, make_problem):
         prob = make_problem(name='Test Problem', contestId=1, index='A')
@@ -186,7 +186,6 @@ class TestGimme:
         mock_cf_common.resolve_handles = AsyncMock(return_value=['tourist'])
         mock_cf_common.parse_tags.return_value = []
         mock_cf_common.parse_rating.return_value = 3000
-        mock_cf_common.is_contest_writer.return_value = False
         mock_cf_common.user_guard = MagicMock(side_effect=lambda **kwargs: lambda f: f)
         mock_cf_common.active_groups = {}
 
@@ -212,7 +211,6 @@ class TestGimme:
         mock_cf_common.resolve_handles = AsyncMock(return_value=['tourist'])
         mock_cf_common.parse_tags.return_value = []
         mock_cf_common.parse_rating.return_value = 9999  # impossible rating
-        mock_cf_common.is_contest_writer.return_value = False
         mock_cf_common.user_guard = MagicMock(side_effect=lambda **kwargs: lambda f: f)
         mock_cf_common.active_groups = {}
 
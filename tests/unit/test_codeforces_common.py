@@ -3,17 +3,29 @@
 We skip anything that depends on discord globals, bot state, or discord.ext.commands.
 """
 
+import asyncio
+import random
 import time
+from types import SimpleNamespace
 
+import numpy as np
 import pytest
 
-from tle.util import codeforces_api as cf
+from tests.benchmarks.subfilter import (
+    FILTER_ARGS,
+    random_history,
+    reference_filter_subs,
+)
+from tle.util import codeforces_api as cf, codeforces_common as cf_common
+from tle.util.cache import ContestInfo, SolvedTable
 from tle.util.codeforces_common import (
     ParamParseError,
     SubFilter,
     days_ago,
+    fetch_for_handles,
     filter_flags,
     fix_urls,
+    gather_for_handles,
     is_nonstandard_contest,
     negate_flags,
     parse_date,
@@ -346,3 +358,216 @@ class TestSubFilterRatingChanges:
         ]
         filtered = sf.filter_rating_changes(changes)
         assert len(filtered) == 0
+
+
+def _use_contests(monkeypatch, contest_by_id):
+    """Make `contest_by_id` the contents of the contest cache."""
+    info_by_id = {id: ContestInfo.of(contest) for id, contest in contest_by_id.items()}
+    contest_cache = SimpleNamespace(
+        contest_by_id=contest_by_id,
+        info_by_id=info_by_id,
+        get_info=info_by_id.__getitem__,
+    )
+    monkeypatch.setattr(
+        cf_common, 'cf_cache', SimpleNamespace(contest_cache=contest_cache)
+    )
+    return contest_cache
+
+
+class TestSubFilterSubs:
+    @pytest.fixture
+    def contests(self, make_contest, monkeypatch):
+        contest_by_id = {
+            1: make_contest(id=1, name='Codeforces Round #1 (Div. 2)'),
+            2: make_contest(id=2, name='Kotlin Heroes', startTimeSeconds=2_000_000),
+            100001: make_contest(id=100001, name='Gym Contest'),
+        }
+        return _use_contests(monkeypatch, contest_by_id)
+
+    @pytest.fixture
+    def submissions(self, contests, make_submission, make_problem, make_party):
+        def sub(id, contestId=1, index='A', time=None, **kwargs):
+            problem = make_problem(
+                contestId=contestId,
+                index=index,
+                name=f'{contestId}{index}',
+                rating=kwargs.pop('rating', 1500),
+                tags=kwargs.pop('tags', ['dp']),
+            )
+            return make_submission(
+                id=id,
+                contestId=contestId,
+                problem=problem,
+                author=make_party(
+                    participantType=kwargs.pop('participantType', 'PRACTICE'),
+                    members=kwargs.pop('members', None),
+                ),
+                creationTimeSeconds=time or id,
+                **kwargs,
+            )
+
+        # Newest first, as returned by the API.
+        return [
+            sub(9, contestId=100001, rating=None),
+            sub(8, contestId=2),
+            sub(7, index='E', rating=None),
+            sub(6, index='D', members=[]),
+            sub(5, index='C', participantType='CONTESTANT', tags=['greedy']),
+            sub(4, index='B', verdict='WRONG_ANSWER'),
+            sub(3, index='A', rating=2000),
+            sub(2, index='A', verdict='WRONG_ANSWER'),
+        ]
+
+    def _ids(self, args, submissions, rated=True):
+        sf = SubFilter(rated=rated)
+        sf.parse(args)
+        return [sub.id for sub in sf.filter_subs(submissions)]
+
+    def test_rated(self, submissions):
+        assert self._ids([], submissions) == [3, 5]
+
+    def test_unrated(self, submissions):
+        assert self._ids([], submissions, rated=False) == [3, 5, 7, 9]
+
+    def test_team(self, submissions):
+        assert self._ids(['+team'], submissions) == [3, 5, 6]
+
+    def test_predicates(self, submissions):
+        assert self._ids(['+contest'], submissions) == [5]
+        assert self._ids(['r<=1800'], submissions) == [5]
+        assert self._ids(['d>=01012000'], submissions) == []
+        assert self._ids(['+greedy'], submissions) == [5]
+        assert self._ids(['~greedy'], submissions) == [3]
+        assert self._ids(['i+c'], submissions) == [5]
+        assert self._ids(['c+div2'], submissions, rated=False) == [3, 5, 7]
+
+    def test_first_accepted_kept(self, submissions):
+        resubmitted = submissions[6]._replace(id=10, creationTimeSeconds=10)
+        assert self._ids([], [resubmitted, *submissions]) == [3, 5]
+
+    def test_table_matches_subs(self, contests, submissions):
+        table = SolvedTable(contests)
+        table.add(submissions)
+        sf = SubFilter(rated=False)
+        sf.parse(['+team'])
+        assert sf.filter_table(table) == sf.filter_subs(submissions)
+
+
+class TestSubFilterEquivalence:
+    @pytest.mark.parametrize('args', FILTER_ARGS)
+    @pytest.mark.parametrize('rated', [True, False])
+    def test_matches_reference(self, monkeypatch, args, rated):
+        contest_by_id, submissions = random_history(random.Random(0), 3000)
+        _use_contests(monkeypatch, contest_by_id)
+        sf = SubFilter(rated=rated)
+        sf.parse(args)
+        expected = reference_filter_subs(sf, submissions)
+        assert expected
+        assert sf.filter_subs(submissions) == expected
+
+    def test_incremental_matches_fresh(self, monkeypatch):
+        contest_by_id, submissions = random_history(random.Random(2), 3000)
+        contest_cache = _use_contests(monkeypatch, contest_by_id)
+        # Pending submissions are only fetched once judged.
+        judged = [sub for sub in submissions if sub.verdict is not None]
+        table = SolvedTable(contest_cache)
+        for end in range(len(judged), 0, -500):
+            table.add(judged[max(end - 500, 0) : end])
+        _assert_tables_equal(table, _fresh_table(contest_cache, judged))
+
+        # Rejudged in the fetched window, and an older one accepted late.
+        judged[:50] = [
+            sub._replace(verdict='WRONG_ANSWER') if sub.verdict == 'OK' else sub
+            for sub in judged[:50]
+        ]
+        late = judged.pop(100)._replace(id=len(submissions), verdict='OK')
+        judged.insert(0, late)
+        table.add(judged[:60])
+        _assert_tables_equal(table, _fresh_table(contest_cache, judged))
+
+
+def _fresh_table(contest_cache, submissions):
+    table = SolvedTable(contest_cache)
+    table.add(submissions)
+    return table
+
+
+def _assert_tables_equal(table, expected):
+    assert table.submissions == expected.submissions
+    assert table.contests == expected.contests
+    assert table.tag_sets == expected.tag_sets
+    for column in (
+        'time',
+        'participant_type',
+        'team',
+        'rating',
+        'index',
+        'tag_set',
+        'contest_index',
+        'has_contest',
+        'contest_id',
+        'nonstandard',
+    ):
+        np.testing.assert_array_equal(
+            getattr(table, column), getattr(expected, column), err_msg=column
+        )
+
+
+async def _fetch(handle):
+    await asyncio.sleep(0.01)
+    if handle == 'missing':
+        raise cf.HandleNotFoundError('not found', handle)
+    return handle.upper()
+
+
+class TestGatherForHandles:
+    async def test_concurrent(self):
+        running = 0
+        peak = 0
+
+        async def fetch(handle):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return handle
+
+        fetched = await gather_for_handles(['a', 'b', 'c'], fetch)
+        assert fetched.results == ['a', 'b', 'c']
+        assert peak == 3
+
+    async def test_partial_results(self):
+        fetched = await gather_for_handles(['a', 'missing', 'b'], _fetch)
+        assert fetched.handles == ['a', 'b']
+        assert fetched.results == ['A', 'B']
+        assert isinstance(fetched.errors['missing'], cf.HandleNotFoundError)
+
+    async def test_progress(self):
+        calls = []
+
+        async def progress(done, total):
+            calls.append((done, total))
+
+        await gather_for_handles(['a', 'b'], _fetch, progress=progress)
+        assert calls == [(1, 2), (2, 2)]
+
+
+class TestFetchForHandles:
+    async def test_sends_errors_of_skipped_handles(self, mock_ctx):
+        handles, results = await fetch_for_handles(mock_ctx, ['a', 'missing'], _fetch)
+        assert (handles, results) == (['a'], ['A'])
+        mock_ctx.send.assert_awaited_once()
+        assert '`missing`' in mock_ctx.send.call_args.kwargs['embed'].description
+
+    async def test_raises_if_all_fail(self, mock_ctx):
+        with pytest.raises(cf.HandleNotFoundError):
+            await fetch_for_handles(mock_ctx, ['missing'], _fetch)
+
+    async def test_shows_progress_of_slow_fetches(self, mock_ctx, monkeypatch):
+        monkeypatch.setattr(cf_common, '_PROGRESS_DELAY', 0)
+        await fetch_for_handles(mock_ctx, ['a', 'b', 'c'], _fetch)
+        message = mock_ctx.send.return_value
+        assert mock_ctx.send.await_count == 1
+        message.edit.assert_awaited_once()
+        message.delete.assert_awaited_once()
@@ -0,0 +1,233 @@
+"""Tests for tle.util.graph_common."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from tle.cogs import graphs
+from tle.util import codeforces_api as cf, graph_common as gc
+from tle.util.cache import ContestRatingChanges
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def _rating_changes(count, start, step):
+    return [
+        cf.RatingChange(
+            contestId=i,
+            contestName=f'Round {i}',
+            handle='tourist',
+            rank=1,
+            ratingUpdateTimeSeconds=1_600_000_000 + i * 86400,
+            oldRating=start + (i - 1) * step,
+            newRating=start + i * step,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+class TestFigure:
+    def test_new_figure(self):
+        fig, ax = gc.new_figure(figsize=(4, 2))
+        assert isinstance(fig.canvas, FigureCanvasAgg)
+        assert fig.axes == [ax]
+        assert tuple(fig.get_size_inches()) == (4, 2)
+
+    def test_figure_to_bytes(self):
+        fig, ax = gc.new_figure()
+        ax.plot([1, 2, 3])
+        assert gc.figure_to_bytes(fig).startswith(PNG_SIGNATURE)
+
+    def test_copies_template(self):
+        fig1, ax1 = gc.new_figure(ranks=cf.RATED_RANKS)
+        fig2, ax2 = gc.new_figure(ranks=cf.RATED_RANKS)
+        assert fig1 is not fig2
+        ax1.plot([0, 1], [1000, 2000])
+        assert not ax2.lines
+
+    def test_plot_rating_bg(self):
+        fig, ax = gc.new_figure()
+        ax.plot([0, 1], [1000, 2000])
+        limits = ax.get_xlim(), ax.get_ylim()
+        gc.plot_rating_bg(ax, cf.RATED_RANKS)
+        assert (ax.get_xlim(), ax.get_ylim()) == limits
+        (bands,) = ax.collections
+        assert len(bands.get_paths()) == len(cf.RATED_RANKS)
+
+    def test_bands_not_in_legend(self):
+        fig, ax = gc.new_figure(ranks=cf.RATED_RANKS)
+        (line,) = ax.plot([0, 1], [1000, 2000])
+        assert ax.legend(['tourist']).legend_handles[0].get_color() == line.get_color()
+
+
+class TestRatingColors:
+    def test_matches_rating2rank(self):
+        ratings = np.array([-100, 0, 1199, 1200, 1899, 1900, 2399, 2400, 3000, 4000])
+        assert gc.rating_colors(ratings).tolist() == [
+            cf.rating2rank(int(rating)).color_graph for rating in ratings
+        ]
+
+
+class TestScatterImage:
+    def _axes(self):
+        fig, ax = gc.new_figure(figsize=(4, 2))
+        ax.set_xlim(0, 100)
+        ax.set_ylim(0, 100)
+        return ax
+
+    def test_later_points_on_top(self):
+        ax = self._axes()
+        x = np.array([10, 10, 90])
+        y = np.array([10, 10, 90])
+        colors = np.array(['#CCCCCC', '#AA0000', '#77FF77'])
+        image = gc.scatter_image(ax, x, y, colors, size=1).get_array()
+        assert (ax.get_xlim(), ax.get_ylim()) == ((0, 100), (0, 100))
+        painted = image[..., 3] > 0
+        assert painted.sum() == 2
+        colored = {tuple(pixel[:3]) for pixel in image[painted]}
+        assert colored == {(0xAA, 0, 0), (0x77, 0xFF, 0x77)}
+
+    def test_size(self):
+        ax = self._axes()
+        x = y = np.array([50])
+        colors = np.array(['#CCCCCC'])
+        side = round(3 * ax.figure.dpi / 72)
+        image = gc.scatter_image(ax, x, y, colors, size=3).get_array()
+        assert (image[..., 3] > 0).sum() == side**2
+
+
+class TestConcurrentRendering:
+    @pytest.mark.parametrize(
+        'func,args',
+        [
+            (
+                graphs._plot_rating_graph,
+                (
+                    [_rating_changes(30, 1500, 10), _rating_changes(20, 1400, -5)],
+                    ['tourist', 'Petr'],
+                    False,
+                    False,
+                ),
+            ),
+            (
+                graphs._plot_solved,
+                (['tourist', 'Petr'], [[800, 900, 1000], [1200]], [], 800, 1500),
+            ),
+        ],
+    )
+    def test_same_as_sequential(self, func, args):
+        expected = func(*args)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: func(*args), range(4)))
+        assert results == [expected] * 4
+
+
+def _render_rating_plot(rating_changes, template):
+    """Render a rating plot like `;plot rating +number`, on a copy of the
+    template or on a figure built from scratch."""
+    if template:
+        fig, ax = gc.new_figure(ranks=cf.RATED_RANKS)
+    else:
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        gc.plot_rating_bg(ax, cf.RATED_RANKS)
+    ax.set_prop_cycle(gc.rating_color_cycler)
+    for changes in rating_changes:
+        ax.plot(
+            range(1, len(changes) + 1),
+            [change.newRating for change in changes],
+            marker='o',
+            markersize=3,
+        )
+    ax.legend(['tourist', 'Petr'], loc='lower left', ncol=2)
+    return gc.figure_to_bytes(fig)
+
+
+class TestRatingPlotTemplate:
+    def test_same_as_fresh_figure(self):
+        rating_changes = [_rating_changes(150, 1500, 3), _rating_changes(100, 1400, 2)]
+        assert _render_rating_plot(rating_changes, True) == _render_rating_plot(
+            rating_changes, False
+        )
+
+
+def _reference_visualrank_points(rating_changes, handles, zoom):
+    """The visualrank points built per rating change, as before the columns."""
+    users_to_mark = {}
+    for rating_change in rating_changes:
+        user_delta = rating_change.newRating - rating_change.oldRating
+        if rating_change.handle in handles:
+            users_to_mark[rating_change.handle] = (rating_change.rank, user_delta)
+
+    ymargin = 50
+    xmargin = 50
+    if users_to_mark and zoom:
+        xmin = min(point[0] for point in users_to_mark.values())
+        xmax = max(point[0] for point in users_to_mark.values())
+        ymin = min(point[1] for point in users_to_mark.values())
+        ymax = max(point[1] for point in users_to_mark.values())
+    else:
+        ylim = 0
+        if users_to_mark:
+            ylim = max(abs(point[1]) for point in users_to_mark.values())
+        ylim = max(ylim, 200)
+
+        xmin = 0
+        xmax = max(rating_change.rank for rating_change in rating_changes)
+        ymin = -ylim
+        ymax = ylim
+
+    ranks = []
+    delta = []
+    color = []
+    for rating_change in rating_changes:
+        user_delta = rating_change.newRating - rating_change.oldRating
+        if (
+            xmin - xmargin <= rating_change.rank <= xmax + xmargin
+            and ymin - ymargin <= user_delta <= ymax + ymargin
+        ):
+            ranks.append(rating_change.rank)
+            delta.append(user_delta)
+            color.append(cf.rating2rank(rating_change.oldRating).color_graph)
+    return (
+        ranks,
+        delta,
+        color,
+        users_to_mark,
+        (xmin - xmargin, xmax + xmargin),
+        (ymin - ymargin, ymax + ymargin),
+    )
+
+
+class TestVisualrankPoints:
+    @pytest.mark.parametrize('zoom', [False, True])
+    @pytest.mark.parametrize('handles', [[], ['user3'], ['user10', 'user900']])
+    def test_matches_reference(self, zoom, handles):
+        rng = np.random.default_rng(0)
+        old_ratings = rng.integers(0, 3500, 1000)
+        changes = [
+            cf.RatingChange(
+                contestId=1,
+                contestName='Round',
+                handle=f'user{i}',
+                rank=i // 2 + 1,
+                ratingUpdateTimeSeconds=0,
+                oldRating=int(old_rating),
+                newRating=int(old_rating + rng.integers(-400, 400)),
+            )
+            for i, old_rating in enumerate(old_ratings)
+        ]
+        ranks, deltas, colors, users_to_mark, xlim, ylim = (
+            graphs._get_visualrank_points(
+                ContestRatingChanges.from_changes(changes), handles, zoom
+            )
+        )
+        expected = _reference_visualrank_points(changes, handles, zoom)
+        assert ranks.tolist() == expected[0]
+        assert deltas.tolist() == expected[1]
+        assert colors.tolist() == expected[2]
+        assert (users_to_mark, xlim, ylim) == expected[3:]
@@ -0,0 +1,52 @@
+"""Tests for tle.util.db.guild_stats."""
+
+import pytest
+
+from tle.util.db.guild_stats import GuildStats
+
+
+@pytest.fixture
+def stats(make_user):
+    return GuildStats(
+        [
+            (1, make_user(handle='alice', country='Croatia', rating=1900)),
+            (2, make_user(handle='bob', country='Croatia', rating=1200)),
+            (3, make_user(handle='carol', country='Slovenia', rating=None)),
+            (4, make_user(handle='dave', country=None, rating=2500)),
+        ]
+    )
+
+
+class TestGuildStats:
+    def test_aggregates(self, stats):
+        assert stats.country_counts == {'Croatia': 2, 'Slovenia': 1}
+        assert stats.get_ratings('Croatia') == [1200, 1900]
+        assert stats.get_ratings('Slovenia') == []
+        assert stats.rank_counts == {
+            'Pupil': 1,
+            'Candidate Master': 1,
+            'Grandmaster': 1,
+        }
+
+    def test_get_members(self, stats):
+        assert [user_id for user_id, _ in stats.get_members()] == [1, 2, 3, 4]
+        assert [user_id for user_id, _ in stats.get_members(['Croatia'])] == [1, 2]
+
+    def test_set_and_remove_member(self, stats, make_user):
+        version = stats.version
+        stats.set_member(2, make_user(handle='bob', country='Slovenia', rating=1500))
+        assert stats.country_counts == {'Croatia': 1, 'Slovenia': 2}
+        assert stats.get_ratings('Slovenia') == [1500]
+        stats.remove_member(1)
+        assert stats.country_counts == {'Slovenia': 2}
+        assert stats.get_ratings('Croatia') == []
+        assert stats.rank_counts == {'Specialist': 1, 'Grandmaster': 1}
+        assert stats.version > version
+
+    def test_update_user(self, stats, make_user):
+        stats.set_member(5, make_user(handle='alice', country='Croatia', rating=1900))
+        stats.update_user(make_user(handle='alice', country='Croatia', rating=2100))
+        assert stats.get_ratings('Croatia') == [1200, 2100, 2100]
+        version = stats.version
+        stats.update_user(make_user(handle='nobody'))
+        assert stats.version == version
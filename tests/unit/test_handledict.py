@@ -59,3 +59,73 @@ class TestHandleDict:
         d = HandleDict()
         d[42] = 'numeric'
         assert d[42] == 'numeric'
+
+    def test_bulk_construction(self):
+        d = HandleDict([('Tourist', 3000), ('Petr', 2800), ('tourist', 3100)])
+        assert len(d) == 2
+        assert d['TOURIST'] == 3100
+        assert list(d) == ['tourist', 'Petr']
+
+    def test_contains(self):
+        d = HandleDict([('Tourist', 3000)])
+        assert 'tourist' in d
+        assert 'TOURIST' in d
+        assert 'Petr' not in d
+
+    def test_get(self):
+        d = HandleDict([('Tourist', 3000), ('Petr', None)])
+        assert d.get('tourist') == 3000
+        assert d.get('Benq') is None
+        assert d.get('Benq', 0) == 0
+        assert d.get('petr', 0) is None
+
+    def test_items_is_live_view(self):
+        d = HandleDict([('Tourist', 3000)])
+        items = d.items()
+        d['Petr'] = 2800
+        assert len(items) == 2
+        assert ('Petr', 2800) in items
+        assert sorted(items) == [('Petr', 2800), ('Tourist', 3000)]
+
+    def test_values(self):
+        d = HandleDict([('Tourist', 3000), ('Petr', 2800)])
+        assert sorted(d.values()) == [2800, 3000]
+        assert 3000 in d.values()
+
+    def test_len_after_delete(self):
+        d = HandleDict([('Tourist', 3000), ('Petr', 2800)])
+        del d['petr']
+        assert len(d) == 1
+
+    def test_interned_keys_are_shared(self):
+        a = HandleDict([('Tourist', 1)], intern=True)
+        b = HandleDict(intern=True)
+        b[''.join(['TOU', 'RIST'])] = 2
+        (key_a,) = a._store
+        (key_b,) = b._store
+        assert key_a is key_b
+        assert b['tourist'] == 2
+
+
+@pytest.mark.slow
+class TestLargeHandleDict:
+    N = 200_000
+
+    def test_bulk_construction_matches_inserts(self):
+        handles = [f'User{i}' for i in range(self.N)]
+        one_by_one = HandleDict()
+        for i, handle in enumerate(handles):
+            one_by_one[handle] = i
+        bulk = HandleDict((handle, i) for i, handle in enumerate(handles))
+        assert all(handle.upper() in bulk for handle in handles)
+        assert bulk['user123'] == 123
+        assert dict(bulk.items()) == dict(one_by_one.items())
+
+    def test_items_does_not_copy(self):
+        d = HandleDict((f'User{i}', i) for i in range(self.N))
+        items = d.items()
+        d['Late'] = -1
+        # The view reads the entries as they are when iterated.
+        assert ('Late', -1) in list(items)
+        assert len(items) == self.N + 1
+        assert next(iter(items)) is next(iter(d._store.values()))
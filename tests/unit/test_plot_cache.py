@@ -0,0 +1,129 @@
+"""Tests for tle.util.plot_cache."""
+
+import pytest
+
+from tle.util import plot_cache
+from tle.util.plot_cache import PlotCache
+
+
+class TestMakeKey:
+    def test_stable(self):
+        key = plot_cache.make_key('rating', ['tourist'], False, (3, 100))
+        assert key == plot_cache.make_key('rating', ['tourist'], False, (3, 100))
+        assert key.startswith('rating-')
+
+    def test_depends_on_parts(self):
+        key = plot_cache.make_key('rating', ['tourist'], (3, 100))
+        assert key != plot_cache.make_key('rating', ['tourist'], (4, 200))
+        assert key != plot_cache.make_key('centile', ['tourist'], (3, 100))
+
+
+class TestMemory:
+    def test_get_put(self):
+        cache = PlotCache()
+        assert cache.get('a') is None
+        cache.put('a', b'png')
+        assert cache.get('a') == b'png'
+        assert cache.metrics.misses == 1
+        assert cache.metrics.memory_hits == 1
+
+    def test_evicts_least_recently_used(self):
+        cache = PlotCache(max_memory_bytes=10)
+        cache.put('a', b'x' * 4)
+        cache.put('b', b'x' * 4)
+        cache.get('a')
+        cache.put('c', b'x' * 4)
+        assert cache.get('b') is None
+        assert cache.get('a') is not None
+        assert cache.get('c') is not None
+        assert cache.metrics.memory_bytes == 8
+
+    def test_skips_oversized(self):
+        cache = PlotCache(max_memory_bytes=10)
+        cache.put('a', b'x' * 11)
+        assert cache.get('a') is None
+        assert cache.metrics.memory_bytes == 0
+
+
+class TestDisk:
+    def test_persists(self, tmp_path):
+        PlotCache(tmp_path).put('a', b'png')
+        cache = PlotCache(tmp_path)
+        assert cache.get('a') == b'png'
+        assert cache.metrics.disk_hits == 1
+        assert cache.get('a') == b'png'
+        assert cache.metrics.memory_hits == 1
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = PlotCache(tmp_path, max_memory_bytes=0, max_disk_bytes=10)
+        cache.put('a', b'x' * 4)
+        cache.put('b', b'x' * 4)
+        cache.get('a')
+        cache.put('c', b'x' * 4)
+        assert sorted(path.stem for path in tmp_path.iterdir()) == ['a', 'c']
+        assert cache.metrics.disk_bytes == 8
+
+    def test_bound_applied_on_load(self, tmp_path):
+        cache = PlotCache(tmp_path)
+        cache.put('a', b'x' * 4)
+        cache.put('b', b'x' * 4)
+        cache = PlotCache(tmp_path, max_disk_bytes=4)
+        assert cache.metrics.disk_bytes == 4
+        assert len(list(tmp_path.iterdir())) == 1
+
+    def test_missing_file(self, tmp_path):
+        cache = PlotCache(tmp_path, max_memory_bytes=0)
+        cache.put('a', b'png')
+        (tmp_path / 'a.png').unlink()
+        assert cache.get('a') is None
+        assert cache.metrics.disk_bytes == 0
+
+    def test_clear(self, tmp_path):
+        cache = PlotCache(tmp_path)
+        cache.put('a', b'png')
+        cache.clear()
+        assert cache.get('a') is None
+        assert not list(tmp_path.iterdir())
+
+
+class TestInitialize:
+    @pytest.fixture(autouse=True)
+    def restore_cache(self, monkeypatch):
+        monkeypatch.setattr(plot_cache, '_cache', PlotCache())
+
+    def test_keeps_plots_of_same_version(self, tmp_path):
+        plot_cache.initialize(tmp_path, version='v1')
+        plot_cache.put('a', b'png')
+        plot_cache.initialize(tmp_path, version='v1')
+        assert plot_cache.get('a') == b'png'
+
+    def test_drops_plots_of_other_versions(self, tmp_path):
+        plot_cache.initialize(tmp_path, version='v1')
+        plot_cache.put('a', b'png')
+        (tmp_path / 'b.png').write_bytes(b'png')
+        plot_cache.initialize(tmp_path, version='v2')
+        assert plot_cache.get('a') is None
+        assert [path.name for path in tmp_path.iterdir()] == ['v2']
+
+    def test_render_version(self):
+        version = plot_cache.get_render_version(plot_cache)
+        assert version == plot_cache.get_render_version(plot_cache)
+        assert version != plot_cache.get_render_version(plot_cache, pytest)
+
+
+class TestRender:
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self, monkeypatch):
+        monkeypatch.setattr(plot_cache, '_cache', PlotCache())
+
+    async def test_renders_once(self):
+        calls = []
+
+        def render(value):
+            calls.append(value)
+            return b'png'
+
+        assert await plot_cache.render('a', render, 1) == b'png'
+        assert await plot_cache.render('a', render, 2) == b'png'
+        assert calls == [1]
+        assert plot_cache.get('a') == b'png'
@@ -0,0 +1,329 @@
+"""Tests for tle.util.ranklist.ranklist."""
+
+import random
+
+import pytest
+
+from tle.util import workers
+from tle.util.codeforces_api import Member, RanklistRow
+from tle.util.ranklist import (
+    DeltasNotPresentError,
+    HandleNotPresentError,
+    Ranklist,
+    StandingsDiff,
+)
+from tle.util.workers import WorkerPoolBusy
+
+
+@pytest.fixture
+def make_row(make_party):
+    def _make(handle, rank, points, penalty=0):
+        party = make_party(members=[Member(handle=handle)])
+        return RanklistRow(
+            party=party, rank=rank, points=points, penalty=penalty, problemResults=[]
+        )
+
+    return _make
+
+
+@pytest.fixture
+def ranklist(make_contest, make_row):
+    standings = [
+        make_row('alice', 1, 300),
+        make_row('bob', 2, 200),
+        make_row('carol', 3, 100),
+    ]
+    return Ranklist(make_contest(), [], standings, 0, is_rated=True)
+
+
+RATINGS = {'alice': 1500, 'bob': 1600, 'carol': 1700, 'dave': 1800}
+
+
+class TestUpdateStandings:
+    def test_diff(self, ranklist, make_contest, make_row):
+        standings = [
+            make_row('alice', 1, 300),
+            make_row('carol', 2, 250),
+            make_row('dave', 3, 50),
+        ]
+        diff = ranklist.update_standings(make_contest(), [], standings, 10)
+        assert diff == StandingsDiff(unchanged=1, changed=1, added=1, removed=1)
+        assert ranklist.get_standing_row('carol').points == 250
+        assert ranklist.get_standing_row('dave').rank == 3
+        assert sorted(ranklist.handles) == ['alice', 'carol', 'dave']
+        assert ranklist.standings == standings
+        assert ranklist.fetch_time == 10
+
+    def test_keeps_unchanged_rows(self, ranklist, make_contest, make_row):
+        row = ranklist.get_standing_row('bob')
+        standings = [
+            make_row('alice', 1, 300),
+            make_row('bob', 2, 200),
+            make_row('carol', 3, 100),
+        ]
+        diff = ranklist.update_standings(make_contest(), [], standings, 10)
+        assert diff == StandingsDiff(unchanged=3)
+        assert ranklist.get_standing_row('bob') is row
+
+    def test_case_insensitive_match(self, ranklist, make_contest, make_row):
+        standings = [
+            make_row('Alice', 1, 300),
+            make_row('bob', 2, 200),
+            make_row('carol', 3, 100),
+        ]
+        diff = ranklist.update_standings(make_contest(), [], standings, 10)
+        assert diff.removed == 0
+        assert diff.changed == 1
+        assert ranklist.handles == ['Alice', 'bob', 'carol']
+
+
+class TestRepredict:
+    async def test_first_prediction(self, ranklist):
+        assert await ranklist.repredict_async(RATINGS)
+        assert ranklist.deltas_status == 'Predicted'
+
+    async def test_skips_when_order_unchanged(self, ranklist, make_contest, make_row):
+        await ranklist.predict_async(RATINGS)
+        deltas = ranklist.delta_by_handle
+        standings = [
+            make_row('alice', 1, 400),
+            make_row('bob', 2, 350),
+            make_row('carol', 3, 100),
+        ]
+        ranklist.update_standings(make_contest(), [], standings, 10)
+        assert not await ranklist.repredict_async(RATINGS)
+        assert ranklist.delta_by_handle is deltas
+
+    async def test_recalculates_when_order_changed(
+        self, ranklist, make_contest, make_row
+    ):
+        await ranklist.predict_async(RATINGS)
+        standings = [
+            make_row('carol', 1, 400),
+            make_row('alice', 2, 300),
+            make_row('bob', 3, 200),
+        ]
+        ranklist.update_standings(make_contest(), [], standings, 10)
+        assert await ranklist.repredict_async(RATINGS)
+
+        fresh = Ranklist(make_contest(), [], standings, 10, is_rated=True)
+        fresh.predict(RATINGS)
+        assert ranklist.delta_by_handle == fresh.delta_by_handle
+
+    async def test_recalculates_when_rating_changed(self, ranklist):
+        await ranklist.predict_async(RATINGS)
+        assert await ranklist.repredict_async({**RATINGS, 'bob': 2000})
+
+    async def test_recalculates_after_final_deltas(self, ranklist):
+        await ranklist.predict_async(RATINGS)
+        ranklist.set_deltas({'alice': 1})
+        assert await ranklist.repredict_async(RATINGS)
+
+
+class TestUpdateStandingsInPlace:
+    def test_changed_in_place(self, ranklist, make_contest, make_row):
+        row = ranklist.get_standing_row('alice')
+        ranks = ranklist.ranks
+        standings = [
+            make_row('alice', 1, 300),
+            make_row('bob', 2, 250),
+            make_row('carol', 3, 100),
+        ]
+        diff = ranklist.update_standings(make_contest(), [], standings, 10)
+        assert diff == StandingsDiff(unchanged=2, changed=1)
+        assert ranklist.ranks is ranks
+        assert ranklist.get_standing_row('alice') is row
+        assert ranklist.standings == standings
+        assert ranklist.points.tolist() == [300, 250, 100]
+
+    def test_appended(self, ranklist, make_contest, make_row):
+        standings = [*ranklist.standings, make_row('dave', 4, 50)]
+        diff = ranklist.update_standings(make_contest(), [], standings, 10)
+        assert diff == StandingsDiff(unchanged=3, added=1)
+        assert ranklist.standings == standings
+        assert ranklist.get_standing_row('DAVE').rank == 4
+
+    def test_same_as_fresh(self, make_contest, make_row):
+        rng = random.Random(0)
+        standings = [make_row(f'user{i}', i + 1, 1000 - i) for i in range(50)]
+        ranklist = Ranklist(make_contest(), [], standings, 0, is_rated=True)
+        for fetch in range(1, 20):
+            standings = [
+                make_row(f'user{i}', row.rank, row.points, rng.randrange(3))
+                if rng.random() < 0.2
+                else row
+                for i, row in enumerate(standings)
+            ]
+            if fetch % 3 == 0:
+                standings.append(make_row(f'new{fetch}', 100 + fetch, 0))
+            if fetch % 5 == 0:
+                rng.shuffle(standings)
+            ranklist.update_standings(make_contest(), [], standings, fetch)
+            fresh = Ranklist(make_contest(), [], standings, fetch, is_rated=True)
+            assert ranklist.standings == fresh.standings
+            assert ranklist.handles == fresh.handles
+            assert ranklist.penalties.tolist() == fresh.penalties.tolist()
+            assert all(id_ in ranklist for id_ in fresh.handles)
+
+
+class TestUpdateStandingsAsync:
+    async def test_same_as_update_and_repredict(self, ranklist, make_contest, make_row):
+        await ranklist.predict_async(RATINGS)
+        standings = [
+            make_row('carol', 1, 400),
+            make_row('alice', 2, 300),
+            make_row('dave', 3, 200),
+        ]
+        diff, repredicted = await ranklist.update_standings_async(
+            make_contest(), [], standings, 10, RATINGS
+        )
+        assert repredicted
+        assert diff == StandingsDiff(changed=2, added=1, removed=1)
+
+        fresh = Ranklist(make_contest(), [], standings, 10, is_rated=True)
+        fresh.predict(RATINGS)
+        assert ranklist.delta_by_handle == fresh.delta_by_handle
+
+    async def test_skips_when_order_unchanged(self, ranklist, make_contest, make_row):
+        await ranklist.predict_async(RATINGS)
+        standings = [
+            make_row(handle, i + 1, 500 - i)
+            for i, handle in enumerate(['alice', 'bob', 'carol'])
+        ]
+        _, repredicted = await ranklist.update_standings_async(
+            make_contest(), [], standings, 10, RATINGS
+        )
+        assert not repredicted
+
+    async def test_worker_failure_keeps_ranklist(
+        self, ranklist, make_contest, make_row, monkeypatch
+    ):
+        await ranklist.predict_async(RATINGS)
+        deltas = ranklist.delta_by_handle
+        rows = ranklist.standings
+
+        async def busy(*args, **kwargs):
+            raise WorkerPoolBusy()
+
+        monkeypatch.setattr(workers, 'run', busy)
+        standings = [make_row('carol', 1, 400), make_row('alice', 2, 300)]
+        with pytest.raises(WorkerPoolBusy):
+            await ranklist.update_standings_async(
+                make_contest(), [], standings, 10, RATINGS
+            )
+        assert ranklist.standings == rows
+        assert ranklist.fetch_time == 0
+        assert ranklist.delta_by_handle is deltas
+
+
+class TestPredictDeltaAtRank:
+    async def test_matches_prediction_at_current_rank(self, ranklist):
+        await ranklist.predict_async(RATINGS)
+        for handle, rank in [('alice', 1), ('bob', 2), ('carol', 3)]:
+            delta = ranklist.predict_delta_at_rank(handle, rank)
+            assert delta == ranklist.delta_by_handle[handle]
+
+    def test_case_insensitive(self, ranklist):
+        ranklist.predict(RATINGS)
+        assert ranklist.predict_delta_at_rank('ALICE', 3) == (
+            ranklist.predict_delta_at_rank('alice', 3)
+        )
+
+    async def test_unofficial_rows_not_counted(self, make_contest, make_row):
+        standings = [
+            make_row('alice', 1, 300),
+            make_row('div1', 2, 250),
+            make_row('bob', 3, 200),
+            make_row('carol', 4, 100),
+        ]
+        ranklist = Ranklist(make_contest(), [], standings, 0, is_rated=True)
+        await ranklist.predict_async(RATINGS)
+        assert (
+            ranklist.predict_delta_at_rank('carol', 4)
+            == (ranklist.delta_by_handle['carol'])
+        )
+        # Rank 3 is behind alice only among the rated contestants.
+        assert ranklist.predict_delta_at_rank('carol', 3) == (
+            ranklist.predict_delta_at_rank('carol', 2)
+        )
+
+    def test_outsider_needs_rating(self, ranklist):
+        ranklist.predict(RATINGS)
+        with pytest.raises(HandleNotPresentError):
+            ranklist.predict_delta_at_rank('dave', 1)
+        assert isinstance(ranklist.predict_delta_at_rank('dave', 1, 1500), int)
+
+    def test_requires_prediction(self, ranklist):
+        with pytest.raises(DeltasNotPresentError):
+            ranklist.predict_delta_at_rank('alice', 1)
+
+
+class TestColumns:
+    def test_columns(self, ranklist):
+        assert len(ranklist) == 3
+        assert ranklist.handles == ['alice', 'bob', 'carol']
+        assert ranklist.ranks.tolist() == [1, 2, 3]
+        assert ranklist.points.tolist() == [300, 200, 100]
+        assert ranklist.penalties.tolist() == [0, 0, 0]
+
+    def test_get_standing_row(self, ranklist):
+        assert ranklist.get_standing_row('BOB').points == 200
+        with pytest.raises(HandleNotPresentError):
+            ranklist.get_standing_row('dave')
+
+
+class TestRemoveUnofficialContestants:
+    def test_requires_deltas(self, ranklist):
+        with pytest.raises(DeltasNotPresentError):
+            ranklist.remove_unofficial_contestants()
+
+    def test_reranks(self, make_contest, make_row):
+        standings = [
+            make_row('div1', 1, 500),
+            make_row('a', 2, 400),
+            make_row('b', 3, 300, 10),
+            make_row('div1b', 4, 300, 10),
+            make_row('c', 4, 300, 10),
+            make_row('d', 6, 300, 20),
+        ]
+        ranklist = Ranklist(make_contest(), [], standings, 0, is_rated=True)
+        ranklist.set_deltas({'a': 1, 'b': 2, 'c': 3, 'd': 4})
+        ranklist.remove_unofficial_contestants()
+
+        assert ranklist.handles == ['a', 'b', 'c', 'd']
+        assert [row.rank for row in ranklist.standings] == [1, 2, 2, 4]
+        assert ranklist.get_standing_row('c').rank == 2
+        with pytest.raises(HandleNotPresentError):
+            ranklist.get_delta('div1')
+
+
+class TestPredictSubset:
+    async def test_matches_full_prediction(self, ranklist):
+        ranklist.predict(RATINGS)
+        full = ranklist.delta_by_handle
+        await ranklist.predict_subset_async(RATINGS, ['BOB', 'dave'])
+        assert ranklist.delta_by_handle == {'bob': full['bob']}
+        assert ranklist.deltas_status == 'Predicted'
+        assert ranklist.get_delta('alice') is None
+
+
+class TestRestorePrediction:
+    async def test_restores_deltas_and_what_if(self, ranklist, make_contest):
+        await ranklist.predict_async(RATINGS)
+        restored = Ranklist(make_contest(), [], ranklist.standings, 0, is_rated=True)
+        restored.restore_prediction(
+            ranklist.delta_by_handle,
+            ranklist.predicted_rating,
+            ranklist.seed_table.correction,
+        )
+        assert restored.delta_by_handle == ranklist.delta_by_handle
+        assert restored.deltas_status == 'Predicted'
+        assert restored.predict_delta_at_rank('bob', 1) == (
+            ranklist.predict_delta_at_rank('bob', 1)
+        )
+        assert not await restored.repredict_async(RATINGS)
+
+    async def test_recalculates_when_rating_changed(self, ranklist):
+        ranklist.restore_prediction({'alice': 1}, RATINGS)
+        assert ranklist.seed_table is None
+        assert await ranklist.repredict_async({**RATINGS, 'bob': 2000})
@@ -1,8 +1,14 @@
 """Tests for tle.util.ranklist.rating_calculator — only imports numpy."""
 
 from tle.util.ranklist.rating_calculator import (
+    ELO_WIN_PROB,
     CodeforcesRatingCalculator,
     Contestant,
+    SeedTable,
+    calculate_inserted_rating_changes,
+    calculate_rating_changes,
+    calculate_rating_changes_with_seeds,
+    calculate_subset_rating_changes,
     intdiv,
 )
 
@@ -99,3 +105,112 @@ class TestCodeforcesRatingCalculator:
         seed_with = calc.get_seed(1500, me=contestant)
         seed_without = calc.get_seed(1500)
         assert seed_with < seed_without
+
+
+class TestCalculateInsertedRatingChanges:
+    STANDINGS = [
+        (f'user{i}', (i * 7) % 5 * 100, (i * 13) % 30, 1000 + (i * 97) % 2000)
+        for i in range(60)
+    ]
+
+    def test_no_subjects(self):
+        assert calculate_inserted_rating_changes(self.STANDINGS, []) == {}
+
+    def test_matches_individual_predictions(self):
+        subjects = [
+            ('vc1', 400, 5, 1500),
+            ('vc2', 0, 0, 2900),
+            ('vc3', 200, 10, 1200),
+            # Same score and rating as an existing contestant.
+            ('vc4', *self.STANDINGS[3][1:]),
+        ]
+        changes = calculate_inserted_rating_changes(self.STANDINGS, subjects)
+        for subject in subjects:
+            calc = CodeforcesRatingCalculator(self.STANDINGS + [subject])
+            expected = calc.calculate_rating_changes()[subject[0]]
+            assert changes[subject[0]] == expected
+
+    def test_subjects_do_not_affect_each_other(self):
+        alone = calculate_inserted_rating_changes(
+            self.STANDINGS, [('vc1', 300, 0, 1600)]
+        )
+        together = calculate_inserted_rating_changes(
+            self.STANDINGS, [('vc1', 300, 0, 1600), ('vc2', 500, 0, 1600)]
+        )
+        assert together['vc1'] == alone['vc1']
+
+    def test_empty_standings(self):
+        changes = calculate_inserted_rating_changes([], [('vc1', 100, 0, 1500)])
+        expected = CodeforcesRatingCalculator(
+            [('vc1', 100, 0, 1500)]
+        ).calculate_rating_changes()
+        assert changes == expected
+
+
+class TestSeedTable:
+    STANDINGS = TestCalculateInsertedRatingChanges.STANDINGS
+
+    def test_kernel_is_shared(self):
+        calc = CodeforcesRatingCalculator(self.STANDINGS)
+        assert calc.elo_win_prob is ELO_WIN_PROB
+        assert not ELO_WIN_PROB.flags.writeable
+
+    def test_matches_calculator(self):
+        calc = CodeforcesRatingCalculator(self.STANDINGS)
+        table = calc.get_seed_table()
+        for contestant in calc.contestants:
+            assert table.get_seed(1500, contestant.rating) == calc.get_seed(
+                1500, contestant
+            )
+
+    def test_predict_delta_at_current_rank(self):
+        deltas, table = calculate_rating_changes_with_seeds(self.STANDINGS)
+        calc = CodeforcesRatingCalculator(self.STANDINGS)
+        for contestant in calc.contestants:
+            delta = table.predict_delta(
+                contestant.rating, contestant.rank, included=True
+            )
+            assert delta == deltas[contestant.party]
+
+    def test_predict_delta_for_outsider(self):
+        table = SeedTable.from_ratings([row[3] for row in self.STANDINGS])
+        subject = ('new', 250, 0, 1700)
+        rank = 1 + sum(1 for row in self.STANDINGS if row[1] >= subject[1])
+        expected = calculate_inserted_rating_changes(self.STANDINGS, [subject])
+        # The table has no corrections, so compare before them.
+        calc = CodeforcesRatingCalculator(self.STANDINGS + [subject])
+        (me,) = [c for c in calc.contestants if c.party == 'new']
+        delta = table.predict_delta(1700, rank, included=False)
+        assert delta == me.delta - calc.correction
+        assert expected['new'] == me.delta
+
+    def test_better_rank_gives_higher_delta(self):
+        _, table = calculate_rating_changes_with_seeds(self.STANDINGS)
+        assert table.predict_delta(1500, 1, included=True) > table.predict_delta(
+            1500, len(self.STANDINGS), included=True
+        )
+
+
+class TestCalculateSubsetRatingChanges:
+    STANDINGS = TestCalculateInsertedRatingChanges.STANDINGS
+
+    def test_matches_full_calculation(self):
+        full = calculate_rating_changes(self.STANDINGS)
+        handles = ['user0', 'user7', 'user31', 'user59']
+        assert calculate_subset_rating_changes(self.STANDINGS, handles) == {
+            handle: full[handle] for handle in handles
+        }
+
+    def test_everyone(self):
+        handles = [row[0] for row in self.STANDINGS]
+        assert calculate_subset_rating_changes(
+            self.STANDINGS, handles
+        ) == calculate_rating_changes(self.STANDINGS)
+
+    def test_ignores_unknown_handles(self):
+        changes = calculate_subset_rating_changes(self.STANDINGS, ['user1', 'nobody'])
+        assert list(changes) == ['user1']
+
+    def test_empty(self):
+        assert calculate_subset_rating_changes(self.STANDINGS, []) == {}
+        assert calculate_subset_rating_changes([], ['user1']) == {}
@@ -0,0 +1,65 @@
+"""Tests for tle.util.ranklist.replay."""
+
+from tle.util.codeforces_api import RatingChange
+from tle.util.ranklist.rating_calculator import calculate_rating_changes
+from tle.util.ranklist.replay import ContestReplay, replay_contest, summarize
+
+RANKS_AND_RATINGS = [(1, 2100), (2, 1900), (2, 1600), (4, 1500), (5, 0), (6, 1200)]
+
+
+def make_changes(offset=0):
+    standings = [
+        (f'user{i}', -rank, 0, rating or 1500)
+        for i, (rank, rating) in enumerate(RANKS_AND_RATINGS)
+    ]
+    deltas = calculate_rating_changes(standings)
+    return [
+        RatingChange(
+            contestId=1,
+            contestName='Round #1',
+            handle=f'user{i}',
+            rank=rank,
+            ratingUpdateTimeSeconds=1000,
+            oldRating=rating,
+            newRating=rating + deltas[f'user{i}'] + offset,
+        )
+        for i, (rank, rating) in enumerate(RANKS_AND_RATINGS)
+    ]
+
+
+class TestReplayContest:
+    def test_exact_replay(self):
+        result = replay_contest(make_changes())
+        assert result.contest_id == 1
+        assert result.contest_name == 'Round #1'
+        assert result.contestants == 6
+        # The unrated contestant is not compared.
+        assert result.compared == 5
+        assert result.exact == 5
+        assert result.mean_abs_error == 0
+        assert result.max_abs_error == 0
+        assert result.runtime >= 0
+
+    def test_errors(self):
+        result = replay_contest(make_changes(offset=3))
+        assert result.exact == 0
+        assert result.mean_abs_error == 3
+        assert result.max_abs_error == 3
+
+
+class TestSummarize:
+    def test_weighted_by_compared(self):
+        replays = [
+            ContestReplay(1, 'a', 10, 10, 1.0, 3, 5, 0.5),
+            ContestReplay(2, 'b', 30, 30, 3.0, 7, 0, 1.5),
+        ]
+        summary = summarize(replays)
+        assert summary['contests'] == 2
+        assert summary['contestants'] == 40
+        assert summary['mean_abs_error'] == 2.5
+        assert summary['max_abs_error'] == 7
+        assert summary['exact'] == 5
+        assert summary['runtime'] == 2.0
+
+    def test_empty(self):
+        assert summarize([])['mean_abs_error'] == 0.0
@@ -0,0 +1,156 @@
+"""Tests for tle.util.scheduler."""
+
+import time
+from collections import deque
+
+import pytest
+
+from tle.util import codeforces_api as cf, scheduler
+from tle.util.scheduler import RefreshSchedule
+
+get_api_load = cf.get_api_load
+
+
+@pytest.fixture(autouse=True)
+def idle_api(monkeypatch):
+    monkeypatch.setattr(cf, 'get_api_load', lambda: 0.0)
+
+
+class TestDelay:
+    def test_base_delay(self):
+        schedule = RefreshSchedule('test', 60)
+        assert schedule.get_delay() == 60
+        schedule.set_base_delay(120)
+        assert schedule.get_delay() == 120
+
+    def test_clamped(self):
+        schedule = RefreshSchedule('test', 60, min_delay=30, max_delay=90)
+        schedule.set_base_delay(10)
+        assert schedule.get_delay() == 30
+        schedule.set_base_delay(1000)
+        assert schedule.get_delay() == 90
+
+    def test_key_falls_back_to_default(self):
+        schedule = RefreshSchedule('test', 60)
+        schedule.set_base_delay(30, key=1)
+        assert schedule.get_delay(1) == 30
+        assert schedule.get_delay(2) == 60
+
+    def test_api_load(self, monkeypatch):
+        schedule = RefreshSchedule('test', 60)
+        monkeypatch.setattr(cf, 'get_api_load', lambda: 0.9)
+        assert schedule.get_delay() == 120
+        assert RefreshSchedule('test', 60, load_aware=False).get_delay() == 60
+
+
+class TestDemand:
+    def test_idle_and_busy(self):
+        schedule = RefreshSchedule('test', 60, demand_aware=True)
+        schedule.set_base_delay(60, key=1)
+        assert schedule.get_delay(1) == 120
+        schedule.record_demand(1)
+        assert schedule.get_delay(1) == 60
+        for _ in range(4):
+            schedule.record_demand(1)
+        assert schedule.get_demand(1) == 5
+        assert schedule.get_delay(1) == 30
+
+    def test_ignored_unless_demand_aware(self):
+        schedule = RefreshSchedule('test', 60)
+        assert schedule.get_delay() == 60
+
+    def test_window(self):
+        schedule = RefreshSchedule('test', 60, demand_aware=True)
+        schedule.record_demand(1)
+        schedule._demand[1][0] -= 24 * 60 * 60
+        assert schedule.get_demand(1) == 0
+
+
+class TestErrors:
+    def test_exponential_backoff(self):
+        schedule = RefreshSchedule('test', 60, max_delay=300)
+        delays = []
+        for _ in range(5):
+            schedule.record_error()
+            delays.append(schedule.get_delay())
+        assert delays == [60, 120, 240, 300, 300]
+
+    def test_success_resets(self):
+        schedule = RefreshSchedule('test', 60)
+        schedule.record_error()
+        schedule.record_error()
+        schedule.record_success()
+        assert schedule.get_delay() == 60
+
+    def test_per_key(self):
+        schedule = RefreshSchedule('test', 60)
+        schedule.set_base_delay(60, key=1)
+        schedule.set_base_delay(60, key=2)
+        schedule.record_error(1)
+        schedule.record_error(1)
+        assert schedule.get_delay(1) == 120
+        assert schedule.get_delay(2) == 60
+
+
+class TestDue:
+    def test_new_key_is_due(self):
+        schedule = RefreshSchedule('test', 60)
+        schedule.set_base_delay(60, key=1)
+        assert schedule.is_due(1)
+
+    def test_due_after_delay(self):
+        schedule = RefreshSchedule('test', 60)
+        schedule.set_base_delay(60, key=1)
+        schedule.record_success(1)
+        now = time.time()
+        assert not schedule.is_due(1, now + 30)
+        assert schedule.is_due(1, now + 61)
+
+    def test_wait_for_next_key(self):
+        schedule = RefreshSchedule('test', 600, min_delay=0)
+        schedule.set_base_delay(60, key=1)
+        schedule.set_base_delay(300, key=2)
+        schedule.record_success(1)
+        schedule.record_success(2)
+        assert 50 < schedule.get_wait() <= 60
+
+    def test_wait_has_floor(self):
+        schedule = RefreshSchedule('test', 60)
+        schedule.set_base_delay(60, key=1)
+        assert schedule.get_wait() == scheduler._MIN_WAIT
+
+    def test_wait_without_keys(self):
+        assert RefreshSchedule('test', 60).get_wait() == 60
+
+    def test_forget(self):
+        schedule = RefreshSchedule('test', 60)
+        schedule.set_base_delay(60, key=1)
+        schedule.record_error(1)
+        schedule.forget(1)
+        assert schedule.keys == []
+        assert schedule.get_delay(1) == 60
+
+
+class TestMetrics:
+    def test_metrics(self):
+        schedule = RefreshSchedule('test.metrics', 60, demand_aware=True)
+        schedule.set_base_delay(60, key=1)
+        schedule.record_demand(1)
+        schedule.record_error(1)
+        metrics = schedule.get_metrics()
+        assert list(metrics) == [1]
+        assert metrics[1].base_delay == 60
+        assert metrics[1].delay == 60
+        assert metrics[1].demand == 1
+        assert metrics[1].errors == 1
+
+    def test_registered(self):
+        schedule = RefreshSchedule('test.registered', 60)
+        assert schedule in scheduler.get_schedules()
+
+
+class TestApiLoad:
+    def test_counts_recent_queries(self, monkeypatch):
+        now = time.time()
+        monkeypatch.setattr(cf, '_query_times', deque([now - 3600, now - 1, now]))
+        assert get_api_load() == pytest.approx(2 / 60)
@@ -0,0 +1,100 @@
+"""Tests for tle.util.workers."""
+
+import asyncio
+import time
+
+import pytest
+
+from tle.util import workers
+from tle.util.workers import JobTimedOut, WorkerPool, WorkerPoolBusy
+
+
+def _fail():
+    raise ValueError('boom')
+
+
+class TestInlinePool:
+    async def test_runs_job(self):
+        pool = WorkerPool(inline=True)
+        assert await pool.run(sum, [1, 2, 3]) == 6
+        assert not pool.running
+
+    async def test_metrics(self):
+        pool = WorkerPool(inline=True)
+        await pool.run(sum, [1])
+        await pool.run(sum, [2])
+        assert pool.metrics.submitted == 2
+        assert pool.metrics.completed == 2
+        assert pool.metrics.failed == 0
+        assert pool.metrics.pending == 0
+        assert pool.metrics.max_runtime >= pool.metrics.mean_runtime >= 0
+
+    async def test_failure_is_counted_and_raised(self):
+        pool = WorkerPool(inline=True)
+        with pytest.raises(ValueError, match='boom'):
+            await pool.run(_fail)
+        assert pool.metrics.failed == 1
+        assert pool.metrics.completed == 0
+        assert pool.metrics.pending == 0
+
+    async def test_rejects_when_full(self):
+        pool = WorkerPool(inline=True, max_pending=0)
+        with pytest.raises(WorkerPoolBusy):
+            await pool.run(sum, [1])
+        assert pool.metrics.rejected == 1
+        assert pool.metrics.submitted == 0
+
+    def test_mean_runtime_without_jobs(self):
+        assert WorkerPool(inline=True).metrics.mean_runtime == 0.0
+
+
+class TestModulePool:
+    def test_default_workers(self):
+        assert WorkerPool().max_workers == workers._DEFAULT_MAX_WORKERS
+
+    async def test_defaults_to_inline(self):
+        assert workers.get_pool().inline
+        assert await workers.run(max, 1, 2) == 2
+
+
+@pytest.mark.slow
+class TestProcessPool:
+    async def test_runs_job_in_worker(self):
+        pool = WorkerPool(max_workers=1)
+        pool.start()
+        try:
+            assert pool.running
+            assert await pool.run(sum, [1, 2, 3]) == 6
+            assert pool.metrics.completed == 1
+        finally:
+            await pool.shutdown()
+        assert not pool.running
+
+    async def test_timeout(self):
+        pool = WorkerPool(max_workers=1)
+        pool.start()
+        try:
+            # Spawn the worker first, so that the job is running when it times out.
+            await pool.run(sum, [0])
+            with pytest.raises(JobTimedOut):
+                await pool.run(time.sleep, 1, timeout=0.01)
+            assert pool.metrics.timed_out == 1
+            # The job keeps its slot until the worker is done with it.
+            assert pool.metrics.pending == 1
+            while pool.metrics.pending:
+                await asyncio.sleep(0.05)
+            assert await pool.run(sum, [1, 2]) == 3
+        finally:
+            await pool.shutdown()
+
+    async def test_timed_out_jobs_fill_pool(self):
+        pool = WorkerPool(max_workers=1, max_pending=1)
+        pool.start()
+        try:
+            await pool.run(sum, [0])
+            with pytest.raises(JobTimedOut):
+                await pool.run(time.sleep, 1, timeout=0.01)
+            with pytest.raises(WorkerPoolBusy):
+                await pool.run(sum, [1])
+        finally:
+            await pool.shutdown()
@@ -1,5 +1,6 @@
 import argparse
 import asyncio
+import importlib
 import logging
 import os
 from logging.handlers import TimedRotatingFileHandler
@@ -8,13 +9,18 @@ from pathlib import Path
 from typing import Any
 
 import discord
-import seaborn as sns
 from discord.ext import commands
 from dotenv import load_dotenv
-from matplotlib import pyplot as plt
 
 from tle import constants
-from tle.util import codeforces_common as cf_common, db, discord_common
+from tle.util import (
+    codeforces_common as cf_common,
+    db,
+    discord_common,
+    graph_common,
+    plot_cache,
+    workers,
+)
 
 
 def setup() -> None:
@@ -37,14 +43,7 @@ def setup() -> None:
     )
 
     # matplotlib and seaborn
-    plt.rcParams['figure.figsize'] = 7.0, 3.5
-    sns.set()
-    options = {
-        'axes.edgecolor': '#A0A0C5',
-        'axes.spines.top': False,
-        'axes.spines.right': False,
-    }
-    sns.set_style('darkgrid', options)
+    graph_common.setup_style()
 
 
 def strtobool(value: str) -> bool:
@@ -76,6 +75,7 @@ class TLEBot(commands.Bot):
         self.nodb: bool = nodb
         self.oauth_server: Any = None
         self.oauth_state_store: Any = None
+        self.worker_pool: Any = None
 
     async def get_context(
         self, message: discord.Message, *, cls: type | None = None
@@ -87,6 +87,16 @@ class TLEBot(commands.Bot):
         for extension in cogs:
             await self.load_extension(f'tle.cogs.{extension}')
         logging.info(f'Cogs loaded: {", ".join(self.cogs)}')
+        workers.initialize(
+            max_workers=constants.WORKER_COUNT, initializer=graph_common.setup_style
+        )
+        plot_cache.initialize(
+            constants.PLOT_CACHE_DIR,
+            version=plot_cache.get_render_version(
+                graph_common, importlib.import_module('tle.cogs.graphs')
+            ),
+        )
+        self.worker_pool = workers.get_pool()
         await cf_common.initialize(self, self.nodb)
         if constants.OAUTH_CONFIGURED:
             from tle.util.oauth import OAuthServer, OAuthStateStore
@@ -112,6 +122,7 @@ class TLEBot(commands.Bot):
         cf_cache = getattr(self, 'cf_cache', None)
         if cf_cache is not None:
             await cf_cache.conn.close()
+        await workers.shutdown()
         await super().close()
 
 
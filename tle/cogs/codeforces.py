@@ -133,12 +133,13 @@ class Codeforces(commands.Cog):
         submissions = await cf.user.status(handle=handle)
         solved = {sub.problem.name for sub in submissions if sub.verdict == 'OK'}
 
+        get_writers = self.bot.cf_cache.contest_cache.get_writers
         problems = [
             prob
             for prob in self.bot.cf_cache.problem_cache.problems
             if prob.rating == rating
             and prob.name not in solved
-            and not cf_common.is_contest_writer(prob.contestId, handle)
+            and handle.lower() not in get_writers(prob.contestId)
             and prob.matches_all_tags(tags)
             and not prob.matches_any_tag(bantags)
         ]
@@ -179,7 +180,9 @@ class Codeforces(commands.Cog):
         filtered_args = filt.parse(remaining)
         handles = filtered_args or ['!' + str(ctx.author)]
         handles = await cf_common.resolve_handles(ctx, self.converter, handles)
-        all_subs = [await cf.user.status(handle=handle) for handle in handles]
+        handles, all_subs = await cf_common.fetch_for_handles(
+            ctx, handles, cf.user.status
+        )
         submissions = [sub for subs in all_subs for sub in subs]
         submissions = filt.filter_subs(submissions)
 
@@ -237,22 +240,24 @@ class Codeforces(commands.Cog):
 
         handles = handles or ['!' + str(ctx.author)]
         handles = await cf_common.resolve_handles(ctx, self.converter, handles)
-        resp = [await cf.user.status(handle=handle) for handle in handles]
-        submissions = [sub for user in resp for sub in user]
+        # Every handle is needed, so that none gets problems they solved.
+        fetched = await cf_common.gather_for_handles(handles, cf.user.status)
+        if fetched.errors:
+            raise next(iter(fetched.errors.values()))
+        submissions = [sub for user in fetched.results for sub in user]
         solved = {sub.problem.name for sub in submissions}
         info = await cf.user.info(handles=handles)
         rating = int(
             round(sum(user.effective_rating for user in info) / len(handles), -2)
         )
+        get_writers = self.bot.cf_cache.contest_cache.get_writers
+        lowered_handles = {handle.lower() for handle in handles}
         problems = [
             prob
             for prob in self.bot.cf_cache.problem_cache.problems
             if abs(prob.rating - rating) <= 100
             and prob.name not in solved
-            and not any(
-                cf_common.is_contest_writer(prob.contestId, handle)
-                for handle in handles
-            )
+            and lowered_handles.isdisjoint(get_writers(prob.contestId))
             and not cf_common.is_nonstandard_problem(prob)
             and prob.matches_all_tags(tags)
             and not prob.matches_any_tag(bantags)
@@ -314,11 +319,12 @@ class Codeforces(commands.Cog):
             )
         ]
 
+        get_writers = self.bot.cf_cache.contest_cache.get_writers
+
         def check(problem: cf.Problem) -> bool:
-            return not cf_common.is_nonstandard_problem(problem) and (
-                problem.contestId is None
-                or not cf_common.is_contest_writer(problem.contestId, handle)
-            )
+            if cf_common.is_nonstandard_problem(problem):
+                return False
+            return handle.lower() not in get_writers(problem.contestId)
 
         problems = list(filter(check, problems))
         if not problems:
@@ -452,26 +458,27 @@ class Codeforces(commands.Cog):
         info = await cf.user.info(handles=handles)
         contests = self.bot.cf_cache.contest_cache.get_contests_in_phase('FINISHED')
 
+        division = None
         if not markers:
             divr = sum(user.effective_rating for user in info) / len(handles)
-            div1_indicators = ['div1', 'global', 'avito', 'goodbye', 'hello']
-            markers = (
-                ['div3']
-                if divr < 1600
-                else ['div2']
-                if divr < 2100
-                else div1_indicators
-            )
+            if divr < 1600:
+                division = 3
+            elif divr < 2100:
+                division = 2
+            else:
+                division = 1
+                markers = ['global', 'avito', 'goodbye', 'hello']
 
-        recommendations = {
-            contest.id
-            for contest in contests
-            if contest.matches(markers)
-            and not cf_common.is_nonstandard_contest(contest)
-            and not any(
-                cf_common.is_contest_writer(contest.id, handle) for handle in handles
-            )
-        }
+        lowered_handles = {handle.lower() for handle in handles}
+        recommendations = set()
+        for contest in contests:
+            contest_info = self.bot.cf_cache.contest_cache.get_info(contest.id)
+            if (
+                (division in contest_info.divisions or contest_info.matches(markers))
+                and not contest_info.nonstandard
+                and lowered_handles.isdisjoint(contest_info.writers)
+            ):
+                recommendations.add(contest.id)
 
         # Discard contests in which user has non-CE submissions.
         visited_contests = await cf_common.get_visited_contests(handles)
@@ -520,13 +527,12 @@ class Codeforces(commands.Cog):
         tags = [x for x in args if x[0] == '+']
 
         problem_to_contests = self.bot.cf_cache.problemset_cache.problem_to_contests
+        contest_cache = self.bot.cf_cache.contest_cache
         contests = [
             contest
-            for contest in self.bot.cf_cache.contest_cache.get_contests_in_phase(
-                'FINISHED'
-            )
-            if (not tags or contest.matches(tags))
-            and not cf_common.is_nonstandard_contest(contest)
+            for contest in contest_cache.get_contests_in_phase('FINISHED')
+            if (not tags or contest_cache.get_info(contest.id).matches(tags))
+            and not contest_cache.get_info(contest.id).nonstandard
         ]
 
         # subs_by_contest_id contains contest_id mapped to [list of problem.name]
@@ -10,7 +10,6 @@ from typing import Any
 
 import discord
 from discord.ext import commands
-from matplotlib import pyplot as plt
 
 from tle import constants
 from tle.util import (
@@ -24,6 +23,7 @@ from tle.util import (
     ranklist as rl,
     table,
     tasks,
+    workers,
 )
 from tle.util.cache import CacheError, RanklistNotMonitored
 
@@ -118,6 +118,36 @@ async def _send_reminder_at(
     await channel.send(role.mention, embed=embed)
 
 
+def _plot_vc_rating(
+    plot_data: dict[str, list[tuple[dt.datetime, int]]],
+    min_rating: int,
+    max_rating: int,
+) -> bytes:
+    fig, ax = gc.new_figure(ranks=cf.RATED_RANKS)
+    # plot at least from mid gray to mid purple
+    for rating_data in plot_data.values():
+        x, y = zip(*rating_data, strict=False)
+        ax.plot(
+            x,
+            y,
+            linestyle='-',
+            marker='o',
+            markersize=4,
+            markerfacecolor='white',
+            markeredgewidth=0.5,
+        )
+
+    fig.autofmt_xdate()
+
+    ax.set_ylim(min_rating - 100, max_rating + 200)
+    labels = [
+        gc.StrWrap('{} ({})'.format(member_display_name, rating_data[-1][1]))
+        for member_display_name, rating_data in plot_data.items()
+    ]
+    ax.legend(labels, loc='upper left', prop=gc.fontprop)
+    return gc.figure_to_bytes(fig)
+
+
 class Contests(commands.Cog):
     def __init__(self, bot: commands.Bot) -> None:
         self.bot: commands.Bot = bot
@@ -173,7 +203,7 @@ class Contests(commands.Cog):
         self.logger.info('Refreshed cache')
         self.start_time_map.clear()
         for contest in self.future_contests:
-            if not cf_common.is_nonstandard_contest(contest):
+            if not contest_cache.get_info(contest.id).nonstandard:
                 # Exclude non-standard contests from reminders.
                 self.start_time_map[contest.startTimeSeconds].append(contest)
         await self._reschedule_all_tasks()
@@ -596,7 +626,10 @@ class Contests(commands.Cog):
                     f'Contest `{contest.id} | {contest.name}` has not started'
                 )
             ranklist = await self.bot.cf_cache.ranklist_cache.generate_ranklist(
-                contest.id, fetch_changes=True, show_unofficial=not show_official
+                contest.id,
+                fetch_changes=True,
+                show_unofficial=not show_official,
+                handles=handles,
             )
 
         await wait_msg.delete()
@@ -666,6 +699,38 @@ class Contests(commands.Cog):
             ctx=ctx,
         )
 
+    @commands.command(
+        brief='Predict rating change for a hypothetical rank',
+        usage='contest_id rank [handle]',
+    )
+    async def whatif(
+        self, ctx: commands.Context, contest_id: int, rank: int, *args: str
+    ) -> None:
+        """Predicts the rating change of a handle had it finished at the given
+        rank, with everyone else's standing unchanged. The rank is the one shown
+        in the ranklist, and unofficial contestants above it are not counted.
+        Only works for contests whose ranklist is being monitored. Defaults to
+        your own handle."""
+        if rank < 1:
+            raise ContestCogError('Rank must be a positive integer')
+        handles = args or ('!' + str(ctx.author),)
+        (handle,) = await cf_common.resolve_handles(
+            ctx, self.member_converter, handles, maxcnt=1
+        )
+        contest = self.bot.cf_cache.contest_cache.get_contest(contest_id)
+        ranklist = self.bot.cf_cache.ranklist_cache.get_ranklist(
+            contest, show_official=False
+        )
+        rating = self.bot.cf_cache.rating_changes_cache.get_current_rating(
+            handle, default_if_absent=True
+        )
+        delta = ranklist.predict_delta_at_rank(handle, rank, rating)
+        embed = discord_common.embed_neutral(
+            f'`{handle}` would get a rating change of **{delta:+}** for rank '
+            f'{rank} in `{contest.name}`'
+        )
+        await ctx.send(embed=embed)
+
     @commands.command(
         brief='Start a rated vc.', usage='<contest_id> <@user1 @user2 ...>'
     )
@@ -993,31 +1058,10 @@ class Contests(commands.Cog):
                 min_rating = min(min_rating, rating)
                 max_rating = max(max_rating, rating)
 
-        plt.clf()
-        # plot at least from mid gray to mid purple
-        for rating_data in plot_data.values():
-            x, y = zip(*rating_data, strict=False)
-            plt.plot(
-                x,
-                y,
-                linestyle='-',
-                marker='o',
-                markersize=4,
-                markerfacecolor='white',
-                markeredgewidth=0.5,
-            )
-
-        gc.plot_rating_bg(cf.RATED_RANKS)
-        plt.gcf().autofmt_xdate()
-
-        plt.ylim(min_rating - 100, max_rating + 200)
-        labels = [
-            gc.StrWrap('{} ({})'.format(member_display_name, rating_data[-1][1]))
-            for member_display_name, rating_data in plot_data.items()
-        ]
-        plt.legend(labels, loc='upper left', prop=gc.fontprop)
-
-        discord_file = gc.get_current_figure_as_file()
+        image_data = await workers.run(
+            _plot_vc_rating, dict(plot_data), min_rating, max_rating
+        )
+        discord_file = gc.bytes_to_file(image_data)
         embed = discord_common.cf_color_embed(title='VC rating graph')
         discord_common.attach_image(embed, discord_file)
         discord_common.set_author_footer(embed, ctx.author)
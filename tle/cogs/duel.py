@@ -7,7 +7,6 @@ from typing import Any, cast
 
 import discord
 from discord.ext import commands
-from matplotlib import pyplot as plt
 
 from tle import constants
 from tle.util import (
@@ -17,6 +16,7 @@ from tle.util import (
     graph_common as gc,
     paginator,
     table,
+    workers,
 )
 from tle.util.db.user_db_conn import Duel, DuelType, Winner
 
@@ -49,6 +49,37 @@ def rating2rank(rating: int) -> DuelRank | None:
     return None
 
 
+def _plot_duel_rating(
+    plot_data: dict[int, list[tuple[int, int]]],
+    labels: list[gc.StrWrap],
+    time_tick: int,
+) -> bytes:
+    fig, ax = gc.new_figure(ranks=cast(Sequence[cf.Rank], DUEL_RANKS))
+    # plot at least from mid gray to mid purple
+    min_rating = 1350
+    max_rating = 1550
+    for rating_data in plot_data.values():
+        for _tick, r in rating_data:
+            min_rating = min(min_rating, r)
+            max_rating = max(max_rating, r)
+
+        x, y = zip(*rating_data, strict=False)
+        ax.plot(
+            x,
+            y,
+            linestyle='-',
+            marker='o',
+            markersize=2,
+            markerfacecolor='white',
+            markeredgewidth=0.5,
+        )
+
+    ax.set_xlim(0, time_tick - 1)
+    ax.set_ylim(min_rating - 100, max_rating + 100)
+    ax.legend(labels, loc='upper left', prop=gc.fontprop)
+    return gc.figure_to_bytes(fig)
+
+
 class DuelCogError(commands.CommandError):
     pass
 
@@ -344,6 +375,9 @@ class Dueling(commands.Cog):
             for (name,) in await self.bot.user_db.get_duel_problem_names(userid)
         }
 
+        get_writers = self.bot.cf_cache.contest_cache.get_writers
+        lowered_handles = {handle.lower() for handle in handles}
+
         def get_problems(rating: int) -> list[Any]:
             return [
                 prob
@@ -351,10 +385,7 @@ class Dueling(commands.Cog):
                 if prob.rating == rating
                 and prob.name not in solved
                 and prob.name not in seen
-                and not any(
-                    cf_common.is_contest_writer(prob.contestId, handle)
-                    for handle in handles
-                )
+                and lowered_handles.isdisjoint(get_writers(prob.contestId))
                 and not cf_common.is_nonstandard_problem(prob)
                 and prob.matches_all_tags(tags)
                 and not prob.matches_any_tag(bantags)
@@ -970,30 +1001,6 @@ class Dueling(commands.Cog):
         if time_tick == 0:
             raise DuelCogError('Nothing to plot.')
 
-        plt.clf()
-        # plot at least from mid gray to mid purple
-        min_rating = 1350
-        max_rating = 1550
-        for rating_data in plot_data.values():
-            for _tick, r in rating_data:
-                min_rating = min(min_rating, r)
-                max_rating = max(max_rating, r)
-
-            x, y = zip(*rating_data, strict=False)
-            plt.plot(
-                x,
-                y,
-                linestyle='-',
-                marker='o',
-                markersize=2,
-                markerfacecolor='white',
-                markeredgewidth=0.5,
-            )
-
-        gc.plot_rating_bg(cast(Sequence[cf.Rank], DUEL_RANKS))
-        plt.xlim(0, time_tick - 1)
-        plt.ylim(min_rating - 100, max_rating + 100)
-
         labels = [
             gc.StrWrap(
                 '{} ({})'.format(
@@ -1002,9 +1009,10 @@ class Dueling(commands.Cog):
             )
             for duelist, rating_data in plot_data.items()
         ]
-        plt.legend(labels, loc='upper left', prop=gc.fontprop)
-
-        discord_file = gc.get_current_figure_as_file()
+        image_data = await workers.run(
+            _plot_duel_rating, dict(plot_data), labels, time_tick
+        )
+        discord_file = gc.bytes_to_file(image_data)
         embed = discord_common.cf_color_embed(title='Duel rating graph')
         discord_common.attach_image(embed, discord_file)
         discord_common.set_author_footer(embed, ctx.author)
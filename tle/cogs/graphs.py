@@ -1,10 +1,9 @@
-import bisect
 import collections
 import datetime as dt
 import itertools
 import math
 import time
-from collections.abc import Generator, Sequence
+from collections.abc import Awaitable, Callable, Generator, Sequence
 from typing import Any
 
 import discord
@@ -13,11 +12,13 @@ import pandas as pd
 import seaborn as sns
 from discord.ext import commands
 from matplotlib import (
+    artist,
     dates as mdates,
     lines as mlines,
     patches as patches,
-    pyplot as plt,
+    rcParams,
 )
+from matplotlib.axes import Axes
 from matplotlib.ticker import MultipleLocator
 
 from tle import constants
@@ -26,13 +27,18 @@ from tle.util import (
     codeforces_common as cf_common,
     discord_common,
     graph_common as gc,
+    plot_cache,
+    workers,
 )
+from tle.util.cache import ContestRatingChanges, RatingDistribution
 
 pd.plotting.register_matplotlib_converters()
 
 # A user is considered active if the duration since his last contest is not
 # more than this
 CONTEST_ACTIVE_TIME_CUTOFF = 90 * 24 * 60 * 60  # 90 days
+# Scatter plots of visualrank with more points are drawn as an image.
+_VISUALRANK_IMAGE_ABOVE = 10_000
 
 
 class GraphCogError(commands.CommandError):
@@ -50,10 +56,10 @@ def nice_sub_type(types: list[str]) -> list[str]:
 
 
 def _plot_rating(
-    plot_data: Generator[tuple[list[int], list[Any]], None, None], mark: str
+    ax: Axes, plot_data: Generator[tuple[list[int], list[Any]], None, None], mark: str
 ) -> None:
     for ratings, when in plot_data:
-        plt.plot(
+        ax.plot(
             when,
             ratings,
             linestyle='-',
@@ -62,10 +68,11 @@ def _plot_rating(
             markerfacecolor='white',
             markeredgewidth=0.5,
         )
-    gc.plot_rating_bg(cf.RATED_RANKS)
 
 
-def _plot_rating_by_date(resp: list[list[cf.RatingChange]], mark: str = 'o') -> None:
+def _plot_rating_by_date(
+    ax: Axes, resp: list[list[cf.RatingChange]], mark: str = 'o'
+) -> None:
     def gen_plot_data() -> Generator[tuple[list[int], list[dt.datetime]], None, None]:
         for rating_changes in resp:
             ratings: list[int] = []
@@ -77,11 +84,13 @@ def _plot_rating_by_date(resp: list[list[cf.RatingChange]], mark: str = 'o') ->
                 )
             yield (ratings, times)
 
-    _plot_rating(gen_plot_data(), mark)
-    plt.gcf().autofmt_xdate()
+    _plot_rating(ax, gen_plot_data(), mark)
+    ax.figure.autofmt_xdate()
 
 
-def _plot_rating_by_contest(resp: list[list[cf.RatingChange]], mark: str = 'o') -> None:
+def _plot_rating_by_contest(
+    ax: Axes, resp: list[list[cf.RatingChange]], mark: str = 'o'
+) -> None:
     def gen_plot_data() -> Generator[tuple[list[int], list[int]], None, None]:
         for rating_changes in resp:
             ratings: list[int] = []
@@ -93,7 +102,43 @@ def _plot_rating_by_contest(resp: list[list[cf.RatingChange]], mark: str = 'o')
                 index += 1
             yield (ratings, indices)
 
-    _plot_rating(gen_plot_data(), mark)
+    _plot_rating(ax, gen_plot_data(), mark)
+
+
+def _plot_rating_graph(
+    resp: list[list[cf.RatingChange]],
+    handles: Sequence[str],
+    number: bool,
+    zoom: bool,
+) -> bytes:
+    fig, ax = gc.new_figure(ranks=cf.RATED_RANKS)
+    ax.set_prop_cycle(gc.rating_color_cycler)
+    if number:
+        _plot_rating_by_contest(ax, resp)
+    else:
+        _plot_rating_by_date(ax, resp)
+    current_ratings = [
+        rating_changes[-1].newRating if rating_changes else 'Unrated'
+        for rating_changes in resp
+    ]
+    labels = [
+        gc.StrWrap(f'{handle} ({rating})')
+        for handle, rating in zip(handles, current_ratings, strict=False)
+    ]
+    ax.legend(
+        labels, bbox_to_anchor=(0, 1, 1, 0), loc='lower left', mode='expand', ncol=2
+    )
+
+    if not zoom:
+        min_rating = 1100
+        max_rating = 1800
+        for rating_changes in resp:
+            for rating in rating_changes:
+                min_rating = min(min_rating, rating.newRating)
+                max_rating = max(max_rating, rating.newRating)
+        ax.set_ylim(min_rating - 100, max_rating + 200)
+
+    return gc.figure_to_bytes(fig)
 
 
 def _classify_submissions(
@@ -107,7 +152,142 @@ def _classify_submissions(
     return solved_by_type
 
 
+def _plot_solved(
+    handles: Sequence[str],
+    all_ratings: list[list[int | None]],
+    nice_names: list[str],
+    rlo: int,
+    rhi: int,
+) -> bytes:
+    """Plot a histogram of solved problem ratings.
+
+    For a single handle `all_ratings` holds one list per submission type named
+    by `nice_names`, otherwise one list per handle.
+    """
+    fig, ax = gc.new_figure()
+    ax.set_xlabel('Problem rating')
+    ax.set_ylabel('Number solved')
+    if len(handles) == 1:
+        handle = handles[0]
+        labels: list[Any] = [
+            name.format(len(ratings))
+            for name, ratings in zip(nice_names, all_ratings, strict=False)
+        ]
+
+        step = 100
+        # shift the range to center the text
+        hist_bins = list(range(rlo - step // 2, rhi + step // 2 + 1, step))
+        ax.hist(all_ratings, stacked=True, bins=hist_bins, label=labels)
+        total = sum(map(len, all_ratings))
+        ax.legend(
+            title=f'{handle}: {total}',
+            title_fontsize=rcParams['legend.fontsize'],
+            loc='upper right',
+        )
+
+    else:
+        labels = [
+            gc.StrWrap(f'{handle}: {len(ratings)}')
+            for handle, ratings in zip(handles, all_ratings, strict=False)
+        ]
+
+        step = 200 if rhi - rlo > 3000 // len(handles) else 100
+        hist_bins = list(range(rlo - step // 2, rhi + step // 2 + 1, step))
+        ax.hist(all_ratings, bins=hist_bins)
+        ax.legend(labels, loc='upper right')
+
+    return gc.figure_to_bytes(fig)
+
+
+def _plot_hist(
+    handles: Sequence[str],
+    all_times: list[list[dt.datetime]],
+    nice_names: list[str],
+    phase_time: dt.timedelta,
+    time_hi: float,
+) -> bytes:
+    """Plot a histogram of solve times, laid out like `_plot_solved`."""
+    fig, ax = gc.new_figure()
+    ax.set_xlabel('Time')
+    ax.set_ylabel('Number solved')
+    dlo = min(itertools.chain.from_iterable(all_times)).date()
+    dhi = min(
+        dt.datetime.today() + dt.timedelta(days=1),
+        dt.datetime.fromtimestamp(time_hi),
+    ).date()
+    phase_cnt = math.ceil((dhi - dlo) / phase_time)
+    if len(handles) == 1:
+        handle = handles[0]
+        labels: list[Any] = [
+            name.format(len(times))
+            for name, times in zip(nice_names, all_times, strict=False)
+        ]
+        ax.hist(
+            all_times,
+            stacked=True,
+            label=labels,
+            range=(dhi - phase_cnt * phase_time, dhi),
+            bins=min(40, phase_cnt),
+        )
+
+        total = sum(map(len, all_times))
+        ax.legend(
+            title=f'{handle}: {total}',
+            title_fontsize=rcParams['legend.fontsize'],
+        )
+    else:
+        # NOTE: matplotlib ignores labels that begin with _
+        # https://matplotlib.org/api/pyplot_api.html#matplotlib.pyplot.legend
+        # Add zero-width space to work around this
+        labels = [
+            gc.StrWrap(f'{handle}: {len(times)}')
+            for handle, times in zip(handles, all_times, strict=False)
+        ]
+        ax.hist(
+            all_times,
+            range=(dhi - phase_cnt * phase_time, dhi),
+            bins=min(40 // len(handles), phase_cnt),
+        )
+        ax.legend(labels)
+
+    # NOTE: In case of nested list, matplotlib decides type using 1st sublist,
+    # it assumes float when 1st sublist is empty.
+    # Hence explicitly assigning locator and formatter is must here.
+    locator = mdates.AutoDateLocator()
+    ax.xaxis.set_major_locator(locator)
+    ax.xaxis.set_major_formatter(mdates.AutoDateFormatter(locator))
+
+    fig.autofmt_xdate()
+    return gc.figure_to_bytes(fig)
+
+
+def _plot_curve(
+    handles: Sequence[str], all_times: list[list[dt.datetime]], time_hi: float
+) -> bytes:
+    fig, ax = gc.new_figure()
+    ax.set_xlabel('Time')
+    ax.set_ylabel('Cumulative solve count')
+
+    for times in all_times:
+        cumulative_solve_count = list(range(1, len(times) + 1)) + [len(times)]
+        timestretched = times + [
+            min(dt.datetime.now(), dt.datetime.fromtimestamp(time_hi))
+        ]
+        ax.plot(timestretched, cumulative_solve_count)
+
+    labels = [
+        gc.StrWrap(f'{handle}: {len(times)}')
+        for handle, times in zip(handles, all_times, strict=False)
+    ]
+
+    ax.legend(labels)
+
+    fig.autofmt_xdate()
+    return gc.figure_to_bytes(fig)
+
+
 def _plot_scatter(
+    ax: Axes,
     regular: list[tuple[dt.datetime, int | None]],
     practice: list[tuple[dt.datetime, int | None]],
     virtual: list[tuple[dt.datetime, int | None]],
@@ -116,7 +296,7 @@ def _plot_scatter(
     for contest in [practice, regular, virtual]:
         if contest:
             times, ratings = zip(*contest, strict=False)
-            plt.scatter(times, ratings, zorder=10, s=point_size)
+            ax.scatter(times, ratings, zorder=10, s=point_size)
 
 
 def _running_mean(x: list[float], bin_size: int) -> list[float]:
@@ -172,7 +352,7 @@ def _plot_extreme(
     solved: bool,
     unsolved: bool,
     legend: bool,
-) -> None:
+) -> bytes:
     extremes = [
         (
             dt.datetime.fromtimestamp(end_time),
@@ -202,7 +382,7 @@ def _plot_extreme(
     outlinecolor = '#00000022'
 
     def scatter_outline(*args: Any, **kwargs: Any) -> None:
-        plt.scatter(*args, **kwargs)
+        ax.scatter(*args, **kwargs)
         kwargs['zorder'] -= 1
         kwargs['color'] = outlinecolor
         if kwargs['marker'] == '*':
@@ -215,9 +395,9 @@ def _plot_extreme(
             del kwargs['alpha']
         if 'label' in kwargs:
             del kwargs['label']
-        plt.scatter(*args, **kwargs)
+        ax.scatter(*args, **kwargs)
 
-    plt.clf()
+    fig, ax = gc.new_figure(ranks=cf.RATED_RANKS)
     time_scatter, plot_min, plot_max = zip(*regular, strict=False)
     if unsolved:
         scatter_outline(
@@ -240,7 +420,6 @@ def _plot_extreme(
             label='Hardest solved',
         )
 
-    ax = plt.gca()
     if solved and unsolved:
         for t, mn, mx in regular:
             ax.add_line(mlines.Line2D((t, t), (mn, mx), color=linecolor))
@@ -263,17 +442,20 @@ def _plot_extreme(
         )
 
     if legend:
-        plt.legend(
+        ax.legend(
             title=f'{handle}: {rating}',
-            title_fontsize=plt.rcParams['legend.fontsize'],
+            title_fontsize=rcParams['legend.fontsize'],
             loc='upper left',
         ).set_zorder(20)
-    gc.plot_rating_bg(cf.RATED_RANKS)
-    plt.gcf().autofmt_xdate()
+    fig.autofmt_xdate()
+    return gc.figure_to_bytes(fig)
 
 
 def _plot_average(
-    practice: list[tuple[dt.datetime, int | None]], bin_size: int, label: str = ''
+    ax: Axes,
+    practice: list[tuple[dt.datetime, int | None]],
+    bin_size: int,
+    label: str = '',
 ) -> None:
     if len(practice) > bin_size:
         sub_times, ratings = map(list, zip(*practice, strict=False))
@@ -285,7 +467,7 @@ def _plot_average(
         ]
         mean_ratings = _running_mean(ratings, bin_size)
 
-        plt.plot(
+        ax.plot(
             mean_sub_times,
             mean_ratings,
             linestyle='-',
@@ -296,6 +478,443 @@ def _plot_average(
         )
 
 
+def _plot_scatter_graph(
+    regular: list[tuple[dt.datetime, int | None]],
+    practice: list[tuple[dt.datetime, int | None]],
+    virtual: list[tuple[dt.datetime, int | None]],
+    rating_resp: list[list[cf.RatingChange]],
+    point_size: int,
+    bin_size: int,
+    legend: bool,
+    rlo: int,
+    rhi: int,
+) -> bytes:
+    fig, ax = gc.new_figure(ranks=cf.RATED_RANKS)
+    _plot_scatter(ax, regular, practice, virtual, point_size)
+    labels = []
+    if practice:
+        labels.append('Practice')
+    if regular:
+        labels.append('Regular')
+    if virtual:
+        labels.append('Virtual')
+    if legend:
+        ax.legend(
+            labels,
+            bbox_to_anchor=(0, 1, 1, 0),
+            loc='lower left',
+            mode='expand',
+            ncol=3,
+        )
+    _plot_average(ax, practice, bin_size)
+    _plot_rating_by_date(ax, rating_resp, mark='')
+
+    # zoom
+    ymin, ymax = ax.get_ylim()
+    ax.set_ylim(max(ymin, rlo - 100), min(ymax, rhi + 100))
+    return gc.figure_to_bytes(fig)
+
+
+def _plot_rating_hist(histogram: np.ndarray, mode: str, binsize: int) -> bytes:
+    """Plot the number of users per rating bin, `histogram[i]` being the
+    number of ratings from `i * binsize` to just below `(i + 1) * binsize`."""
+    assert histogram.any(), 'Cannot histogram plot empty list of ratings'
+
+    assert 100 % binsize == 0  # because bins is semi-hardcoded
+    bins = len(histogram)
+
+    colors = []
+    low, high = 0, binsize * bins
+    for rank in cf.RATED_RANKS:
+        assert rank.low is not None and rank.high is not None
+        assert rank.color_embed is not None
+        for _r in range(max(rank.low, low), min(rank.high, high), binsize):
+            colors.append('#' + '%06x' % rank.color_embed)
+    assert len(colors) == bins, f'Expected {bins} colors, got {len(colors)}'
+
+    height = histogram.tolist()
+
+    csum = 0
+    cent = [0]
+    users = sum(height)
+    for h in height:
+        csum += h
+        cent.append(round(100 * csum / users))
+
+    x = [k * binsize for k in range(bins)]
+    label = [f'{r} ({c})' for r, c in zip(x, cent, strict=False)]
+
+    left, right = 0, bins - 1
+    while not height[left]:
+        left += 1
+    while not height[right]:
+        right -= 1
+    x = x[left : right + 1]
+    cent = cent[left : right + 1]
+    label = label[left : right + 1]
+    colors = colors[left : right + 1]
+    height = height[left : right + 1]
+
+    fig, ax = gc.new_figure(figsize=(15, 5))
+
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.set_xlim(left * binsize - binsize // 2, right * binsize + binsize // 2)
+    ax.bar(
+        x,
+        height,
+        binsize * 0.9,
+        color=colors,
+        linewidth=0,
+        tick_label=label,
+        log=(mode == 'log'),
+    )
+    ax.set_xlabel('Rating')
+    ax.set_ylabel('Number of users')
+
+    return gc.figure_to_bytes(fig)
+
+
+def _plot_centile(
+    ratings: np.ndarray,
+    users_to_mark: dict[str, tuple[int, float]],
+    zoom: bool,
+    exact: bool,
+) -> bytes:
+    """Plot the percentile curve of the sorted `ratings`."""
+    intervals: list[tuple[int, int]] = [
+        (rank.low, rank.high)
+        for rank in cf.RATED_RANKS
+        if rank.low is not None and rank.high is not None
+    ]
+    colors: list[str] = [
+        rank.color_graph for rank in cf.RATED_RANKS if rank.color_graph is not None
+    ]
+    n = len(ratings)
+    perc = 100 * np.arange(n) / n
+
+    fig, ax = gc.new_figure()
+    ax.plot(ratings, perc, color='#00000099')
+
+    ax.set_xlabel('Rating')
+    ax.set_ylabel('Percentile')
+
+    for pos in ['right', 'top', 'bottom', 'left']:
+        ax.spines[pos].set_visible(False)
+    ax.tick_params(axis='both', which='both', length=0)
+
+    # Color intervals by rank
+    for interval, color in zip(intervals, colors, strict=False):
+        alpha = '99'
+        left, right = interval
+        col = color + alpha
+        rect = patches.Rectangle(
+            (left, -50), right - left, 200, edgecolor='none', facecolor=col
+        )
+        ax.add_patch(rect)
+
+    if users_to_mark:
+        ymin: float = min(point[1] for point in users_to_mark.values())
+        ymax: float = max(point[1] for point in users_to_mark.values())
+        if zoom:
+            ymargin = max(0.5, (ymax - ymin) * 0.1)
+            ymin -= ymargin
+            ymax += ymargin
+        else:
+            ymin = min(-1.5, ymin - 8)
+            ymax = max(101.5, ymax + 8)
+    else:
+        ymin, ymax = -1.5, 101.5
+
+    if users_to_mark and zoom:
+        xmin: float = min(point[0] for point in users_to_mark.values())
+        xmax: float = max(point[0] for point in users_to_mark.values())
+        xmargin = max(20, (xmax - xmin) * 0.1)
+        xmin -= xmargin
+        xmax += xmargin
+    else:
+        xmin, xmax = float(ratings[0]), float(ratings[-1])
+
+    ax.set_xlim(xmin, xmax)
+    ax.set_ylim(ymin, ymax)
+
+    # Mark users in plot
+    for user, point in users_to_mark.items():
+        astr = f'{user} ({round(point[1], 2)})' if exact else user
+        apos = (
+            ('left', 'top') if point[0] <= (xmax + xmin) // 2 else ('right', 'bottom')
+        )
+        ax.annotate(
+            astr,
+            xy=point,
+            xytext=(0, 0),
+            textcoords='offset points',
+            ha=apos[0],
+            va=apos[1],
+        )
+        ax.plot(
+            *point, marker='o', markersize=5, color='red', markeredgecolor='darkred'
+        )
+
+    # Draw tick lines
+    linecolor = '#00000022'
+    inf = 10000
+
+    def horz_line(y: float) -> None:
+        line = mlines.Line2D([-inf, inf], [y, y], color=linecolor)
+        ax.add_line(line)
+
+    def vert_line(x: float) -> None:
+        line = mlines.Line2D([x, x], [-inf, inf], color=linecolor)
+        ax.add_line(line)
+
+    for y in ax.get_yticks():
+        horz_line(y)
+    for x in ax.get_xticks():
+        vert_line(x)
+
+    return gc.figure_to_bytes(fig)
+
+
+def _plot_howgud(deltas: list[list[int]], labels: list[gc.StrWrap]) -> bytes:
+    # shift the [-300, 300] gitgud range to center the text
+    hist_bins = list(range(-300 - 50, 300 + 50 + 1, 100))
+    fig, ax = gc.new_figure()
+    ax.margins(x=0)
+    ax.hist(deltas, bins=hist_bins, rwidth=1)
+    ax.set_xlabel('Problem delta')
+    ax.set_ylabel('Number solved')
+    ax.legend(labels, prop=gc.fontprop)
+    return gc.figure_to_bytes(fig)
+
+
+def _plot_country_counts(country_list: list[str], counts: list[int]) -> bytes:
+    fig, ax = gc.new_figure(figsize=(15, 5))
+    sns.barplot(x=country_list, y=counts, ax=ax)
+
+    # Show counts on top of bars.
+    for p in ax.patches:
+        x = p.get_x() + p.get_width() / 2
+        y = p.get_y() + p.get_height() + 0.5
+        ax.text(
+            x,
+            y,
+            int(p.get_height()),
+            horizontalalignment='center',
+            color='#30304f',
+            fontsize='x-small',
+        )
+
+    ax.tick_params(
+        axis='x',
+        bottom=True,
+        length=4,
+        color=ax.spines['bottom'].get_edgecolor(),
+        labelrotation=40,
+    )
+    artist.setp(ax.get_xticklabels(), horizontalalignment='right')
+    ax.set_xlabel('Country')
+    ax.set_ylabel('Number of members')
+    return gc.figure_to_bytes(fig)
+
+
+def _plot_country_ratings(data: list[list[Any]], column_order: list[str]) -> bytes:
+    color_map = {
+        rating: f'#{cf.rating2rank(rating).color_embed:06x}' for _, rating in data
+    }
+    df = pd.DataFrame(data, columns=['Country', 'Rating'])
+    fig, ax = gc.new_figure()
+    sns.swarmplot(
+        x='Country',
+        y='Rating',
+        hue='Rating',
+        data=df,
+        order=column_order,
+        palette=color_map,
+        ax=ax,
+    )
+    if len(column_order) > 5:
+        # Add ticks and rotate tick labels to avoid overlap.
+        ax.tick_params(
+            axis='x',
+            bottom=True,
+            color=ax.spines['bottom'].get_edgecolor(),
+            labelrotation=30,
+        )
+        artist.setp(ax.get_xticklabels(), horizontalalignment='right')
+    ax.legend().remove()
+    ax.set_xlabel('Country')
+    ax.set_ylabel('Rating')
+    return gc.figure_to_bytes(fig)
+
+
+def _get_visualrank_points(
+    rating_changes: ContestRatingChanges, handles: Sequence[str], zoom: bool
+) -> tuple[
+    np.ndarray,
+    np.ndarray,
+    np.ndarray,
+    dict[str, tuple[int, int]],
+    tuple[int, int],
+    tuple[int, int],
+]:
+    """Return the ranks, deltas and colors of the points of a visualrank plot,
+    the points of `handles` to mark and the limits of the axes."""
+    ranks = rating_changes.ranks
+    deltas = rating_changes.deltas
+    users_to_mark = {}
+    for i in np.flatnonzero(np.isin(rating_changes.handles, list(handles))):
+        users_to_mark[str(rating_changes.handles[i])] = (int(ranks[i]), int(deltas[i]))
+
+    ymargin = 50
+    xmargin = 50
+    if users_to_mark and zoom:
+        xmin = min(point[0] for point in users_to_mark.values())
+        xmax = max(point[0] for point in users_to_mark.values())
+        ymin = min(point[1] for point in users_to_mark.values())
+        ymax = max(point[1] for point in users_to_mark.values())
+    else:
+        ylim = 0
+        if users_to_mark:
+            ylim = max(abs(point[1]) for point in users_to_mark.values())
+        ylim = max(ylim, 200)
+
+        xmin = 0
+        xmax = int(ranks.max())
+        ymin = -ylim
+        ymax = ylim
+
+    shown = (
+        (xmin - xmargin <= ranks)
+        & (ranks <= xmax + xmargin)
+        & (ymin - ymargin <= deltas)
+        & (deltas <= ymax + ymargin)
+    )
+    return (
+        ranks[shown],
+        deltas[shown],
+        gc.rating_colors(rating_changes.old_ratings[shown]),
+        users_to_mark,
+        (xmin - xmargin, xmax + xmargin),
+        (ymin - ymargin, ymax + ymargin),
+    )
+
+
+def _plot_visualrank(
+    title: str,
+    ranks: np.ndarray,
+    delta: np.ndarray,
+    color: np.ndarray,
+    users_to_mark: dict[str, tuple[int, int]],
+    xlim: tuple[float, float],
+    ylim: tuple[float, float],
+) -> bytes:
+    fig, ax = gc.new_figure(figsize=(12, 8))
+    ax.set_title(title)
+    ax.set_xlabel('Rank')
+    ax.set_ylabel('Rating Changes')
+
+    mark_size = 2e4 / len(ranks)
+    ax.set_xlim(*xlim)
+    ax.set_ylim(*ylim)
+    if len(ranks) > _VISUALRANK_IMAGE_ABOVE:
+        # About as wide as the antialiased round markers with their edges.
+        size = math.sqrt(mark_size) + rcParams['lines.linewidth'] / 2
+        gc.scatter_image(ax, ranks, delta, color, size)
+    else:
+        ax.scatter(ranks, delta, s=mark_size, c=color)
+
+    for handle, point in users_to_mark.items():
+        ax.annotate(
+            handle,
+            xy=point,
+            xytext=(0, 0),
+            textcoords='offset points',
+            ha='left',
+            va='bottom',
+            fontsize='large',
+        )
+        ax.plot(*point, marker='o', markersize=5, color='black')
+
+    return gc.figure_to_bytes(fig)
+
+
+def _plot_speed(
+    handles: Sequence[str],
+    all_solved: list[list[tuple[int | None, int, int | None, str]]],
+    add_scatter: bool,
+    use_median: bool,
+    point_size: int,
+) -> bytes:
+    """Plot time spent per problem rating.
+
+    Each entry of `all_solved` lists (contest id, solve time, problem rating,
+    problem index) for every problem solved by the corresponding handle.
+    """
+    fig, ax = gc.new_figure()
+    ax.set_xlabel('Rating')
+    ax.set_ylabel('Minutes spent')
+
+    max_time: float = 0  # for ylim
+
+    for solved in all_solved:
+        scatter_points: list[list[float]] = []  # only matters if +scatter
+
+        solved_by_contest: dict[int | None, list[tuple[int, int | None, str]]] = (
+            collections.defaultdict(list)
+        )
+        for contest_id, solve_time, rating, index in solved:
+            solved_by_contest[contest_id].append((solve_time, rating, index))
+
+        time_by_rating: dict[int | None, list[float]] = collections.defaultdict(list)
+        avg_by_rating: dict[int | None, float] = {}
+        for events in solved_by_contest.values():
+            sorted_events = sorted(events, key=lambda e: e[0])
+            solved_subproblems: dict[str, float] = {}
+            last_ac_time = 0
+
+            for current_ac_time, rating, problem_index in sorted_events:
+                time_to_solve: float = current_ac_time - last_ac_time
+                last_ac_time = current_ac_time
+
+                # If there are subproblems, add total time for previous
+                # subproblems to current one
+                if len(problem_index) == 2 and problem_index[1].isdigit():
+                    time_to_solve += solved_subproblems.get(problem_index[0], 0)
+                    solved_subproblems[problem_index[0]] = time_to_solve
+
+                time_by_rating[rating].append(time_to_solve / 60)  # in minutes
+
+        for rating in time_by_rating.keys():
+            times = time_by_rating[rating]
+            if use_median:
+                avg_by_rating[rating] = float(np.median(times))
+            else:
+                avg_by_rating[rating] = sum(times) / len(times)
+
+            if add_scatter:
+                for t in times:
+                    scatter_points.append([float(rating or 0), t])
+                    max_time = max(max_time, t)
+
+        xs = sorted(avg_by_rating.keys(), key=lambda r: r if r is not None else 0)
+        ys = [avg_by_rating[rating] for rating in xs]
+
+        max_time = max(max_time, max(ys, default=0))
+        ax.plot(xs, ys)
+        if add_scatter:
+            ax.scatter(*zip(*scatter_points, strict=False), s=point_size)
+
+    labels = [gc.StrWrap(handle) for handle in handles]
+    ax.legend(labels)
+    ax.set_ylim(0, max_time + 5)
+
+    # make xticks divisible by 100
+    ticks = ax.get_xticks()
+    base = ticks[1] - ticks[0]
+    ax.get_xaxis().set_major_locator(MultipleLocator(base=max(base // 100 * 100, 100)))
+    return gc.figure_to_bytes(fig)
+
+
 class Graphs(commands.Cog):
     def __init__(self, bot: commands.Bot) -> None:
         self.bot: commands.Bot = bot
@@ -325,7 +944,11 @@ class Graphs(commands.Cog):
         remaining = filt.parse(remaining)
         handles: Sequence[str] = remaining or ('!' + str(ctx.author),)
         handles = await cf_common.resolve_handles(ctx, self.converter, handles)
-        resp = [await cf.user.rating(handle=handle) for handle in handles]
+        handles, resp = await cf_common.fetch_for_handles(ctx, handles, cf.user.rating)
+        data_version = [
+            (len(changes), changes[-1].ratingUpdateTimeSeconds if changes else 0)
+            for changes in resp
+        ]
         resp = [filt.filter_rating_changes(rating_changes) for rating_changes in resp]
 
         if not any(resp):
@@ -351,34 +974,13 @@ class Graphs(commands.Cog):
         if peak:
             resp = [max_prefix(user) for user in resp]
 
-        plt.clf()
-        plt.axes().set_prop_cycle(gc.rating_color_cycler)
-        if number:
-            _plot_rating_by_contest(resp)
-        else:
-            _plot_rating_by_date(resp)
-        current_ratings = [
-            rating_changes[-1].newRating if rating_changes else 'Unrated'
-            for rating_changes in resp
-        ]
-        labels = [
-            gc.StrWrap(f'{handle} ({rating})')
-            for handle, rating in zip(handles, current_ratings, strict=False)
-        ]
-        plt.legend(
-            labels, bbox_to_anchor=(0, 1, 1, 0), loc='lower left', mode='expand', ncol=2
+        key = plot_cache.make_key(
+            'rating', handles, number, zoom, peak, filt.dlo, filt.dhi, data_version
         )
-
-        if not zoom:
-            min_rating = 1100
-            max_rating = 1800
-            for rating_changes in resp:
-                for rating in rating_changes:
-                    min_rating = min(min_rating, rating.newRating)
-                    max_rating = max(max_rating, rating.newRating)
-            plt.ylim(min_rating - 100, max_rating + 200)
-
-        discord_file = gc.get_current_figure_as_file()
+        image_data = await plot_cache.render(
+            key, _plot_rating_graph, resp, handles, number, zoom
+        )
+        discord_file = gc.bytes_to_file(image_data)
         embed = discord_common.cf_color_embed(title='Rating graph on Codeforces')
         discord_common.attach_image(embed, discord_file)
         discord_common.set_author_footer(embed, ctx.author)
@@ -426,11 +1028,16 @@ class Graphs(commands.Cog):
         rating = max(
             ratingchanges, key=lambda change: change.ratingUpdateTimeSeconds
         ).newRating
-        _plot_extreme(
-            handle, rating, packed_contest_subs_problemset, solved, unsolved, legend
+        image_data = await workers.run(
+            _plot_extreme,
+            handle,
+            rating,
+            packed_contest_subs_problemset,
+            solved,
+            unsolved,
+            legend,
         )
-
-        discord_file = gc.get_current_figure_as_file()
+        discord_file = gc.bytes_to_file(image_data)
         embed = discord_common.cf_color_embed(title='Codeforces extremes graph')
         discord_common.attach_image(embed, discord_file)
         discord_common.set_author_footer(embed, ctx.author)
@@ -449,65 +1056,37 @@ class Graphs(commands.Cog):
         remaining = filt.parse(args)
         handles: Sequence[str] = remaining or ('!' + str(ctx.author),)
         handles = await cf_common.resolve_handles(ctx, self.converter, handles)
-        resp = [await cf.user.status(handle=handle) for handle in handles]
-        all_solved_subs = [filt.filter_subs(submissions) for submissions in resp]
+        handles, tables = await cf_common.fetch_for_handles(
+            ctx, handles, self.bot.cf_cache.solved_cache.get
+        )
+        all_solved_subs = [filt.filter_table(table) for table in tables]
 
         if not any(all_solved_subs):
             raise GraphCogError(
                 'There are no problems within the specified parameters.'
             )
 
-        plt.clf()
-        plt.xlabel('Problem rating')
-        plt.ylabel('Number solved')
         if len(handles) == 1:
             # Display solved problem separately by type for a single user.
-            handle, solved_by_type = (
-                handles[0],
-                _classify_submissions(all_solved_subs[0]),
-            )
+            solved_by_type = _classify_submissions(all_solved_subs[0])
             all_ratings = [
                 [sub.problem.rating for sub in solved_by_type[sub_type]]
                 for sub_type in filt.types
             ]
-
-            nice_names = nice_sub_type(filt.types)
-            labels: list[Any] = [
-                name.format(len(ratings))
-                for name, ratings in zip(nice_names, all_ratings, strict=False)
-            ]
-
-            step = 100
-            # shift the range to center the text
-            hist_bins = list(
-                range(filt.rlo - step // 2, filt.rhi + step // 2 + 1, step)
-            )
-            plt.hist(all_ratings, stacked=True, bins=hist_bins, label=labels)
-            total = sum(map(len, all_ratings))
-            plt.legend(
-                title=f'{handle}: {total}',
-                title_fontsize=plt.rcParams['legend.fontsize'],
-                loc='upper right',
-            )
-
         else:
             all_ratings = [
                 [sub.problem.rating for sub in solved_subs]
                 for solved_subs in all_solved_subs
             ]
-            labels = [  # type: ignore[no-redef]
-                gc.StrWrap(f'{handle}: {len(ratings)}')
-                for handle, ratings in zip(handles, all_ratings, strict=False)
-            ]
-
-            step = 200 if filt.rhi - filt.rlo > 3000 // len(handles) else 100
-            hist_bins = list(
-                range(filt.rlo - step // 2, filt.rhi + step // 2 + 1, step)
-            )
-            plt.hist(all_ratings, bins=hist_bins)
-            plt.legend(labels, loc='upper right')
-
-        discord_file = gc.get_current_figure_as_file()
+        image_data = await workers.run(
+            _plot_solved,
+            handles,
+            all_ratings,
+            nice_sub_type(filt.types),
+            filt.rlo,
+            filt.rhi,
+        )
+        discord_file = gc.bytes_to_file(image_data)
         embed = discord_common.cf_color_embed(
             title='Histogram of problems solved on Codeforces'
         )
@@ -539,22 +1118,18 @@ class Graphs(commands.Cog):
         handles = await cf_common.resolve_handles(
             ctx, self.converter, handle_list or ['!' + str(ctx.author)]
         )
-        resp = [await cf.user.status(handle=handle) for handle in handles]
-        all_solved_subs = [filt.filter_subs(submissions) for submissions in resp]
+        handles, tables = await cf_common.fetch_for_handles(
+            ctx, handles, self.bot.cf_cache.solved_cache.get
+        )
+        all_solved_subs = [filt.filter_table(table) for table in tables]
 
         if not any(all_solved_subs):
             raise GraphCogError(
                 'There are no problems within the specified parameters.'
             )
 
-        plt.clf()
-        plt.xlabel('Time')
-        plt.ylabel('Number solved')
         if len(handles) == 1:
-            handle, solved_by_type = (
-                handles[0],
-                _classify_submissions(all_solved_subs[0]),
-            )
+            solved_by_type = _classify_submissions(all_solved_subs[0])
             all_times = [
                 [
                     dt.datetime.fromtimestamp(sub.creationTimeSeconds)
@@ -562,32 +1137,6 @@ class Graphs(commands.Cog):
                 ]
                 for sub_type in filt.types
             ]
-
-            nice_names = nice_sub_type(filt.types)
-            labels: list[Any] = [
-                name.format(len(times))
-                for name, times in zip(nice_names, all_times, strict=False)
-            ]
-
-            dlo = min(itertools.chain.from_iterable(all_times)).date()
-            dhi = min(
-                dt.datetime.today() + dt.timedelta(days=1),
-                dt.datetime.fromtimestamp(filt.dhi),
-            ).date()
-            phase_cnt = math.ceil((dhi - dlo) / phase_time)
-            plt.hist(
-                all_times,
-                stacked=True,
-                label=labels,
-                range=(dhi - phase_cnt * phase_time, dhi),
-                bins=min(40, phase_cnt),
-            )
-
-            total = sum(map(len, all_times))
-            plt.legend(
-                title=f'{handle}: {total}',
-                title_fontsize=plt.rcParams['legend.fontsize'],
-            )
         else:
             all_times = [
                 [
@@ -596,37 +1145,15 @@ class Graphs(commands.Cog):
                 ]
                 for solved_subs in all_solved_subs
             ]
-
-            # NOTE: matplotlib ignores labels that begin with _
-            # https://matplotlib.org/api/pyplot_api.html#matplotlib.pyplot.legend
-            # Add zero-width space to work around this
-            labels = [  # type: ignore[no-redef]
-                gc.StrWrap(f'{handle}: {len(times)}')
-                for handle, times in zip(handles, all_times, strict=False)
-            ]
-
-            dlo = min(itertools.chain.from_iterable(all_times)).date()
-            dhi = min(
-                dt.datetime.today() + dt.timedelta(days=1),
-                dt.datetime.fromtimestamp(filt.dhi),
-            ).date()
-            phase_cnt = math.ceil((dhi - dlo) / phase_time)
-            plt.hist(
-                all_times,
-                range=(dhi - phase_cnt * phase_time, dhi),
-                bins=min(40 // len(handles), phase_cnt),
-            )
-            plt.legend(labels)
-
-        # NOTE: In case of nested list, matplotlib decides type using 1st sublist,
-        # it assumes float when 1st sublist is empty.
-        # Hence explicitly assigning locator and formatter is must here.
-        locator = mdates.AutoDateLocator()
-        plt.gca().xaxis.set_major_locator(locator)
-        plt.gca().xaxis.set_major_formatter(mdates.AutoDateFormatter(locator))
-
-        plt.gcf().autofmt_xdate()
-        discord_file = gc.get_current_figure_as_file()
+        image_data = await workers.run(
+            _plot_hist,
+            handles,
+            all_times,
+            nice_sub_type(filt.types),
+            phase_time,
+            filt.dhi,
+        )
+        discord_file = gc.bytes_to_file(image_data)
         embed = discord_common.cf_color_embed(
             title='Histogram of number of solved problems over time'
         )
@@ -645,38 +1172,22 @@ class Graphs(commands.Cog):
         remaining = filt.parse(args)
         handles: Sequence[str] = remaining or ('!' + str(ctx.author),)
         handles = await cf_common.resolve_handles(ctx, self.converter, handles)
-        resp = [await cf.user.status(handle=handle) for handle in handles]
-        all_solved_subs = [filt.filter_subs(submissions) for submissions in resp]
+        handles, tables = await cf_common.fetch_for_handles(
+            ctx, handles, self.bot.cf_cache.solved_cache.get
+        )
+        all_solved_subs = [filt.filter_table(table) for table in tables]
 
         if not any(all_solved_subs):
             raise GraphCogError(
                 'There are no problems within the specified parameters.'
             )
 
-        plt.clf()
-        plt.xlabel('Time')
-        plt.ylabel('Cumulative solve count')
-
         all_times = [
             [dt.datetime.fromtimestamp(sub.creationTimeSeconds) for sub in solved_subs]
             for solved_subs in all_solved_subs
         ]
-        for times in all_times:
-            cumulative_solve_count = list(range(1, len(times) + 1)) + [len(times)]
-            timestretched = times + [
-                min(dt.datetime.now(), dt.datetime.fromtimestamp(filt.dhi))
-            ]
-            plt.plot(timestretched, cumulative_solve_count)
-
-        labels = [
-            gc.StrWrap(f'{handle}: {len(times)}')
-            for handle, times in zip(handles, all_times, strict=False)
-        ]
-
-        plt.legend(labels)
-
-        plt.gcf().autofmt_xdate()
-        discord_file = gc.get_current_figure_as_file()
+        image_data = await workers.run(_plot_curve, handles, all_times, filt.dhi)
+        discord_file = gc.bytes_to_file(image_data)
         embed = discord_common.cf_color_embed(
             title='Curve of number of solved problems over time'
         )
@@ -717,7 +1228,8 @@ class Graphs(commands.Cog):
         rating_resp = [
             filt.filter_rating_changes(rating_changes) for rating_changes in rating_resp
         ]
-        submissions = filt.filter_subs(await cf.user.status(handle=handle))
+        table = await self.bot.cf_cache.solved_cache.get(handle)
+        submissions = filt.filter_table(table)
 
         def extract_time_and_rating(
             submissions: list[cf.Submission],
@@ -737,31 +1249,19 @@ class Graphs(commands.Cog):
         practice = extract_time_and_rating(solved_by_type['PRACTICE'])
         virtual = extract_time_and_rating(solved_by_type['VIRTUAL'])
 
-        plt.clf()
-        _plot_scatter(regular, practice, virtual, point_size)
-        labels = []
-        if practice:
-            labels.append('Practice')
-        if regular:
-            labels.append('Regular')
-        if virtual:
-            labels.append('Virtual')
-        if legend:
-            plt.legend(
-                labels,
-                bbox_to_anchor=(0, 1, 1, 0),
-                loc='lower left',
-                mode='expand',
-                ncol=3,
-            )
-        _plot_average(practice, bin_size)
-        _plot_rating_by_date(rating_resp, mark='')
-
-        # zoom
-        ymin, ymax = plt.gca().get_ylim()
-        plt.ylim(max(ymin, filt.rlo - 100), min(ymax, filt.rhi + 100))
-
-        discord_file = gc.get_current_figure_as_file()
+        image_data = await workers.run(
+            _plot_scatter_graph,
+            regular,
+            practice,
+            virtual,
+            rating_resp,
+            point_size,
+            bin_size,
+            legend,
+            filt.rlo,
+            filt.rhi,
+        )
+        discord_file = gc.bytes_to_file(image_data)
         embed = discord_common.cf_color_embed(
             title=f'Rating vs solved problem rating for {handle}'
         )
@@ -772,73 +1272,28 @@ class Graphs(commands.Cog):
     async def _rating_hist(
         self,
         ctx: commands.Context,
-        ratings: list[int],
+        get_distribution: Callable[[], Awaitable[RatingDistribution]],
         mode: str,
-        binsize: int,
         title: str,
+        key: str | None = None,
     ) -> None:
+        """Plot a histogram of the distribution returned by `get_distribution`,
+        which is not called if a plot is cached under `key`."""
         if mode not in ('log', 'normal'):
             raise GraphCogError('Mode should be either `log` or `normal`')
 
-        ratings = [r for r in ratings if r >= 0]
-        assert ratings, 'Cannot histogram plot empty list of ratings'
-
-        assert 100 % binsize == 0  # because bins is semi-hardcoded
-        bins = 1 + max(ratings) // binsize
-
-        colors = []
-        low, high = 0, binsize * bins
-        for rank in cf.RATED_RANKS:
-            assert rank.low is not None and rank.high is not None
-            assert rank.color_embed is not None
-            for _r in range(max(rank.low, low), min(rank.high, high), binsize):
-                colors.append('#' + '%06x' % rank.color_embed)
-        assert len(colors) == bins, f'Expected {bins} colors, got {len(colors)}'
-
-        height = [0] * bins
-        for r in ratings:
-            height[r // binsize] += 1
-
-        csum = 0
-        cent = [0]
-        users = sum(height)
-        for h in height:
-            csum += h
-            cent.append(round(100 * csum / users))
-
-        x = [k * binsize for k in range(bins)]
-        label = [f'{r} ({c})' for r, c in zip(x, cent, strict=False)]
-
-        left, right = 0, bins - 1
-        while not height[left]:
-            left += 1
-        while not height[right]:
-            right -= 1
-        x = x[left : right + 1]
-        cent = cent[left : right + 1]
-        label = label[left : right + 1]
-        colors = colors[left : right + 1]
-        height = height[left : right + 1]
-
-        plt.clf()
-        fig = plt.figure(figsize=(15, 5))
-
-        plt.xticks(rotation=45)
-        plt.xlim(left * binsize - binsize // 2, right * binsize + binsize // 2)
-        plt.bar(
-            x,
-            height,
-            binsize * 0.9,
-            color=colors,
-            linewidth=0,
-            tick_label=label,
-            log=(mode == 'log'),
-        )
-        plt.xlabel('Rating')
-        plt.ylabel('Number of users')
-
-        discord_file = gc.get_current_figure_as_file()
-        plt.close(fig)
+        image_data = plot_cache.get(key) if key is not None else None
+        if image_data is None:
+            distribution = await get_distribution()
+            image_data = await workers.run(
+                _plot_rating_hist,
+                distribution.histogram,
+                mode,
+                RatingDistribution.HIST_BINSIZE,
+            )
+            if key is not None:
+                plot_cache.put(key, image_data)
+        discord_file = gc.bytes_to_file(image_data)
 
         embed = discord_common.cf_color_embed(title=title)
         discord_common.attach_image(embed, discord_file)
@@ -855,17 +1310,20 @@ class Graphs(commands.Cog):
                 member, constants.TLE_PURGATORY
             )
 
-        res = await self.bot.user_db.get_cf_users_for_guild(ctx.guild.id)
-        ratings = [
-            cf_user.rating
-            for user_id, cf_user in res
-            if cf_user.rating is not None and not in_purgatory(user_id)
-        ]
+        async def get_distribution() -> RatingDistribution:
+            res = await self.bot.user_db.get_cf_users_for_guild(ctx.guild.id)
+            return RatingDistribution.from_ratings(
+                [
+                    cf_user.rating
+                    for user_id, cf_user in res
+                    if cf_user.rating is not None and not in_purgatory(user_id)
+                ]
+            )
+
         await self._rating_hist(
             ctx,
-            ratings,
+            get_distribution,
             'normal',
-            binsize=100,
             title='Rating distribution of server members',
         )
 
@@ -888,23 +1346,33 @@ class Graphs(commands.Cog):
         if activity not in ['active', 'all']:
             raise GraphCogError('Activity should be either `active` or `all`')
 
-        time_cutoff = (
-            int(time.time()) - CONTEST_ACTIVE_TIME_CUTOFF if activity == 'active' else 0
-        )
-        handles = await (
-            self.bot.cf_cache.rating_changes_cache.get_users_with_more_than_n_contests(
+        rating_changes_cache = self.bot.cf_cache.rating_changes_cache
+        time_cutoff = 0
+        if activity == 'active':
+            # Snapped to the last contest in the window, so that the
+            # distribution and the plot are only computed again once a contest
+            # leaves it or new ratings land.
+            time_cutoff = await rating_changes_cache.get_activity_cutoff(
+                int(time.time()) - CONTEST_ACTIVE_TIME_CUTOFF
+            )
+
+        async def get_distribution() -> RatingDistribution:
+            distribution = await rating_changes_cache.get_rating_distribution(
                 time_cutoff, contest_cutoff
             )
+            if not distribution:
+                raise GraphCogError('No Codeforces users meet the specified criteria')
+            return distribution
+
+        key = plot_cache.make_key(
+            'cfdistrib',
+            mode,
+            contest_cutoff,
+            time_cutoff,
+            rating_changes_cache.data_version,
         )
-        if not handles:
-            raise GraphCogError('No Codeforces users meet the specified criteria')
-
-        ratings = [
-            self.bot.cf_cache.rating_changes_cache.get_current_rating(handle)
-            for handle in handles
-        ]
         title = f'Rating distribution of {activity} Codeforces users ({mode} scale)'
-        await self._rating_hist(ctx, ratings, mode, binsize=100, title=title)
+        await self._rating_hist(ctx, get_distribution, mode, title=title, key=key)
 
     @plot.command(
         brief='Show percentile distribution on codeforces',
@@ -918,22 +1386,8 @@ class Graphs(commands.Cog):
         (zoom, nomarker, exact), remaining = cf_common.filter_flags(
             args, ['+zoom', '+nomarker', '+exact']
         )
-        # Prepare data
-        intervals: list[tuple[int, int]] = [
-            (rank.low, rank.high)
-            for rank in cf.RATED_RANKS
-            if rank.low is not None and rank.high is not None
-        ]
-        colors: list[str] = [
-            rank.color_graph for rank in cf.RATED_RANKS if rank.color_graph is not None
-        ]
-
-        ratings = self.bot.cf_cache.rating_changes_cache.get_all_ratings()
-        ratings = np.array(sorted(ratings))
-        n = len(ratings)
-        perc = 100 * np.arange(n) / n
-
-        users_to_mark = {}
+        rating_changes_cache = self.bot.cf_cache.rating_changes_cache
+        user_ratings = {}
         if not nomarker:
             handles: Sequence[str] = remaining or ('!' + str(ctx.author),)
             handles = await cf_common.resolve_handles(
@@ -944,96 +1398,28 @@ class Graphs(commands.Cog):
             for info in infos:
                 if info.rating is None:
                     raise GraphCogError(f'User `{info.handle}` is not rated')
-                ix = bisect.bisect_left(ratings, info.rating)
-                cent = 100 * ix / len(ratings)
-                users_to_mark[info.handle] = info.rating, cent
-
-        # Plot
-        plt.clf()
-        fig, ax = plt.subplots(1)
-        ax.plot(ratings, perc, color='#00000099')
-
-        plt.xlabel('Rating')
-        plt.ylabel('Percentile')
-
-        for pos in ['right', 'top', 'bottom', 'left']:
-            ax.spines[pos].set_visible(False)
-        ax.tick_params(axis='both', which='both', length=0)
-
-        # Color intervals by rank
-        for interval, color in zip(intervals, colors, strict=False):
-            alpha = '99'
-            left, right = interval
-            col = color + alpha
-            rect = patches.Rectangle(
-                (left, -50), right - left, 200, edgecolor='none', facecolor=col
-            )
-            ax.add_patch(rect)
-
-        if users_to_mark:
-            ymin: float = min(point[1] for point in users_to_mark.values())
-            ymax: float = max(point[1] for point in users_to_mark.values())
-            if zoom:
-                ymargin = max(0.5, (ymax - ymin) * 0.1)
-                ymin -= ymargin
-                ymax += ymargin
-            else:
-                ymin = min(-1.5, ymin - 8)
-                ymax = max(101.5, ymax + 8)
-        else:
-            ymin, ymax = -1.5, 101.5
-
-        if users_to_mark and zoom:
-            xmin: float = min(point[0] for point in users_to_mark.values())
-            xmax: float = max(point[0] for point in users_to_mark.values())
-            xmargin = max(20, (xmax - xmin) * 0.1)
-            xmin -= xmargin
-            xmax += xmargin
-        else:
-            xmin, xmax = float(ratings[0]), float(ratings[-1])
-
-        plt.xlim(xmin, xmax)
-        plt.ylim(ymin, ymax)
-
-        # Mark users in plot
-        for user, point in users_to_mark.items():
-            astr = f'{user} ({round(point[1], 2)})' if exact else user
-            apos = (
-                ('left', 'top')
-                if point[0] <= (xmax + xmin) // 2
-                else ('right', 'bottom')
-            )
-            plt.annotate(
-                astr,
-                xy=point,
-                xytext=(0, 0),
-                textcoords='offset points',
-                ha=apos[0],
-                va=apos[1],
-            )
-            plt.plot(
-                *point, marker='o', markersize=5, color='red', markeredgecolor='darkred'
+                user_ratings[info.handle] = info.rating
+
+        key = plot_cache.make_key(
+            'centile',
+            zoom,
+            exact,
+            sorted(user_ratings.items()),
+            rating_changes_cache.data_version,
+        )
+        image_data = plot_cache.get(key)
+        if image_data is None:
+            distribution = await rating_changes_cache.get_rating_distribution()
+            ratings = distribution.ratings
+            users_to_mark = {
+                handle: (rating, distribution.percentile(rating))
+                for handle, rating in user_ratings.items()
+            }
+            image_data = await workers.run(
+                _plot_centile, ratings, users_to_mark, zoom, exact
             )
-
-        # Draw tick lines
-        linecolor = '#00000022'
-        inf = 10000
-
-        def horz_line(y: float) -> None:
-            line = mlines.Line2D([-inf, inf], [y, y], color=linecolor)
-            ax.add_line(line)
-
-        def vert_line(x: float) -> None:
-            line = mlines.Line2D([x, x], [-inf, inf], color=linecolor)
-            ax.add_line(line)
-
-        for y in ax.get_yticks():
-            horz_line(y)
-        for x in ax.get_xticks():
-            vert_line(x)
-
-        # Discord stuff
-        discord_file = gc.get_current_figure_as_file()
+            plot_cache.put(key, image_data)
+        discord_file = gc.bytes_to_file(image_data)
         embed = discord_common.cf_color_embed(title='Rating/percentile relationship')
         discord_common.attach_image(embed, discord_file)
         discord_common.set_author_footer(embed, ctx.author)
@@ -1045,8 +1431,6 @@ class Graphs(commands.Cog):
         if len(members) > 5:
             raise GraphCogError('Please specify at most 5 gudgitters.')
 
-        # shift the [-300, 300] gitgud range to center the text
-        hist_bins = list(range(-300 - 50, 300 + 50 + 1, 100))
         deltas = [
             [x[0] for x in await self.bot.user_db.howgud(member.id)]
             for member in members
@@ -1056,14 +1440,8 @@ class Graphs(commands.Cog):
             for member, delta in zip(members, deltas, strict=False)
         ]
 
-        plt.clf()
-        plt.margins(x=0)
-        plt.hist(deltas, bins=hist_bins, rwidth=1)
-        plt.xlabel('Problem delta')
-        plt.ylabel('Number solved')
-        plt.legend(labels, prop=gc.fontprop)
-
-        discord_file = gc.get_current_figure_as_file()
+        image_data = await workers.run(_plot_howgud, deltas, labels)
+        discord_file = gc.bytes_to_file(image_data)
         embed = discord_common.cf_color_embed(title='Histogram of gudgitting')
         discord_common.attach_image(embed, discord_file)
         discord_common.set_author_footer(embed, ctx.author)
@@ -1084,97 +1462,48 @@ class Graphs(commands.Cog):
         if len(countries) > max_countries:
             raise GraphCogError(f'At most {max_countries} countries may be specified.')
 
-        users = await self.bot.user_db.get_cf_users_for_guild(ctx.guild.id)
-        counter = collections.Counter(user.country for _, user in users if user.country)
+        stats = await self.bot.user_db.get_guild_stats(ctx.guild.id)
+        counter = stats.country_counts
 
         country_list: Sequence[str] = countries
         if not country_list:
             # list because seaborn complains for tuple.
             country_list, counts = map(list, zip(*counter.most_common(), strict=False))
-            plt.clf()
-            fig = plt.figure(figsize=(15, 5))
-            with sns.axes_style(rc={'xtick.bottom': True}):
-                sns.barplot(x=country_list, y=counts)
-
-            # Show counts on top of bars.
-            ax = plt.gca()
-            for p in ax.patches:
-                x = p.get_x() + p.get_width() / 2
-                y = p.get_y() + p.get_height() + 0.5
-                ax.text(
-                    x,
-                    y,
-                    int(p.get_height()),
-                    horizontalalignment='center',
-                    color='#30304f',
-                    fontsize='x-small',
-                )
-
-            plt.xticks(rotation=40, horizontalalignment='right')
-            ax.tick_params(
-                axis='x', length=4, color=ax.spines['bottom'].get_edgecolor()
+            key = plot_cache.make_key('country', ctx.guild.id, stats.version)
+            image_data = await plot_cache.render(
+                key, _plot_country_counts, country_list, counts
             )
-            plt.xlabel('Country')
-            plt.ylabel('Number of members')
-            discord_file = gc.get_current_figure_as_file()
-            plt.close(fig)
             embed = discord_common.cf_color_embed(
                 title='Distribution of server members by country'
             )
         else:
-            country_list = [c.title() for c in country_list]
+            country_list = list(dict.fromkeys(c.title() for c in country_list))
             data = [
-                [user.country, user.rating]
-                for _, user in users
-                if user.rating and user.country and user.country in country_list
+                [country, rating]
+                for country in country_list
+                for rating in stats.get_ratings(country)
             ]
             if not data:
                 raise GraphCogError(
                     'No rated members from the specified countries are present.'
                 )
 
-            color_map = {
-                rating: f'#{cf.rating2rank(rating).color_embed:06x}'
-                for _, rating in data
-            }
-            df = pd.DataFrame(data, columns=['Country', 'Rating'])
             column_order = sorted(
                 (c for c in country_list if counter[c]),
                 key=lambda c: counter[c],
                 reverse=True,
             )
-            plt.clf()
-            if len(column_order) <= 5:
-                sns.swarmplot(
-                    x='Country',
-                    y='Rating',
-                    hue='Rating',
-                    data=df,
-                    order=column_order,
-                    palette=color_map,
-                )
-            else:
-                # Add ticks and rotate tick labels to avoid overlap.
-                with sns.axes_style(rc={'xtick.bottom': True}):
-                    sns.swarmplot(
-                        x='Country',
-                        y='Rating',
-                        hue='Rating',
-                        data=df,
-                        order=column_order,
-                        palette=color_map,
-                    )
-                plt.xticks(rotation=30, horizontalalignment='right')
-                ax = plt.gca()
-                ax.tick_params(axis='x', color=ax.spines['bottom'].get_edgecolor())
-            plt.legend().remove()
-            plt.xlabel('Country')
-            plt.ylabel('Rating')
-            discord_file = gc.get_current_figure_as_file()
+            key = plot_cache.make_key(
+                'country', ctx.guild.id, sorted(country_list), stats.version
+            )
+            image_data = await plot_cache.render(
+                key, _plot_country_ratings, data, column_order
+            )
             embed = discord_common.cf_color_embed(
                 title='Rating distribution of server members by country'
             )
 
+        discord_file = gc.bytes_to_file(image_data)
         discord_common.attach_image(embed, discord_file)
         discord_common.set_author_footer(embed, ctx.author)
         await ctx.send(embed=embed, file=discord_file)
@@ -1202,7 +1531,18 @@ class Graphs(commands.Cog):
             ctx, self.converter, handles, mincnt=0, maxcnt=20
         )
 
-        rating_changes = await cf.contest.ratingChanges(contest_id=contest_id)
+        rating_changes_cache = self.bot.cf_cache.rating_changes_cache
+        rating_changes = await rating_changes_cache.get_contest_rating_changes(
+            contest_id
+        )
+        contest = self.bot.cf_cache.contest_cache.contest_by_id.get(contest_id)
+        if rating_changes and contest is not None:
+            title = contest.name
+        else:
+            # Not saved yet, or the contest is not cached.
+            api_changes = await cf.contest.ratingChanges(contest_id=contest_id)
+            rating_changes = ContestRatingChanges.from_changes(api_changes)
+            title = api_changes[0].contestName if api_changes else ''
         if in_server:
             guild_handles = set(
                 handle
@@ -1210,81 +1550,42 @@ class Graphs(commands.Cog):
                     ctx.guild.id
                 )
             )
-            rating_changes = [
-                rating_change
-                for rating_change in rating_changes
-                if rating_change.handle in guild_handles
-                or rating_change.handle in handles
-            ]
+            rating_changes = rating_changes.select(
+                np.isin(rating_changes.handles, list(guild_handles | set(handles)))
+            )
 
         if not rating_changes:
             raise GraphCogError(f'No rating changes for contest `{contest_id}`')
 
-        users_to_mark = {}
-        for rating_change in rating_changes:
-            user_delta = rating_change.newRating - rating_change.oldRating
-            if rating_change.handle in handles:
-                users_to_mark[rating_change.handle] = (rating_change.rank, user_delta)
-
-        ymargin = 50
-        xmargin = 50
-        if users_to_mark and zoom:
-            xmin = min(point[0] for point in users_to_mark.values())
-            xmax = max(point[0] for point in users_to_mark.values())
-            ymin = min(point[1] for point in users_to_mark.values())
-            ymax = max(point[1] for point in users_to_mark.values())
-        else:
-            ylim = 0
-            if users_to_mark:
-                ylim = max(abs(point[1]) for point in users_to_mark.values())
-            ylim = max(ylim, 200)
-
-            xmin = 0
-            xmax = max(rating_change.rank for rating_change in rating_changes)
-            ymin = -ylim
-            ymax = ylim
-
-        ranks = []
-        delta = []
-        color = []
-        for rating_change in rating_changes:
-            user_delta = rating_change.newRating - rating_change.oldRating
-
-            if (
-                xmin - xmargin <= rating_change.rank <= xmax + xmargin
-                and ymin - ymargin <= user_delta <= ymax + ymargin
-            ):
-                ranks.append(rating_change.rank)
-                delta.append(user_delta)
-                color.append(cf.rating2rank(rating_change.oldRating).color_graph)
-
-        title = rating_changes[0].contestName
-
-        plt.clf()
-        fig = plt.figure(figsize=(12, 8))
-        plt.title(title)
-        plt.xlabel('Rank')
-        plt.ylabel('Rating Changes')
-
-        mark_size = 2e4 / len(ranks)
-        plt.xlim(xmin - xmargin, xmax + xmargin)
-        plt.ylim(ymin - ymargin, ymax + ymargin)
-        plt.scatter(ranks, delta, s=mark_size, c=color)
-
-        for handle, point in users_to_mark.items():
-            plt.annotate(
-                handle,
-                xy=point,
-                xytext=(0, 0),
-                textcoords='offset points',
-                ha='left',
-                va='bottom',
-                fontsize='large',
-            )
-            plt.plot(*point, marker='o', markersize=5, color='black')
+        ranks, deltas, color, users_to_mark, xlim, ylim = _get_visualrank_points(
+            rating_changes, handles, zoom
+        )
 
-        discord_file = gc.get_current_figure_as_file()
-        plt.close(fig)
+        # Rating changes can still be recomputed for a while after a contest.
+        data_version = (
+            len(rating_changes),
+            int(rating_changes.new_ratings.sum(dtype=np.int64)),
+        )
+        key = plot_cache.make_key(
+            'visualrank',
+            contest_id,
+            ctx.guild.id if in_server else None,
+            zoom,
+            sorted(users_to_mark.items()),
+            data_version,
+        )
+        image_data = await plot_cache.render(
+            key,
+            _plot_visualrank,
+            title,
+            ranks,
+            deltas,
+            color,
+            users_to_mark,
+            xlim,
+            ylim,
+        )
+        discord_file = gc.bytes_to_file(image_data)
 
         embed = discord_common.cf_color_embed(title=title)
         discord_common.attach_image(embed, discord_file)
@@ -1320,83 +1621,28 @@ class Graphs(commands.Cog):
         handles = await cf_common.resolve_handles(
             ctx, self.converter, handle_list or ['!' + str(ctx.author)]
         )
-        resp = [await cf.user.status(handle=handle) for handle in handles]
-        all_solved_subs = [filt.filter_subs(submissions) for submissions in resp]
-
-        plt.clf()
-        plt.xlabel('Rating')
-        plt.ylabel('Minutes spent')
-
-        max_time: float = 0  # for ylim
-
-        for submissions in all_solved_subs:
-            scatter_points: list[list[float]] = []  # only matters if +scatter
-
-            solved_by_contest: dict[int | None, list[tuple[int, int | None, str]]] = (
-                collections.defaultdict(list)
-            )
-            for submission in submissions:
-                # (solve_time, problem rating, problem index) for each solved problem
-                solved_by_contest[submission.contestId].append(
-                    (
-                        submission.relativeTimeSeconds,
-                        submission.problem.rating,
-                        submission.problem.index,
-                    )
+        handles, tables = await cf_common.fetch_for_handles(
+            ctx, handles, self.bot.cf_cache.solved_cache.get
+        )
+        all_solved_subs = [filt.filter_table(table) for table in tables]
+
+        # (solve_time, problem rating, problem index) for each solved problem
+        all_solved = [
+            [
+                (
+                    submission.contestId,
+                    submission.relativeTimeSeconds,
+                    submission.problem.rating,
+                    submission.problem.index,
                 )
-
-            time_by_rating: dict[int | None, list[float]] = collections.defaultdict(
-                list
-            )
-            avg_by_rating: dict[int | None, float] = {}
-            for events in solved_by_contest.values():
-                sorted_events = sorted(events, key=lambda e: e[0])
-                solved_subproblems: dict[str, float] = {}
-                last_ac_time = 0
-
-                for current_ac_time, rating, problem_index in sorted_events:
-                    time_to_solve: float = current_ac_time - last_ac_time
-                    last_ac_time = current_ac_time
-
-                    # If there are subproblems, add total time for previous
-                    # subproblems to current one
-                    if len(problem_index) == 2 and problem_index[1].isdigit():
-                        time_to_solve += solved_subproblems.get(problem_index[0], 0)
-                        solved_subproblems[problem_index[0]] = time_to_solve
-
-                    time_by_rating[rating].append(time_to_solve / 60)  # in minutes
-
-            for rating in time_by_rating.keys():
-                times = time_by_rating[rating]
-                if use_median:
-                    avg_by_rating[rating] = float(np.median(times))
-                else:
-                    avg_by_rating[rating] = sum(times) / len(times)
-
-                if add_scatter:
-                    for t in times:
-                        scatter_points.append([float(rating or 0), t])
-                        max_time = max(max_time, t)
-
-            xs = sorted(avg_by_rating.keys(), key=lambda r: r if r is not None else 0)
-            ys = [avg_by_rating[rating] for rating in xs]
-
-            max_time = max(max_time, max(ys, default=0))
-            plt.plot(xs, ys)
-            if add_scatter:
-                plt.scatter(*zip(*scatter_points, strict=False), s=point_size)
-
-        labels = [gc.StrWrap(handle) for handle in handles]
-        plt.legend(labels)
-        plt.ylim(0, max_time + 5)
-
-        # make xticks divisible by 100
-        ticks = plt.gca().get_xticks()
-        base = ticks[1] - ticks[0]
-        plt.gca().get_xaxis().set_major_locator(
-            MultipleLocator(base=max(base // 100 * 100, 100))
+                for submission in submissions
+            ]
+            for submissions in all_solved_subs
+        ]
+        image_data = await workers.run(
+            _plot_speed, handles, all_solved, add_scatter, use_median, point_size
         )
-        discord_file = gc.get_current_figure_as_file()
+        discord_file = gc.bytes_to_file(image_data)
         title = (
             f'Plot of {"median" if use_median else "average"} time spent on a problem'
         )
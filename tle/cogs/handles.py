@@ -24,6 +24,7 @@ from tle.util import (
     paginator,
     table,
     tasks,
+    workers,
 )
 from tle.util.cache import ContestNotFound
 
@@ -84,8 +85,8 @@ FONTS = [
 
 def get_gudgitters_image(
     rankings: list[tuple[int, str, str, int | None, int]],
-) -> discord.File:
-    """return PIL image for rankings"""
+) -> bytes:
+    """return PNG image data for rankings"""
     SMOKE_WHITE = (250, 250, 250)
     BLACK = (0, 0, 0)
 
@@ -178,9 +179,7 @@ def get_gudgitters_image(
 
     image_data = io.BytesIO()
     surface.write_to_png(image_data)
-    image_data.seek(0)
-    discord_file = discord.File(image_data, filename='gudgitters.png')
-    return discord_file
+    return image_data.getvalue()
 
 
 def _make_profile_embed(
@@ -679,7 +678,8 @@ class Handles(commands.Cog):
                 'No one has completed a gitgud challenge,'
                 ' send ;gitgud to request and ;gotgud to mark it as complete'
             )
-        discord_file = get_gudgitters_image(rankings)
+        image_data = await workers.run(get_gudgitters_image, rankings)
+        discord_file = discord.File(io.BytesIO(image_data), filename='gudgitters.png')
         await ctx.send(file=discord_file)
 
     @handle.command(brief='Show all handles', with_app_command=False)
@@ -690,11 +690,10 @@ class Handles(commands.Cog):
         sourced from codeforces profiles. e.g. ;handle list Croatia Slovenia
         """
         country_list = [country.title() for country in countries]
-        res = await self.bot.user_db.get_cf_users_for_guild(ctx.guild.id)
+        stats = await self.bot.user_db.get_guild_stats(ctx.guild.id)
         users = [
             (ctx.guild.get_member(user_id), cf_user.handle, cf_user.rating)
-            for user_id, cf_user in res
-            if not country_list or cf_user.country in country_list
+            for user_id, cf_user in stats.get_members(country_list or None)
         ]
         users = [
             (member, handle, rating)
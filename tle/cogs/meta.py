@@ -7,6 +7,7 @@ import time
 from discord.ext import commands
 
 from tle import constants
+from tle.util import codeforces_api as cf, plot_cache, scheduler, workers
 from tle.util.codeforces_common import pretty_time_format
 
 
@@ -88,6 +89,60 @@ class Meta(commands.Cog):
             + pretty_time_format(time.time() - self.start_time)
         )
 
+    @meta.command(brief='Print worker pool stats')
+    @commands.has_role(constants.TLE_ADMIN)
+    async def workers(self, ctx: commands.Context) -> None:
+        """Replies with job counts and runtimes of the worker pool."""
+        pool = workers.get_pool()
+        metrics = pool.metrics
+        msg = [
+            f'Mode: {"inline" if pool.inline else "processes"}',
+            f'Pending: {metrics.pending}/{pool.max_pending}',
+            f'Submitted: {metrics.submitted}',
+            f'Completed: {metrics.completed}',
+            f'Failed: {metrics.failed}',
+            f'Timed out: {metrics.timed_out}',
+            f'Rejected: {metrics.rejected}',
+            f'Mean runtime: {metrics.mean_runtime:.2f}s',
+            f'Max runtime: {metrics.max_runtime:.2f}s',
+        ]
+        await ctx.send('```yaml\n' + '\n'.join(msg) + '```')
+
+    @meta.command(brief='Print plot cache stats')
+    @commands.has_role(constants.TLE_ADMIN)
+    async def plots(self, ctx: commands.Context) -> None:
+        """Replies with hit counts and sizes of the rendered plot cache."""
+        cache = plot_cache.get_cache()
+        metrics = cache.metrics
+        msg = [
+            f'Memory hits: {metrics.memory_hits}',
+            f'Disk hits: {metrics.disk_hits}',
+            f'Misses: {metrics.misses}',
+            f'Memory: {metrics.memory_bytes / 2**20:.1f}/'
+            f'{cache.max_memory_bytes / 2**20:.0f} MiB',
+            f'Disk: {metrics.disk_bytes / 2**20:.1f}/'
+            f'{cache.max_disk_bytes / 2**20:.0f} MiB',
+        ]
+        await ctx.send('```yaml\n' + '\n'.join(msg) + '```')
+
+    @meta.command(brief='Print cache refresh intervals')
+    @commands.has_role(constants.TLE_ADMIN)
+    async def schedules(self, ctx: commands.Context) -> None:
+        """Replies with the refresh interval chosen for each cache task and
+        what it depended on."""
+        msg = [f'API load: {cf.get_api_load():.0%}']
+        for schedule in scheduler.get_schedules():
+            msg.append(f'{schedule.name}:')
+            for key, metrics in schedule.get_metrics().items():
+                interval = pretty_time_format(metrics.delay, shorten=True)
+                base = pretty_time_format(metrics.base_delay, shorten=True)
+                line = f'{"all" if key is None else key}: {interval} (base {base}'
+                if schedule.demand_aware:
+                    line += f', demand {metrics.demand}'
+                line += f', errors {metrics.errors})'
+                msg.append(textwrap.indent(line, '  '))
+        await ctx.send('```yaml\n' + '\n'.join(msg) + '```')
+
     @meta.command(brief='Print bot guilds')
     @commands.has_role(constants.TLE_ADMIN)
     async def guilds(self, ctx: commands.Context) -> None:
@@ -7,6 +7,7 @@ LOGS_DIR = Path('logs')
 DB_DIR = DATA_DIR / 'db'
 MISC_DIR = DATA_DIR / 'misc'
 TEMP_DIR = DATA_DIR / 'temp'
+PLOT_CACHE_DIR = TEMP_DIR / 'plots'
 
 USER_DB_FILE_PATH = DB_DIR / 'user.db'
 CACHE_DB_FILE_PATH = DB_DIR / 'cache.db'
@@ -41,6 +42,9 @@ TLE_MODERATOR = _get_role_from_env('TLE_MODERATOR', 'Moderator')
 TLE_TRUSTED = _get_role_from_env('TLE_TRUSTED', 'Trusted')
 TLE_PURGATORY = _get_role_from_env('TLE_PURGATORY', 'Purgatory')
 
+# Number of worker processes that render plots and run other CPU-heavy jobs.
+WORKER_COUNT = int(os.environ.get('WORKER_COUNT', '2'))
+
 _DEFAULT_COLOR = 0xFFAA10
 _DEFAULT_STAR = '\N{WHITE MEDIUM STAR}'
 
@@ -1,16 +1,22 @@
 from tle.util.cache._common import CacheError
 from tle.util.cache.cache_system import CacheSystem
-from tle.util.cache.contest import ContestCacheError, ContestNotFound
+from tle.util.cache.contest import ContestCacheError, ContestInfo, ContestNotFound
 from tle.util.cache.problemset import ProblemsetCacheError, ProblemsetNotCached
 from tle.util.cache.ranklist import RanklistCacheError, RanklistNotMonitored
+from tle.util.cache.rating_changes import ContestRatingChanges, RatingDistribution
+from tle.util.cache.solved import SolvedTable
 
 __all__ = [
     'CacheError',
     'CacheSystem',
     'ContestCacheError',
+    'ContestInfo',
     'ContestNotFound',
+    'ContestRatingChanges',
     'ProblemsetCacheError',
     'ProblemsetNotCached',
     'RanklistCacheError',
     'RanklistNotMonitored',
+    'RatingDistribution',
+    'SolvedTable',
 ]
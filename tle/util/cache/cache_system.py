@@ -6,6 +6,7 @@ from tle.util.cache.problem import ProblemCache
 from tle.util.cache.problemset import ProblemsetCache
 from tle.util.cache.ranklist import RanklistCache
 from tle.util.cache.rating_changes import RatingChangesCache
+from tle.util.cache.solved import SolvedCache
 
 if TYPE_CHECKING:
     from tle.util.db.cache_db_conn import CacheDbConn
@@ -19,6 +20,7 @@ class CacheSystem:
         self.rating_changes_cache = RatingChangesCache(self)
         self.ranklist_cache = RanklistCache(self)
         self.problemset_cache = ProblemsetCache(self)
+        self.solved_cache = SolvedCache(self)
 
     async def run(self) -> None:
         await self.rating_changes_cache.run()
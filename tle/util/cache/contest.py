@@ -1,9 +1,20 @@
 import asyncio
+import json
 import logging
+import re
 import time
+from collections.abc import Iterable
+from dataclasses import dataclass
 from typing import TYPE_CHECKING, Any
 
-from tle.util import codeforces_api as cf, codeforces_common as cf_common, events, tasks
+from tle import constants
+from tle.util import (
+    codeforces_api as cf,
+    codeforces_common as cf_common,
+    events,
+    scheduler,
+    tasks,
+)
 from tle.util.cache._common import CacheError
 
 if TYPE_CHECKING:
@@ -20,6 +31,42 @@ class ContestNotFound(ContestCacheError):
         self.contest_id = contest_id
 
 
+_DIVISION = re.compile(r'div\.?\s*(\d)', re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class ContestInfo:
+    """What commands classify a contest by, derived once per contest."""
+
+    nonstandard: bool
+    # See `cf.normalize_name`.
+    normalized_name: str
+    # Divisions named in the title, e.g. (1, 2) for a Div. 1 + Div. 2 round.
+    divisions: tuple[int, ...]
+    educational: bool
+    # Lowercase handles.
+    writers: frozenset[str]
+
+    @classmethod
+    def of(
+        cls, contest: cf.Contest, writers: frozenset[str] = frozenset()
+    ) -> 'ContestInfo':
+        divisions = {int(division) for division in _DIVISION.findall(contest.name)}
+        return cls(
+            nonstandard=bool(cf_common.is_nonstandard_contest(contest)),
+            normalized_name=cf.normalize_name(contest.name),
+            divisions=tuple(sorted(divisions)),
+            educational='Educational' in contest.name,
+            writers=writers,
+        )
+
+    def matches(self, markers: Iterable[str]) -> bool:
+        """Same as `cf.Contest.matches`."""
+        return any(
+            cf.normalize_name(marker) in self.normalized_name for marker in markers
+        )
+
+
 class ContestCache:
     _NORMAL_CONTEST_RELOAD_DELAY = 30 * 60
     _EXCEPTION_CONTEST_RELOAD_DELAY = 5 * 60
@@ -33,6 +80,8 @@ class ContestCache:
 
         self.contests: list[cf.Contest] = []
         self.contest_by_id: dict[int, cf.Contest] = {}
+        self.info_by_id: dict[int, ContestInfo] = {}
+        self.writers_by_id: dict[int, frozenset[str]] = {}
         self.contests_by_phase: dict[str, list[cf.Contest]] = {
             phase: [] for phase in cf.CONTEST_PHASES
         }
@@ -41,11 +90,20 @@ class ContestCache:
 
         self.reload_lock = asyncio.Lock()
         self.reload_exception: Exception | None = None
-        self.next_delay: float = self._NORMAL_CONTEST_RELOAD_DELAY
+        # The delay follows the contest phases and is not stretched under API
+        # load, since the other caches rely on this one to learn of new phases.
+        self.schedule = scheduler.RefreshSchedule(
+            'ContestCacheUpdate',
+            self._NORMAL_CONTEST_RELOAD_DELAY,
+            min_delay=0,
+            max_delay=self._NORMAL_CONTEST_RELOAD_DELAY,
+            load_aware=False,
+        )
 
         self.logger = logging.getLogger(self.__class__.__name__)
 
     async def run(self) -> None:
+        self._load_writers()
         await self._try_disk()
         assert isinstance(self._update_task, tasks.Task)
         self._update_task.start()
@@ -69,6 +127,40 @@ class ContestCache:
         except KeyError:
             raise ContestNotFound(contest_id)
 
+    def get_info(self, contest_id: int) -> ContestInfo:
+        try:
+            return self.info_by_id[contest_id]
+        except KeyError:
+            raise ContestNotFound(contest_id)
+
+    def get_info_of(self, contest: cf.Contest) -> ContestInfo:
+        """Return the info of `contest`, which is not required to be
+        cached."""
+        info = self.info_by_id.get(contest.id)
+        if info is None:
+            info = ContestInfo.of(contest, self.get_writers(contest.id))
+        return info
+
+    def get_writers(self, contest_id: int | None) -> frozenset[str]:
+        """Return the lowercase handles of the writers of a contest, which is
+        not required to be cached."""
+        if contest_id is None:
+            return frozenset()
+        return self.writers_by_id.get(contest_id, frozenset())
+
+    def _load_writers(self) -> None:
+        try:
+            with open(constants.CONTEST_WRITERS_JSON_FILE_PATH) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            self.logger.warning('JSON file containing contest writers not found')
+            return
+        self.writers_by_id = {
+            contest['id']: frozenset(s.lower() for s in contest['writers'])
+            for contest in data
+        }
+        self.logger.info('Contest writers loaded from JSON file')
+
     async def get_problemset(self, contest_id: int) -> list[cf.Problem]:
         return await self.cache_master.conn.get_problemset_from_contest(contest_id)
 
@@ -77,7 +169,9 @@ class ContestCache:
 
     async def _try_disk(self) -> None:
         async with self.reload_lock:
-            contests = await self.cache_master.conn.fetch_contests()
+            contests = [
+                contest async for contest in self.cache_master.conn.iter_contests()
+            ]
             if not contests:
                 self.logger.info('Contest cache on disk is empty.')
                 return
@@ -86,17 +180,19 @@ class ContestCache:
     @tasks.task_spec(name='ContestCacheUpdate')
     async def _update_task(self, _: Any) -> None:
         async with self.reload_lock:
-            self.next_delay = await self._reload_contests()
+            self.schedule.set_base_delay(await self._reload_contests())
+        self.schedule.record_success()
         self.reload_exception = None
 
     @_update_task.waiter()
     async def _update_task_waiter(self) -> None:
-        await asyncio.sleep(self.next_delay)
+        await self.schedule.wait()
 
     @_update_task.exception_handler()
     async def _update_task_exception_handler(self, ex: Exception) -> None:
         self.reload_exception = ex
-        self.next_delay = self._EXCEPTION_CONTEST_RELOAD_DELAY
+        self.schedule.set_base_delay(self._EXCEPTION_CONTEST_RELOAD_DELAY)
+        self.schedule.record_error()
 
     async def _reload_contests(self) -> float:
         contests = await cf.contest.to_list()
@@ -118,9 +214,13 @@ class ContestCache:
         }
         contests_by_phase['_RUNNING'] = []
         contest_by_id: dict[int, cf.Contest] = {}
+        info_by_id: dict[int, ContestInfo] = {}
         for contest in contests:
             contests_by_phase[contest.phase].append(contest)
             contest_by_id[contest.id] = contest
+            info_by_id[contest.id] = ContestInfo.of(
+                contest, self.get_writers(contest.id)
+            )
             if contest.phase in self._RUNNING_PHASES:
                 contests_by_phase['_RUNNING'].append(contest)
 
@@ -143,6 +243,7 @@ class ContestCache:
         self.contests = contests
         self.contests_by_phase = contests_by_phase
         self.contest_by_id = contest_by_id
+        self.info_by_id = info_by_id
         self.contests_last_cache = time.time()
 
         cf_common.event_sys.dispatch(events.ContestListRefresh, self.contests.copy())
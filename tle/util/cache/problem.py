@@ -44,12 +44,16 @@ class ProblemCache:
 
     async def _try_disk(self) -> None:
         async with self.reload_lock:
-            problems = await self.cache_master.conn.fetch_problems()
+            problems: list[cf.Problem] = []
+            problem_by_name: dict[str, cf.Problem] = {}
+            async for problem in self.cache_master.conn.iter_problems():
+                problems.append(problem)
+                problem_by_name[problem.name] = problem
             if not problems:
                 self.logger.info('Problem cache on disk is empty.')
                 return
             self.problems = problems
-            self.problem_by_name = {problem.name: problem for problem in problems}
+            self.problem_by_name = problem_by_name
             self.logger.info(f'{len(self.problems)} problems fetched from disk')
 
     @tasks.task_spec(
@@ -4,7 +4,7 @@ import time
 from collections import defaultdict
 from typing import TYPE_CHECKING, Any
 
-from tle.util import codeforces_api as cf, tasks
+from tle.util import codeforces_api as cf, scheduler, tasks
 from tle.util.cache._common import CacheError
 from tle.util.cache.contest import ContestNotFound
 
@@ -32,6 +32,9 @@ class ProblemsetCache:
         )
         self.cache_master = cache_master
         self.update_lock = asyncio.Lock()
+        self.schedule = scheduler.RefreshSchedule(
+            'ProblemsetCacheUpdate', self._RELOAD_DELAY, max_delay=6 * 60 * 60
+        )
         self.logger = logging.getLogger(self.__class__.__name__)
 
     async def run(self) -> None:
@@ -61,9 +64,7 @@ class ProblemsetCache:
             await self._save_problems(problemsets)
             return len(problemsets)
 
-    @tasks.task_spec(
-        name='ProblemsetCacheUpdate', waiter=tasks.Waiter.fixed_delay(_RELOAD_DELAY)
-    )
+    @tasks.task_spec(name='ProblemsetCacheUpdate')
     async def _update_task(self, _: Any) -> None:
         async with self.update_lock:
             contests = self.cache_master.contest_cache.contests_by_phase['FINISHED']
@@ -74,6 +75,15 @@ class ProblemsetCache:
                 f'{len(new_problems)} new problems saved and'
                 f' {len(updated_problems)} saved problems updated.'
             )
+        self.schedule.record_success()
+
+    @_update_task.waiter()
+    async def _update_task_waiter(self) -> float:
+        return await self.schedule.wait()
+
+    @_update_task.exception_handler()
+    async def _update_task_exception_handler(self, ex: Exception) -> None:
+        self.schedule.record_error()
 
     async def _fetch_problemsets(
         self, contests: list[cf.Contest], *, force_fetch: bool = False
@@ -134,14 +144,21 @@ class ProblemsetCache:
         return problemset
 
     async def _update_from_disk(self) -> None:
-        self.problems = await self.cache_master.conn.fetch_problems2()
-        self.problem_to_contests = defaultdict(list)
-        for problem in self.problems:
+        # Built aside and swapped in at the end, since the cache can be read
+        # between batches.
+        problems: list[cf.Problem] = []
+        problem_to_contests: defaultdict[tuple[str, int | None], list[int]] = (
+            defaultdict(list)
+        )
+        async for problem in self.cache_master.conn.iter_problems2():
+            problems.append(problem)
             try:
                 if problem.contestId is None:
                     continue
                 contest = self.cache_master.contest_cache.get_contest(problem.contestId)
                 problem_id = (problem.name, contest.startTimeSeconds)
-                self.problem_to_contests[problem_id].append(contest.id)
+                problem_to_contests[problem_id].append(contest.id)
             except ContestNotFound:
                 pass
+        self.problems = problems
+        self.problem_to_contests = problem_to_contests
@@ -2,8 +2,16 @@ import logging
 import time
 from typing import TYPE_CHECKING, Any
 
-from tle.util import codeforces_api as cf, codeforces_common as cf_common, events, tasks
+from tle.util import (
+    codeforces_api as cf,
+    codeforces_common as cf_common,
+    events,
+    scheduler,
+    tasks,
+    workers,
+)
 from tle.util.cache._common import CacheError, _is_blacklisted, getUsersEffectiveRating
+from tle.util.db.cache_db_conn import RanklistEncoder
 from tle.util.ranklist import Ranklist
 
 if TYPE_CHECKING:
@@ -22,20 +30,47 @@ class RanklistNotMonitored(RanklistCacheError):
 
 class RanklistCache:
     _RELOAD_DELAY = 2 * 60
+    # Standings rarely change once system tests are over.
+    _FINISHED_RELOAD_DELAY = 5 * 60
+    # Monitored ranklists are saved at most this often, and only if they
+    # changed since.
+    _SAVE_DELAY = 10 * 60
 
     def __init__(self, cache_master: 'CacheSystem') -> None:
         self.cache_master = cache_master
         self.monitored_contests: list[cf.Contest] = []
         self.ranklist_by_contest: dict[int, Ranklist] = {}
+        # The deltas last saved for each contest, to only save them again
+        # after they were recalculated.
+        self._saved_deltas: dict[int, dict[str, int]] = {}
+        # When and at which standings version each ranklist was last saved.
+        self._saved_standings: dict[int, tuple[float, int]] = {}
+        self._encoders: dict[int, RanklistEncoder] = {}
+        # Contests dropped while the monitor task was fetching, whose fetched
+        # ranklists must not be put back.
+        self._dropped_during_fetch: set[int] = set()
+        # One key per monitored contest, contests that are asked for more
+        # often are refreshed more often.
+        self.schedule = scheduler.RefreshSchedule(
+            'RanklistCacheUpdate.MonitorActiveContests',
+            self._RELOAD_DELAY,
+            min_delay=60,
+            max_delay=10 * 60,
+            demand_aware=True,
+        )
         self.logger = logging.getLogger(self.__class__.__name__)
 
     async def run(self) -> None:
+        await self._load_saved_ranklists()
         assert isinstance(self._update_task, tasks.Task)
         self._update_task.start()
+        assert isinstance(self._expire_task, tasks.Task)
+        self._expire_task.start()
 
     def get_ranklist(self, contest: cf.Contest, show_official: bool) -> Ranklist:
         if show_official or contest.id not in self.ranklist_by_contest:
             raise RanklistNotMonitored(contest)
+        self.schedule.record_demand(contest.id)
         return self.ranklist_by_contest[contest.id]
 
     @tasks.task_spec(
@@ -57,19 +92,15 @@ class RanklistCache:
         to_monitor = running_contests + finished_contests
         cur_ids = {contest.id for contest in self.monitored_contests}
         new_ids = {contest.id for contest in to_monitor}
+        await self._drop_ranklists(keep_ids=new_ids)
         if new_ids != cur_ids:
             assert isinstance(self._monitor_task, tasks.Task)
             await self._monitor_task.stop()
             if to_monitor:
                 self.monitored_contests = to_monitor
                 self._monitor_task.start()
-            else:
-                self.ranklist_by_contest = {}
 
-    @tasks.task_spec(
-        name='RanklistCacheUpdate.MonitorActiveContests',
-        waiter=tasks.Waiter.fixed_delay(_RELOAD_DELAY),
-    )
+    @tasks.task_spec(name='RanklistCacheUpdate.MonitorActiveContests')
     async def _monitor_task(self, _: Any) -> None:
         cache = self.cache_master.rating_changes_cache
         self.monitored_contests = [
@@ -82,16 +113,159 @@ class RanklistCache:
             )
         ]
 
+        monitored_ids = {contest.id for contest in self.monitored_contests}
+        await self._drop_ranklists(keep_ids=monitored_ids)
+        for contest_id in self.schedule.keys:
+            if contest_id not in monitored_ids:
+                self.schedule.forget(contest_id)
         if not self.monitored_contests:
-            self.ranklist_by_contest = {}
             self.logger.info('No more active contests for which to monitor ranklists.')
             assert isinstance(self._monitor_task, tasks.Task)
             await self._monitor_task.stop()
             return
 
-        ranklist_by_contest = await self._fetch(self.monitored_contests)
+        contest_by_id = self.cache_master.contest_cache.contest_by_id
+        for contest in self.monitored_contests:
+            phase = contest_by_id.get(contest.id, contest).phase
+            self.schedule.set_base_delay(
+                self._FINISHED_RELOAD_DELAY
+                if phase == 'FINISHED'
+                else self._RELOAD_DELAY,
+                contest.id,
+            )
+        due_contests = [
+            contest
+            for contest in self.monitored_contests
+            if self.schedule.is_due(contest.id)
+        ]
+        self._dropped_during_fetch.clear()
+        ranklist_by_contest = await self._fetch(due_contests)
         for contest_id, ranklist in ranklist_by_contest.items():
+            if contest_id in self._dropped_during_fetch:
+                continue
             self.ranklist_by_contest[contest_id] = ranklist
+            saved_time, _ = self._saved_standings.get(contest_id, (0, 0))
+            if time.time() - saved_time >= self._SAVE_DELAY:
+                await self._save_ranklist(ranklist)
+
+    @_monitor_task.waiter()
+    async def _monitor_task_waiter(self) -> float:
+        return await self.schedule.wait()
+
+    @tasks.task_spec(
+        name='RanklistCacheExpire',
+        waiter=tasks.Waiter.for_event(events.RatingChangesUpdate),
+    )
+    async def _expire_task(self, event: events.RatingChangesUpdate) -> None:
+        """Drop the ranklist of a contest once its final rating changes are out."""
+        contest_id = event.contest.id
+        await self._drop_ranklist(contest_id)
+        await self._expire_predictions(contest_id)
+
+    async def _expire_predictions(self, contest_id: int) -> None:
+        """Log how far off the predicted deltas of a contest with final rating
+        changes were, and delete them."""
+        conn = self.cache_master.conn
+        errors = await conn.get_prediction_errors(contest_id)
+        if errors:
+            abs_errors = [abs(predicted - actual) for _, predicted, actual in errors]
+            self.logger.info(
+                f'Predicted deltas for contest {contest_id}: '
+                f'{len(errors)} compared, '
+                f'{abs_errors.count(0)} exact, '
+                f'mean abs error {sum(abs_errors) / len(errors):.3f}, '
+                f'max abs error {max(abs_errors)}'
+            )
+        await conn.clear_predicted_rating_changes(contest_id)
+
+    async def _load_saved_ranklists(self) -> None:
+        """Load the ranklists saved before a restart, along with their
+        predicted deltas, unless the contest has final rating changes by now."""
+        conn = self.cache_master.conn
+        for saved in await conn.fetch_ranklists():
+            contest_id = saved.contest.id
+            if await conn.has_rating_changes_saved(contest_id):
+                await conn.clear_ranklist(contest_id)
+                await self._expire_predictions(contest_id)
+                continue
+            ranklist = Ranklist(
+                saved.contest,
+                saved.problems,
+                saved.standings,
+                saved.fetch_time,
+                is_rated=saved.is_rated,
+            )
+            predictions = await conn.get_predicted_rating_changes(contest_id)
+            if saved.is_rated and predictions:
+                ranklist.restore_prediction(
+                    {handle: delta for handle, _, delta in predictions},
+                    {handle: rating for handle, rating, _ in predictions},
+                    saved.correction,
+                )
+                assert ranklist.delta_by_handle is not None
+                self._saved_deltas[contest_id] = ranklist.delta_by_handle
+            self.ranklist_by_contest[contest_id] = ranklist
+            self.logger.info(
+                f'Ranklist for contest {contest_id} loaded, '
+                f'fetched at {saved.fetch_time:.0f}'
+            )
+
+    async def _save_ranklist(self, ranklist: Ranklist) -> None:
+        """Save a monitored ranklist if its standings changed since they were
+        last saved, and its predicted deltas if they changed."""
+        conn = self.cache_master.conn
+        contest_id = ranklist.contest.id
+        _, saved_version = self._saved_standings.get(contest_id, (0, 0))
+        if ranklist.standings_version != saved_version:
+            correction = (
+                ranklist.seed_table.correction
+                if ranklist.seed_table is not None
+                else None
+            )
+            await conn.save_ranklist(
+                ranklist.contest,
+                ranklist.problems,
+                ranklist.standings,
+                ranklist.fetch_time,
+                ranklist.is_rated,
+                correction,
+                encoder=self._encoders.setdefault(contest_id, RanklistEncoder()),
+            )
+        self._saved_standings[contest_id] = (time.time(), ranklist.standings_version)
+
+        deltas = ranklist.delta_by_handle
+        predicted_rating = ranklist.predicted_rating
+        if (
+            ranklist.deltas_status != 'Predicted'
+            or deltas is None
+            or predicted_rating is None
+            or deltas is self._saved_deltas.get(contest_id)
+        ):
+            return
+        await conn.save_predicted_rating_changes(
+            contest_id,
+            [
+                (handle, predicted_rating[handle], delta)
+                for handle, delta in deltas.items()
+            ],
+            ranklist.fetch_time,
+        )
+        self._saved_deltas[contest_id] = deltas
+
+    async def _drop_ranklist(self, contest_id: int) -> None:
+        """Forget the ranklist of a contest. Its predicted deltas stay saved
+        until its final rating changes are out."""
+        self.ranklist_by_contest.pop(contest_id, None)
+        self._saved_deltas.pop(contest_id, None)
+        self._saved_standings.pop(contest_id, None)
+        self._encoders.pop(contest_id, None)
+        self._dropped_during_fetch.add(contest_id)
+        await self.cache_master.conn.clear_ranklist(contest_id)
+
+    async def _drop_ranklists(self, keep_ids: set[int]) -> None:
+        for contest_id in list(self.ranklist_by_contest):
+            if contest_id not in keep_ids:
+                await self._drop_ranklist(contest_id)
 
     @staticmethod
     async def _get_contest_details(
@@ -135,9 +309,44 @@ class RanklistCache:
 
         return ranklist
 
+    async def _get_current_rating(
+        self, contest: cf.Contest, standings_official: list[cf.RanklistRow]
+    ) -> dict[str, int] | None:
+        """Return the ratings to predict deltas from, or None if the contest
+        cannot be predicted."""
+        info = self.cache_master.contest_cache.get_info_of(contest)
+        has_teams = any(row.party.teamId is not None for row in standings_official)
+        if info.nonstandard or has_teams:
+            return None
+
+        current_rating = await getUsersEffectiveRating(activeOnly=False)
+        current_rating = {
+            row.party.members[0].handle: current_rating.get(
+                row.party.members[0].handle, 1500
+            )
+            for row in standings_official
+        }
+        if info.educational:
+            current_rating = {
+                handle: rating
+                for handle, rating in current_rating.items()
+                if rating < 2100
+            }
+        return current_rating
+
     async def _get_ranklist_with_predicted_changes(
-        self, contest_id: int, show_unofficial: bool
+        self,
+        contest_id: int,
+        show_unofficial: bool,
+        previous: Ranklist | None = None,
+        handles: list[str] | None = None,
     ) -> Ranklist:
+        """Fetch the ranklist and predict rating changes.
+
+        If `previous` is an earlier ranklist of the same contest, it is updated
+        in place and deltas are only recalculated if the rated standings moved.
+        If `handles` is given, only those handles get a delta.
+        """
         contest, problems, standings = await self._get_contest_details(
             contest_id, show_unofficial
         )
@@ -149,25 +358,32 @@ class RanklistCache:
         else:
             _, _, standings_official = await cf.contest.standings(contest_id=contest_id)
 
-        has_teams = any(row.party.teamId is not None for row in standings_official)
-        if cf_common.is_nonstandard_contest(contest) or has_teams:
-            ranklist = Ranklist(contest, problems, standings, now, is_rated=False)
+        current_rating = await self._get_current_rating(contest, standings_official)
+        is_rated = current_rating is not None
+        if previous is not None and previous.is_rated == is_rated:
+            diff, repredicted = await previous.update_standings_async(
+                contest, problems, standings, now, current_rating
+            )
+            self.logger.info(
+                f'Ranklist refreshed for contest {contest_id}: '
+                f'{diff.unchanged} rows unchanged, {diff.changed} changed, '
+                f'{diff.added} added, {diff.removed} removed, '
+                f'deltas {"recalculated" if repredicted else "reused"}'
+            )
+            return previous
+
+        ranklist = Ranklist(contest, problems, standings, now, is_rated=is_rated)
+        if current_rating is None:
+            return ranklist
+        # Removing unofficial contestants needs every rated contestant's delta.
+        removes_unofficial = (
+            not show_unofficial
+            and self.cache_master.contest_cache.get_info_of(contest).educational
+        )
+        if handles is not None and not removes_unofficial:
+            await ranklist.predict_subset_async(current_rating, handles)
         else:
-            current_rating = await getUsersEffectiveRating(activeOnly=False)
-            current_rating = {
-                row.party.members[0].handle: current_rating.get(
-                    row.party.members[0].handle, 1500
-                )
-                for row in standings_official
-            }
-            if 'Educational' in contest.name:
-                current_rating = {
-                    handle: rating
-                    for handle, rating in current_rating.items()
-                    if rating < 2100
-                }
-            ranklist = Ranklist(contest, problems, standings, now, is_rated=True)
-            ranklist.predict(current_rating)
+            await ranklist.predict_async(current_rating)
         return ranklist
 
     async def generate_ranklist(
@@ -177,7 +393,13 @@ class RanklistCache:
         fetch_changes: bool = False,
         predict_changes: bool = False,
         show_unofficial: bool = True,
+        handles: list[str] | None = None,
     ) -> Ranklist:
+        """Fetch the ranklist of a contest with its rating changes.
+
+        If rating changes are predicted and `handles` is given, only those
+        handles get a delta, which is much cheaper for large contests.
+        """
         assert fetch_changes ^ predict_changes
 
         ranklist = None
@@ -187,10 +409,14 @@ class RanklistCache:
             )
         if ranklist is None:
             ranklist = await self._get_ranklist_with_predicted_changes(
-                contest_id, show_unofficial
+                contest_id, show_unofficial, handles=handles
             )
 
-        if not show_unofficial and 'Educational' in ranklist.contest.name:
+        contest_cache = self.cache_master.contest_cache
+        if (
+            not show_unofficial
+            and contest_cache.get_info_of(ranklist.contest).educational
+        ):
             ranklist.remove_unofficial_contestants()
 
         return ranklist
@@ -230,29 +456,33 @@ class RanklistCache:
             for handle in handles
         }
         ranklist = Ranklist(contest, problems, standings, now, is_rated=True)
-        delta_by_handle: dict[str, int] = {}
-        for handle in handles:
-            mixed_ratings = current_official_rating.copy()
-            vc_rating = current_vc_rating.get(handle)
-            if vc_rating is not None:
-                mixed_ratings[handle] = vc_rating
-            ranklist.predict(mixed_ratings)
-            if ranklist.delta_by_handle is not None:
-                delta_by_handle[handle] = ranklist.delta_by_handle.get(handle, 0)
-
-        ranklist.delta_by_handle = delta_by_handle
+        await ranklist.predict_inserted_async(
+            current_official_rating,
+            {
+                handle: rating
+                for handle, rating in current_vc_rating.items()
+                if rating is not None
+            },
+        )
         return ranklist
 
     async def _fetch(self, contests: list[cf.Contest]) -> dict[int, Ranklist]:
         ranklist_by_contest = {}
         for contest in contests:
             try:
-                ranklist = await self.generate_ranklist(
-                    contest.id, predict_changes=True
+                # Same as generate_ranklist(predict_changes=True), but reusing
+                # the ranklist from the previous run.
+                ranklist = await self._get_ranklist_with_predicted_changes(
+                    contest.id,
+                    show_unofficial=True,
+                    previous=self.ranklist_by_contest.get(contest.id),
                 )
                 ranklist_by_contest[contest.id] = ranklist
+                self.schedule.record_success(contest.id)
                 self.logger.info(f'Ranklist fetched for contest {contest.id}')
-            except cf.CodeforcesApiError as er:
+            except (cf.CodeforcesApiError, workers.WorkerPoolError) as er:
+                # The previous ranklist, if any, is left as it was.
+                self.schedule.record_error(contest.id)
                 self.logger.warning(
                     f'Ranklist fetch failed for contest {contest.id}. {er!r}'
                 )
@@ -1,12 +1,19 @@
+import asyncio
 import logging
 import time
-from typing import TYPE_CHECKING, Any
+from collections import OrderedDict
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, ClassVar
+
+import numpy as np
 
 from tle.util import (
     codeforces_api as cf,
     codeforces_common as cf_common,
     events,
     paginator,
+    scheduler,
     tasks,
 )
 from tle.util.cache._common import _CONTESTS_PER_BATCH_IN_CACHE_UPDATES, _is_blacklisted
@@ -15,14 +22,123 @@ if TYPE_CHECKING:
     from tle.util.cache.cache_system import CacheSystem
 
 
+@dataclass(frozen=True)
+class RatingDistribution:
+    """The current ratings of a set of users."""
+
+    HIST_BINSIZE: ClassVar[int] = 100
+
+    # Sorted.
+    ratings: np.ndarray
+    # Number of non-negative ratings in each bin of `HIST_BINSIZE` from 0.
+    histogram: np.ndarray
+
+    @classmethod
+    def from_ratings(cls, ratings: Sequence[int] | np.ndarray) -> 'RatingDistribution':
+        sorted_ratings = np.sort(np.asarray(ratings, dtype=np.int32))
+        nonnegative = sorted_ratings[np.searchsorted(sorted_ratings, 0) :]
+        return cls(sorted_ratings, np.bincount(nonnegative // cls.HIST_BINSIZE))
+
+    def __len__(self) -> int:
+        return len(self.ratings)
+
+    def percentile(self, rating: int) -> float:
+        """Return the percentage of users rated below `rating`."""
+        return 100 * int(np.searchsorted(self.ratings, rating)) / len(self.ratings)
+
+
+@dataclass(frozen=True)
+class ContestRatingChanges:
+    """The rating changes of a contest as columns."""
+
+    handles: np.ndarray
+    ranks: np.ndarray
+    old_ratings: np.ndarray
+    new_ratings: np.ndarray
+
+    @classmethod
+    def from_rows(
+        cls, rows: Sequence[tuple[str, int, int, int]]
+    ) -> 'ContestRatingChanges':
+        """Build the columns from (handle, rank, old rating, new rating) rows."""
+        return cls(
+            np.array([row[0] for row in rows], dtype=str),
+            np.array([row[1] for row in rows], dtype=np.int32),
+            np.array([row[2] for row in rows], dtype=np.int32),
+            np.array([row[3] for row in rows], dtype=np.int32),
+        )
+
+    @classmethod
+    def from_changes(cls, changes: Sequence[cf.RatingChange]) -> 'ContestRatingChanges':
+        return cls.from_rows(
+            [
+                (change.handle, change.rank, change.oldRating, change.newRating)
+                for change in changes
+            ]
+        )
+
+    def __len__(self) -> int:
+        return len(self.handles)
+
+    @property
+    def deltas(self) -> np.ndarray:
+        return self.new_ratings - self.old_ratings
+
+    def select(self, mask: np.ndarray) -> 'ContestRatingChanges':
+        return ContestRatingChanges(
+            self.handles[mask],
+            self.ranks[mask],
+            self.old_ratings[mask],
+            self.new_ratings[mask],
+        )
+
+
 class RatingChangesCache:
     _RATED_DELAY = 36 * 60 * 60
     _RELOAD_DELAY = 10 * 60
+    # Rating changes are usually out within a few hours of the contest ending,
+    # contests still without them after that are checked less often.
+    _LATE_AFTER = 6 * 60 * 60
+    _LATE_RELOAD_DELAY = 30 * 60
+    # Instead of fetching every contest's rating changes on each check, the
+    # rating history of one of its rated contestants is checked, taking turns
+    # between a few of them in case one ends up unrated. That is one API call
+    # per check like fetching the rating changes, but a much smaller response.
+    # The full rating changes are fetched once they show up there, or at least
+    # this often.
+    _PROBE_COUNT = 2
+    _FULL_FETCH_DELAY = 60 * 60
+    # Rating distributions kept for different arguments.
+    _MAX_DISTRIBUTIONS = 16
+    # Contests whose rating changes are kept as columns.
+    _MAX_CONTEST_COLUMNS = 8
 
     def __init__(self, cache_master: 'CacheSystem') -> None:
         self.cache_master = cache_master
         self.monitored_contests: list[cf.Contest] = []
         self.handle_rating_cache: dict[str, int] = {}
+        # Changes whenever `handle_rating_cache` does, also across restarts.
+        self.data_version: tuple[int, int, int] = (0, 0, 0)
+        self._last_full_fetch: dict[int, float] = {}
+        # Number of checks of each contest by probing, to take turns.
+        self._probe_turns: dict[int, int] = {}
+        # Columns of rating, time of the last change and number of contests,
+        # the distinct times sorted and the distributions built from them, for
+        # `_distributions_version`.
+        self._activity: np.ndarray = np.zeros((0, 3), dtype=np.int32)
+        self._activity_times: np.ndarray = np.zeros(0, dtype=np.int32)
+        self._distributions: dict[tuple[int, int], RatingDistribution] = {}
+        self._distributions_version: tuple[int, int, int] | None = None
+        self._distributions_lock = asyncio.Lock()
+        self._contest_columns: OrderedDict[int, ContestRatingChanges] = OrderedDict()
+        # Counts saves, so that columns loaded during one are not kept.
+        self._contest_columns_writes = 0
+        self.schedule = scheduler.RefreshSchedule(
+            'RatingChangesCacheUpdate.MonitorNewlyFinishedContests',
+            self._RELOAD_DELAY,
+            min_delay=5 * 60,
+            max_delay=60 * 60,
+        )
         self.logger = logging.getLogger(self.__class__.__name__)
 
     async def run(self) -> None:
@@ -43,7 +159,10 @@ class RatingChangesCache:
         contest = self.cache_master.contest_cache.contest_by_id[contest_id]
         changes = await self._fetch([contest])
         await self.cache_master.conn.clear_rating_changes(contest_id=contest_id)
+        self._forget_contest_columns([contest_id])
         await self._save_changes(changes)
+        # Handles dropped by the refetch are not among the saved ones.
+        await self._refresh_handle_cache()
         return len(changes)
 
     async def fetch_all_contests(self) -> int:
@@ -52,7 +171,10 @@ class RatingChangesCache:
         Intended for manual trigger.
         """
         await self.cache_master.conn.clear_rating_changes()
-        return await self.fetch_missing_contests()
+        self._forget_contest_columns()
+        count = await self.fetch_missing_contests()
+        await self._refresh_handle_cache()
+        return count
 
     async def fetch_missing_contests(self) -> int:
         """Fetch rating changes for contests which are not saved in database.
@@ -108,10 +230,7 @@ class RatingChangesCache:
             else:
                 self.monitored_contests = []
 
-    @tasks.task_spec(
-        name='RatingChangesCacheUpdate.MonitorNewlyFinishedContests',
-        waiter=tasks.Waiter.fixed_delay(_RELOAD_DELAY),
-    )
+    @tasks.task_spec(name='RatingChangesCacheUpdate.MonitorNewlyFinishedContests')
     async def _monitor_task(self, _: Any) -> None:
         self.monitored_contests = [
             contest
@@ -128,7 +247,34 @@ class RatingChangesCache:
             await self._monitor_task.stop()
             return
 
-        contest_changes_pairs = await self._fetch(self.monitored_contests)
+        monitored_ids = {contest.id for contest in self.monitored_contests}
+        for contest_id in self.schedule.keys:
+            if contest_id not in monitored_ids:
+                self.schedule.forget(contest_id)
+                self._last_full_fetch.pop(contest_id, None)
+                self._probe_turns.pop(contest_id, None)
+        now = time.time()
+        for contest in self.monitored_contests:
+            assert contest.end_time is not None
+            self.schedule.set_base_delay(
+                self._LATE_RELOAD_DELAY
+                if now - contest.end_time > self._LATE_AFTER
+                else self._RELOAD_DELAY,
+                contest.id,
+            )
+        due_contests = [
+            contest
+            for contest in self.monitored_contests
+            if self.schedule.is_due(contest.id)
+        ]
+        to_fetch = []
+        for contest in due_contests:
+            if await self._should_fetch(contest, now):
+                self._last_full_fetch[contest.id] = now
+                to_fetch.append(contest)
+            else:
+                self.schedule.record_success(contest.id)
+        contest_changes_pairs = await self._fetch(to_fetch, schedule=True)
         contest_changes_pairs.sort(key=lambda pair: pair[1][0].ratingUpdateTimeSeconds)
         await self._save_changes(contest_changes_pairs)
         for contest, changes in contest_changes_pairs:
@@ -136,19 +282,71 @@ class RatingChangesCache:
                 events.RatingChangesUpdate, contest=contest, rating_changes=changes
             )
 
+    @_monitor_task.waiter()
+    async def _monitor_task_waiter(self) -> float:
+        return await self.schedule.wait()
+
+    def _get_probe_handles(self, contest: cf.Contest) -> list[str]:
+        """Return a few contestants predicted to be rated in `contest`, taken
+        from the middle of the standings where disqualifications are rare."""
+        ranklist = self.cache_master.ranklist_cache.ranklist_by_contest.get(contest.id)
+        if ranklist is None or ranklist.delta_by_handle is None:
+            return []
+        deltas = ranklist.delta_by_handle
+        rated = [handle for handle in ranklist.handles if handle in deltas]
+        count = min(self._PROBE_COUNT, len(rated))
+        return [rated[len(rated) * (i + 1) // (count + 1)] for i in range(count)]
+
+    async def _is_published(self, contest: cf.Contest) -> bool | None:
+        """Return whether the rating changes of `contest` show up in the rating
+        history of the probe contestant whose turn it is, or None if that
+        cannot be told."""
+        handles = self._get_probe_handles(contest)
+        if not handles:
+            return None
+        turn = self._probe_turns.get(contest.id, 0)
+        self._probe_turns[contest.id] = turn + 1
+        handle = handles[turn % len(handles)]
+        try:
+            changes = await cf.user.rating(handle=handle)
+        except cf.CodeforcesApiError as er:
+            self.logger.warning(
+                f'Rating history of {handle} unavailable for contest'
+                f' {contest.id}. {er!r}'
+            )
+            return None
+        return any(change.contestId == contest.id for change in changes)
+
+    async def _should_fetch(self, contest: cf.Contest, now: float) -> bool:
+        last_full_fetch = self._last_full_fetch.setdefault(contest.id, now)
+        if now - last_full_fetch >= self._FULL_FETCH_DELAY:
+            return True
+        published = await self._is_published(contest)
+        if published is None:
+            return True
+        if published:
+            self.logger.info(f'Rating changes published for contest {contest.id}')
+        return published
+
     async def _fetch(
-        self, contests: list[cf.Contest]
+        self, contests: list[cf.Contest], *, schedule: bool = False
     ) -> list[tuple[cf.Contest, list[cf.RatingChange]]]:
+        """Fetch the rating changes of `contests`. If `schedule` is set, the
+        outcome for each contest is recorded in the refresh schedule."""
         all_changes = []
         for contest in contests:
             try:
                 changes = await cf.contest.ratingChanges(contest_id=contest.id)
+                if schedule:
+                    self.schedule.record_success(contest.id)
                 self.logger.info(
                     f'{len(changes)} rating changes fetched for contest {contest.id}'
                 )
                 if changes:
                     all_changes.append((contest, changes))
             except cf.CodeforcesApiError as er:
+                if schedule:
+                    self.schedule.record_error(contest.id)
                 self.logger.warning(
                     f'Fetch rating changes failed for contest {contest.id},'
                     f' ignoring. {er!r}'
@@ -165,27 +363,62 @@ class RatingChangesCache:
         if not flattened:
             return
         rc = await self.cache_master.conn.save_rating_changes(flattened)
+        self._forget_contest_columns(contest.id for contest, _ in contest_changes_pairs)
         self.logger.info(f'Saved {rc} changes to database.')
-        await self._refresh_handle_cache()
+        await self._patch_handle_cache({change.handle for change in flattened})
+
+    async def _patch_handle_cache(self, handles: set[str]) -> None:
+        """Update the cached ratings of `handles` after their changes were
+        saved."""
+        self.handle_rating_cache.update(
+            await self.cache_master.conn.get_latest_ratings(handles)
+        )
+        self.data_version = await self.cache_master.conn.get_latest_rating_version()
+        self.logger.info(
+            f'Ratings for {len(handles)} handles updated,'
+            f' {len(self.handle_rating_cache)} cached'
+        )
 
     async def _refresh_handle_cache(self) -> None:
         self.handle_rating_cache = (
             await self.cache_master.conn.get_latest_rating_by_handle()
         )
+        self.data_version = await self.cache_master.conn.get_latest_rating_version()
         self.logger.info(f'Ratings for {len(self.handle_rating_cache)} handles cached')
 
-    async def get_users_with_more_than_n_contests(
-        self, time_cutoff: int, n: int
-    ) -> list[str]:
-        return await self.cache_master.conn.get_users_with_more_than_n_contests(
-            time_cutoff, n
-        )
-
     async def get_rating_changes_for_contest(
         self, contest_id: int
     ) -> list[cf.RatingChange]:
         return await self.cache_master.conn.get_rating_changes_for_contest(contest_id)
 
+    async def get_contest_rating_changes(self, contest_id: int) -> ContestRatingChanges:
+        """Return the saved rating changes of a contest as columns, empty if
+        there are none.
+
+        The columns of the most recently asked contests are kept until rating
+        changes of them are saved again.
+        """
+        changes = self._contest_columns.pop(contest_id, None)
+        if changes is None:
+            writes = self._contest_columns_writes
+            rows = await self.cache_master.conn.get_rating_change_columns(contest_id)
+            changes = ContestRatingChanges.from_rows(rows)
+            if writes != self._contest_columns_writes:
+                return changes
+            if len(self._contest_columns) >= self._MAX_CONTEST_COLUMNS:
+                self._contest_columns.popitem(last=False)
+        self._contest_columns[contest_id] = changes
+        return changes
+
+    def _forget_contest_columns(self, contest_ids: Iterable[int] | None = None) -> None:
+        """Drop the columns of `contest_ids`, or of every contest if None."""
+        self._contest_columns_writes += 1
+        if contest_ids is None:
+            self._contest_columns.clear()
+            return
+        for contest_id in contest_ids:
+            self._contest_columns.pop(contest_id, None)
+
     async def has_rating_changes_saved(self, contest_id: int) -> bool:
         return await self.cache_master.conn.has_rating_changes_saved(contest_id)
 
@@ -199,5 +432,50 @@ class RatingChangesCache:
             handle, cf.DEFAULT_RATING if default_if_absent else None
         )
 
-    def get_all_ratings(self) -> list[int]:
-        return list(self.handle_rating_cache.values())
+    async def get_activity_cutoff(self, time_cutoff: int) -> int:
+        """Return the earliest time of a user's last rating change at or after
+        `time_cutoff`, which selects the same users as `time_cutoff` but only
+        changes when a contest falls out of the window."""
+        async with self._distributions_lock:
+            await self._load_activity()
+            return self._snap_cutoff(time_cutoff)
+
+    async def get_rating_distribution(
+        self, time_cutoff: int = 0, min_contests: int = 0
+    ) -> RatingDistribution:
+        """Return the distribution of the current ratings of users with at
+        least `min_contests` contests, the last one at or after `time_cutoff`.
+
+        The columns of latest_rating are loaded once after new rating changes
+        are saved, and the distributions of the most recent arguments kept
+        until then, keyed by the cutoff `get_activity_cutoff` returns.
+        """
+        async with self._distributions_lock:
+            await self._load_activity()
+            key = (self._snap_cutoff(time_cutoff), min_contests)
+            distribution = self._distributions.pop(key, None)
+            if distribution is None:
+                ratings, times, contest_counts = self._activity.T
+                mask = (contest_counts >= min_contests) & (times >= time_cutoff)
+                distribution = RatingDistribution.from_ratings(ratings[mask])
+                if len(self._distributions) >= self._MAX_DISTRIBUTIONS:
+                    del self._distributions[next(iter(self._distributions))]
+            self._distributions[key] = distribution
+            return distribution
+
+    async def _load_activity(self) -> None:
+        if self._distributions_version == self.data_version:
+            return
+        version = self.data_version
+        rows = await self.cache_master.conn.get_rating_activity()
+        self._activity = np.array(rows, dtype=np.int32).reshape(-1, 3)
+        self._activity_times = np.unique(self._activity[:, 1])
+        self._distributions = {}
+        self._distributions_version = version
+
+    def _snap_cutoff(self, time_cutoff: int) -> int:
+        times = self._activity_times
+        i = int(np.searchsorted(times, time_cutoff))
+        if i == len(times):
+            return int(times[-1]) + 1 if len(times) else time_cutoff
+        return int(times[i])
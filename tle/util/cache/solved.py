@@ -0,0 +1,230 @@
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from tle.util import codeforces_api as cf
+from tle.util.cache.contest import ContestInfo
+
+if TYPE_CHECKING:
+    from tle.util.cache.cache_system import CacheSystem
+    from tle.util.cache.contest import ContestCache
+
+_PENDING_VERDICTS = (None, 'TESTING')
+
+
+class SolvedTable:
+    """The problems solved by a user, with the columns `SubFilter.filter_table`
+    masks on.
+
+    Accepted submissions are added as they are fetched, and appended to the
+    columns when they are newer than every submission already added. The table
+    is derived again from all accepted submissions only when an older one
+    arrives, one is rejudged or the contests change.
+    """
+
+    def __init__(self, contest_cache: 'ContestCache') -> None:
+        self.contest_cache = contest_cache
+        self.contest_by_id = contest_cache.contest_by_id
+        self.created = time.time()
+        # Submissions with smaller ids are final and have been added.
+        self.resume_id = 0
+        self._accepted: list[cf.Submission] = []
+        self._accepted_ids: set[int] = set()
+        self._derive()
+
+    def __len__(self) -> int:
+        return len(self.submissions)
+
+    def add(self, submissions: Iterable[cf.Submission]) -> None:
+        """Add the submissions of the user from `resume_id` on, and drop those
+        among them that are no longer accepted."""
+        submissions = list(submissions)
+        pending = [sub.id for sub in submissions if sub.verdict in _PENDING_VERDICTS]
+        if pending:
+            self.resume_id = min(pending)
+        elif submissions:
+            self.resume_id = max(self.resume_id, max(sub.id for sub in submissions) + 1)
+        rejudged = {
+            sub.id
+            for sub in submissions
+            if sub.verdict != 'OK' and sub.id in self._accepted_ids
+        }
+        new = [
+            sub
+            for sub in submissions
+            if sub.verdict == 'OK' and sub.id not in self._accepted_ids
+        ]
+        if not new and not rejudged:
+            return
+        # Submissions from the same second are ordered newest first, as the API
+        # returns them.
+        new.sort(key=_submission_order)
+        self._accepted_ids.update(sub.id for sub in new)
+        if not rejudged and (
+            not self._accepted
+            or _submission_order(new[0]) > _submission_order(self._accepted[-1])
+        ):
+            self._accepted += new
+            self._append(new)
+            return
+        self._accepted_ids -= rejudged
+        self._accepted = [sub for sub in self._accepted if sub.id not in rejudged]
+        self._accepted += new
+        self._accepted.sort(key=_submission_order)
+        self._derive()
+
+    def refresh_contests(self) -> None:
+        """Derive the table again if the contest cache was reloaded."""
+        if self.contest_cache.contest_by_id is not self.contest_by_id:
+            self.contest_by_id = self.contest_cache.contest_by_id
+            self._derive()
+
+    def _derive(self) -> None:
+        # If a problem is solved multiple times the first accepted submission is
+        # kept. Assume (name, contest start time) is a unique identifier for
+        # problems.
+        self._problem_keys: set[tuple[str, int]] = set()
+        # Rows refer to their contest and tags by position in `contests` and
+        # `tag_sets`, so flags of these are computed once and gathered.
+        self._contest_row_by_id: dict[int, int] = {}
+        self._tag_row_by_tags: dict[tuple[str, ...], int] = {}
+        self.contests: list[cf.Contest] = []
+        self.tag_sets: list[tuple[str, ...]] = []
+        self.infos: list[ContestInfo] = []
+        self.submissions: list[cf.Submission] = []
+        self.time = np.empty(0, np.int64)
+        self.participant_type = np.empty(0, str)
+        self.team = np.empty(0, bool)
+        self.rating = np.empty(0, np.int64)
+        self.index = np.empty(0, str)
+        self.tag_set = np.empty(0, np.int64)
+        # -1 without a contest, which picks the trailing entry of the per-contest
+        # arrays below.
+        self.contest_index = np.empty(0, np.int64)
+        self.has_contest = np.empty(0, bool)
+        self.contest_id = np.empty(0, np.int64)
+        self.nonstandard = np.empty(0, bool)
+        self._append(self._accepted)
+
+    def _append(self, accepted: list[cf.Submission]) -> None:
+        """Append the rows of `accepted`, which are newer than every submission
+        in the table."""
+        solved = []
+        contest_rows: list[int] = []
+        tag_rows: list[int] = []
+        info_by_id = self.contest_cache.info_by_id
+        for sub in accepted:
+            contest = self.contest_by_id.get(sub.problem.contestId)
+            problem_key = (sub.problem.name, contest.startTimeSeconds if contest else 0)
+            if problem_key in self._problem_keys:
+                continue
+            self._problem_keys.add(problem_key)
+            solved.append(sub)
+            if contest is None:
+                contest_rows.append(-1)
+            else:
+                if contest.id not in self._contest_row_by_id:
+                    self._contest_row_by_id[contest.id] = len(self.contests)
+                    self.contests.append(contest)
+                    self.infos.append(
+                        info_by_id.get(contest.id) or ContestInfo.of(contest)
+                    )
+                contest_rows.append(self._contest_row_by_id[contest.id])
+            tags = tuple(sub.problem.tags)
+            if tags not in self._tag_row_by_tags:
+                self._tag_row_by_tags[tags] = len(self.tag_sets)
+                self.tag_sets.append(tags)
+            tag_rows.append(self._tag_row_by_tags[tags])
+        if not solved:
+            return
+
+        self.submissions += solved
+        count = len(solved)
+        self.time = np.append(
+            self.time,
+            np.fromiter((sub.creationTimeSeconds for sub in solved), np.int64, count),
+        )
+        self.participant_type = np.append(
+            self.participant_type,
+            np.array([sub.author.participantType for sub in solved], dtype=str),
+        )
+        self.team = np.append(
+            self.team,
+            np.fromiter((len(sub.author.members) != 1 for sub in solved), bool, count),
+        )
+        self.rating = np.append(
+            self.rating,
+            np.fromiter((sub.problem.rating or 0 for sub in solved), np.int64, count),
+        )
+        self.index = np.append(
+            self.index,
+            np.array([sub.problem.index.lower() for sub in solved], dtype=str),
+        )
+        tag_set = np.array(tag_rows, dtype=np.int64)
+        contest_index = np.array(contest_rows, dtype=np.int64)
+        self.tag_set = np.append(self.tag_set, tag_set)
+        self.contest_index = np.append(self.contest_index, contest_index)
+        self.has_contest = np.append(self.has_contest, contest_index >= 0)
+        contest_ids = [contest.id for contest in self.contests]
+        self.contest_id = np.append(
+            self.contest_id,
+            np.array(contest_ids + [0], dtype=np.int64)[contest_index],
+        )
+        nonstandard_contests = [info.nonstandard for info in self.infos]
+        special = [any('*special' in tag for tag in tags) for tags in self.tag_sets]
+        self.nonstandard = np.append(
+            self.nonstandard,
+            (contest_index >= 0)
+            & (
+                np.array(nonstandard_contests + [False], dtype=bool)[contest_index]
+                | np.array(special, dtype=bool)[tag_set]
+            ),
+        )
+
+
+def _submission_order(sub: cf.Submission) -> tuple[int, int]:
+    return sub.creationTimeSeconds, -sub.id
+
+
+class SolvedCache:
+    """Keeps a `SolvedTable` for recently queried handles up to date."""
+
+    _MAX_HANDLES = 256
+    # Number of the newest submissions fetched to update a table. If they do not
+    # reach back to its `resume_id`, the whole history is fetched again.
+    _UPDATE_COUNT = 100
+    # Tables are rebuilt from scratch this often, to pick up rejudged
+    # submissions older than the fetched ones.
+    _REBUILD_DELAY = 24 * 60 * 60
+
+    def __init__(self, cache_master: 'CacheSystem') -> None:
+        self.cache_master = cache_master
+        self._tables: OrderedDict[str, SolvedTable] = OrderedDict()
+
+    async def get(self, handle: str) -> SolvedTable:
+        """Return the problems solved by `handle`, fetching the submissions
+        made since the last call."""
+        key = handle.lower()
+        contest_cache = self.cache_master.contest_cache
+        table = self._tables.get(key)
+        if table is not None and time.time() - table.created < self._REBUILD_DELAY:
+            newest = await cf.user.status(handle=handle, count=self._UPDATE_COUNT)
+            if len(newest) < self._UPDATE_COUNT or newest[-1].id <= table.resume_id:
+                table.refresh_contests()
+                table.add(newest)
+            else:
+                table = None
+        else:
+            table = None
+        if table is None:
+            table = SolvedTable(contest_cache)
+            table.add(await cf.user.status(handle=handle))
+
+        self._tables[key] = table
+        self._tables.move_to_end(key)
+        while len(self._tables) > self._MAX_HANDLES:
+            self._tables.popitem(last=False)
+        return table
@@ -116,6 +116,12 @@ class RatingChange(NamedTuple):
     newRating: int
 
 
+def normalize_name(s: str) -> str:
+    """Returns `s` lowercased with only letters and digits, for matching
+    contest names against markers."""
+    return ''.join(x for x in s.lower() if x.isalnum())
+
+
 class Contest(NamedTuple):
     """Codeforces contest."""
 
@@ -148,14 +154,8 @@ class Contest(NamedTuple):
 
     def matches(self, markers: Iterable[str]) -> bool:
         """Returns whether the contest matches any of the given markers."""
-
-        def filter_and_normalize(s: str) -> str:
-            return ''.join(x for x in s.lower() if x.isalnum())
-
-        return any(
-            filter_and_normalize(marker) in filter_and_normalize(self.name)
-            for marker in markers
-        )
+        name = normalize_name(self.name)
+        return any(normalize_name(marker) in name for marker in markers)
 
 
 class Member(NamedTuple):
@@ -378,9 +378,23 @@ def _bool_to_str(value: bool) -> str:
     raise TypeError(f'Expected bool, got {value} of type {type(value)}')
 
 
+_RATELIMIT_PER_SECOND = 1
+# Queries are counted over this many seconds to tell how busy the API is.
+_API_LOAD_WINDOW = 60
+_query_times: deque[float] = deque()
+
+
+def get_api_load() -> float:
+    """Return the fraction of the rate limit used over the last minute."""
+    cutoff = time.time() - _API_LOAD_WINDOW
+    while _query_times and _query_times[0] < cutoff:
+        _query_times.popleft()
+    return len(_query_times) / (_RATELIMIT_PER_SECOND * _API_LOAD_WINDOW)
+
+
 def cf_ratelimit(f: Callable[..., Any]) -> Callable[..., Any]:
     tries = 3
-    per_second = 1
+    per_second = _RATELIMIT_PER_SECOND
     last = deque([0.0] * per_second)
 
     @functools.wraps(f)
@@ -397,6 +411,7 @@ def cf_ratelimit(f: Callable[..., Any]) -> Callable[..., Any]:
             delay = next_valid - now
             if delay > 0:
                 await asyncio.sleep(delay)
+            _query_times.append(next_valid)
 
             try:
                 return await f(*args, **kwargs)
@@ -2,20 +2,21 @@ import asyncio
 import datetime
 import functools
 import itertools
-import json
 import logging
 import math
 import time
 from collections import defaultdict
-from collections.abc import Callable, Iterable
-from typing import Any
+from collections.abc import Awaitable, Callable, Iterable, Sequence
+from dataclasses import dataclass, field
+from typing import Any, Generic, TypeVar
 
 import discord
+import numpy as np
 from discord.ext import commands
 
 from tle import constants
-from tle.util import codeforces_api as cf, db, events
-from tle.util.cache import CacheSystem, ContestNotFound
+from tle.util import codeforces_api as cf, db, discord_common, events
+from tle.util.cache import CacheSystem, ContestNotFound, SolvedTable
 
 logger = logging.getLogger(__name__)
 
@@ -28,16 +29,18 @@ cf_cache: Any = None
 # Event system
 event_sys = events.EventSystem()
 
-_contest_id_to_writers_map: dict[int, list[str]] | None = None
-
 active_groups: defaultdict[str, set[int]] = defaultdict(set)
 
+# Seconds a fetch for several handles runs before its progress is shown.
+_PROGRESS_DELAY = 3
+
+T = TypeVar('T')
+
 
 async def initialize(bot: Any, nodb: bool) -> None:
     global cf_cache
     global user_db
     global event_sys
-    global _contest_id_to_writers_map
 
     await cf.initialize()
 
@@ -57,16 +60,6 @@ async def initialize(bot: Any, nodb: bool) -> None:
     bot.cf_cache = cf_cache
     bot.event_sys = event_sys
 
-    try:
-        with open(constants.CONTEST_WRITERS_JSON_FILE_PATH) as f:
-            data = json.load(f)
-        _contest_id_to_writers_map = {
-            contest['id']: [s.lower() for s in contest['writers']] for contest in data
-        }
-        logger.info('Contest writers loaded from JSON file')
-    except FileNotFoundError:
-        logger.warning('JSON file containing contest writers not found')
-
 
 # algmyr's guard idea:
 def user_guard(
@@ -96,13 +89,6 @@ def user_guard(
     return guard
 
 
-def is_contest_writer(contest_id: int, handle: str) -> bool:
-    if _contest_id_to_writers_map is None:
-        return False
-    writers = _contest_id_to_writers_map.get(contest_id)
-    return bool(writers and handle.lower() in writers)
-
-
 _NONSTANDARD_CONTEST_INDICATORS = [
     'wild',
     'fools',
@@ -128,9 +114,9 @@ def is_nonstandard_contest(contest: cf.Contest) -> bool:
 
 
 def is_nonstandard_problem(problem: cf.Problem) -> bool:
-    return is_nonstandard_contest(
-        cf_cache.contest_cache.get_contest(problem.contestId)
-    ) or problem.matches_all_tags(['*special'])
+    return cf_cache.contest_cache.get_info(
+        problem.contestId
+    ).nonstandard or problem.matches_all_tags(['*special'])
 
 
 async def get_visited_contests(handles: list[str]) -> set[int]:
@@ -312,6 +298,98 @@ async def members_to_handles(
     return handles
 
 
+@dataclass
+class HandleResults(Generic[T]):
+    """What was fetched for several handles.
+
+    `handles` and `results` hold the handles the fetch succeeded for, in the
+    order they were given, and `errors` the errors of the others.
+    """
+
+    handles: list[str] = field(default_factory=list)
+    results: list[T] = field(default_factory=list)
+    errors: dict[str, cf.CodeforcesApiError] = field(default_factory=dict)
+
+
+async def gather_for_handles(
+    handles: Sequence[str],
+    fetch: Callable[..., Awaitable[T]],
+    *,
+    progress: Callable[[int, int], Awaitable[None]] | None = None,
+) -> HandleResults[T]:
+    """Call `fetch(handle=handle)` for all handles at once.
+
+    The API requests wait in the rate limiter's queue together instead of one
+    after another. `progress` is called with the number of handles done and the
+    total whenever one finishes.
+    """
+    done = 0
+
+    async def fetch_one(handle: str) -> T | cf.CodeforcesApiError:
+        nonlocal done
+        try:
+            result: T | cf.CodeforcesApiError = await fetch(handle=handle)
+        except cf.CodeforcesApiError as e:
+            result = e
+        done += 1
+        if progress is not None:
+            await progress(done, len(handles))
+        return result
+
+    results = await asyncio.gather(*(fetch_one(handle) for handle in handles))
+    fetched: HandleResults[T] = HandleResults()
+    for handle, result in zip(handles, results, strict=True):
+        if isinstance(result, cf.CodeforcesApiError):
+            fetched.errors[handle] = result
+        else:
+            fetched.handles.append(handle)
+            fetched.results.append(result)
+    return fetched
+
+
+async def fetch_for_handles(
+    ctx: commands.Context,
+    handles: Sequence[str],
+    fetch: Callable[..., Awaitable[T]],
+) -> tuple[list[str], list[T]]:
+    """Fetch for several handles in a command, see `gather_for_handles`.
+
+    Fetches taking longer than `_PROGRESS_DELAY` show their progress in a
+    message. Returns the handles the fetch succeeded for and their results,
+    after sending the errors of the others. Raises the first error if the fetch
+    failed for every handle.
+    """
+    start = time.monotonic()
+    message: discord.Message | None = None
+    lock = asyncio.Lock()
+
+    async def progress(done: int, total: int) -> None:
+        nonlocal message
+        if done == total or time.monotonic() - start < _PROGRESS_DELAY:
+            return
+        content = f'Fetching data for {total} handles ({done}/{total} done)...'
+        async with lock:
+            if message is None:
+                message = await ctx.send(content)
+            else:
+                await message.edit(content=content)
+
+    try:
+        fetched = await gather_for_handles(handles, fetch, progress=progress)
+    finally:
+        if message is not None:
+            await message.delete()
+
+    if fetched.errors and not fetched.handles:
+        raise next(iter(fetched.errors.values()))
+    if fetched.errors:
+        lines = '\n'.join(f'`{handle}`: {e}' for handle, e in fetched.errors.items())
+        await ctx.send(
+            embed=discord_common.embed_alert(f'Skipping some handles:\n{lines}')
+        )
+    return fetched.handles, fetched.results
+
+
 def filter_flags(
     args: Iterable[str], params: list[str]
 ) -> tuple[list[bool], list[str]]:
@@ -424,74 +502,58 @@ class SubFilter:
         ]
         return rest
 
-    @staticmethod
-    def filter_solved(submissions: list[cf.Submission]) -> list[cf.Submission]:
-        """Filters and keeps only solved submissions.
-
-        If a problem is solved multiple times the first accepted submission is
-        kept. The unique id for a problem is
-        (problem name, contest start time).
-        """
-        submissions.sort(key=lambda sub: sub.creationTimeSeconds)
-        problems = set()
-        solved_subs = []
-
-        for submission in submissions:
-            problem = submission.problem
-            contest = cf_cache.contest_cache.contest_by_id.get(problem.contestId, None)
-            if submission.verdict == 'OK':
-                # Assume (name, contest start time) is a unique identifier for problems
-                problem_key = (problem.name, contest.startTimeSeconds if contest else 0)
-                if problem_key not in problems:
-                    solved_subs.append(submission)
-                    problems.add(problem_key)
-        return solved_subs
+    def filter_table(self, table: SolvedTable) -> list[cf.Submission]:
+        """Return the solved submissions in `table` that pass the filter."""
+        mask = np.isin(table.participant_type, self.types)
+        mask &= (self.dlo <= table.time) & (table.time < self.dhi)
+        if not self.team:
+            mask &= ~table.team
+        if self.rated:
+            mask &= table.has_contest & (table.contest_id < cf.GYM_ID_THRESHOLD)
+            mask &= ~table.nonstandard
+            mask &= (table.rating != 0) & (self.rlo <= table.rating)
+            mask &= table.rating <= self.rhi
+        else:
+            # acmsguru and gym allowed
+            mask &= (
+                ~table.has_contest
+                | (table.contest_id >= cf.GYM_ID_THRESHOLD)
+                | ~table.nonstandard
+            )
 
-    def filter_subs(self, submissions: list[cf.Submission]) -> list[cf.Submission]:
-        submissions = SubFilter.filter_solved(submissions)
-        filtered_subs = []
-        for submission in submissions:
-            problem = submission.problem
-            contest = cf_cache.contest_cache.contest_by_id.get(problem.contestId, None)
-            type_ok = submission.author.participantType in self.types
-            date_ok = self.dlo <= submission.creationTimeSeconds < self.dhi
-            tag_ok = problem.matches_all_tags(self.tags)
-            bantag_ok = not problem.matches_any_tag(self.bantags)
-            index_ok = not self.indices or any(
-                index.lower() == problem.index.lower() for index in self.indices
+        if self.tags or self.bantags:
+            tags_ok = np.fromiter(
+                (self._tags_ok(tags) for tags in table.tag_sets),
+                bool,
+                len(table.tag_sets),
             )
-            contest_ok = not self.contests or (
-                contest and contest.matches(self.contests)
+            mask &= tags_ok[table.tag_set]
+        if self.indices:
+            mask &= np.isin(table.index, [index.lower() for index in self.indices])
+        if self.contests:
+            contests_ok = np.fromiter(
+                (info.matches(self.contests) for info in table.infos),
+                bool,
+                len(table.infos),
             )
-            team_ok = self.team or len(submission.author.members) == 1
-            if self.rated:
-                problem_ok = (
-                    contest
-                    and contest.id < cf.GYM_ID_THRESHOLD
-                    and not is_nonstandard_problem(problem)
-                )
-                rating_ok = problem.rating and self.rlo <= problem.rating <= self.rhi
-            else:
-                # acmsguru and gym allowed
-                problem_ok = (
-                    not contest
-                    or contest.id >= cf.GYM_ID_THRESHOLD
-                    or not is_nonstandard_problem(problem)
-                )
-                rating_ok = True
-            if (
-                type_ok
-                and date_ok
-                and rating_ok
-                and tag_ok
-                and bantag_ok
-                and team_ok
-                and problem_ok
-                and contest_ok
-                and index_ok
-            ):
-                filtered_subs.append(submission)
-        return filtered_subs
+            # Submissions without a contest have index -1, the appended False.
+            mask &= np.append(contests_ok, False)[table.contest_index]
+        return [table.submissions[i] for i in np.flatnonzero(mask)]
+
+    def _tags_ok(self, tags: Sequence[str]) -> bool:
+        """Return whether a problem with `tags` matches all of `self.tags` and
+        none of `self.bantags`, like `cf.Problem.matches_all_tags` and
+        `cf.Problem.matches_any_tag`."""
+        return all(
+            any(match_tag in tag for tag in tags) for match_tag in self.tags
+        ) and not any(match_tag in tag for match_tag in self.bantags for tag in tags)
+
+    def filter_subs(self, submissions: list[cf.Submission]) -> list[cf.Submission]:
+        """Return the first accepted submission of every problem in
+        `submissions` that passes the filter, oldest first."""
+        table = SolvedTable(cf_cache.contest_cache)
+        table.add(submissions)
+        return self.filter_table(table)
 
     def filter_rating_changes(
         self, rating_changes: list[cf.RatingChange]
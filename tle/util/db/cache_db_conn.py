@@ -1,12 +1,56 @@
 # mypy: disable-error-code="no-any-return"
 import json
-from collections.abc import Iterator
-from typing import Any
+import sys
+from array import array
+from collections.abc import AsyncIterator, Iterable, Iterator
+from typing import Any, NamedTuple
 
 import aiosqlite
 
 from tle.util import codeforces_api as cf
 
+# Rows fetched at a time by the methods that stream whole tables.
+_BATCH_SIZE = 1000
+# Parameters bound per statement, below the limit of 999 of older SQLite versions.
+_MAX_PARAMS = 500
+
+
+class SavedRanklist(NamedTuple):
+    """A ranklist saved from a monitored contest."""
+
+    contest: cf.Contest
+    problems: list[cf.Problem]
+    standings: list[cf.RanklistRow]
+    fetch_time: float
+    is_rated: bool
+    # Zero-sum correction of the predicted deltas, if predicted for everyone.
+    correction: int | None
+
+
+class RanklistEncoder:
+    """Encodes the standings of a ranklist for `CacheDbConn.save_ranklist`.
+
+    Monitored ranklists keep the rows that did not change between fetches, so
+    the encoding of the rows of the previous call is reused for the same row
+    objects and only new rows are encoded.
+    """
+
+    def __init__(self) -> None:
+        self._encoded: dict[int, tuple[cf.RanklistRow, str]] = {}
+
+    def encode(self, standings: list[cf.RanklistRow]) -> str:
+        encoded = {}
+        parts = []
+        for row in standings:
+            item = self._encoded.get(id(row))
+            # The row is held in the item, so its id is not reused meanwhile.
+            if item is None or item[0] is not row:
+                item = (row, json.dumps(row))
+            encoded[id(row)] = item
+            parts.append(item[1])
+        self._encoded = encoded
+        return f'[{",".join(parts)}]'
+
 
 class CacheDbConn:
     def __init__(self, db_file: str) -> None:
@@ -18,6 +62,17 @@ class CacheDbConn:
         assert self._conn is not None, 'Database not connected. Call connect() first.'
         return self._conn
 
+    async def _iter_rows(
+        self, query: str, params: tuple[Any, ...] = ()
+    ) -> AsyncIterator[list[tuple[Any, ...]]]:
+        """Yield the rows of `query` in batches of at most `_BATCH_SIZE`."""
+        cursor = await self.conn.execute(query, params)
+        try:
+            while rows := await cursor.fetchmany(_BATCH_SIZE):
+                yield rows
+        finally:
+            await cursor.close()
+
     async def connect(self) -> None:
         self._conn = await aiosqlite.connect(self.db_file)
         await self._conn.execute('PRAGMA journal_mode=WAL')
@@ -39,7 +94,16 @@ class CacheDbConn:
             ')'
         )
 
-        # Table for problems from the problemset.problems endpoint.
+        # Tag names, which problems refer to by id.
+        await self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS tag (
+                id    INTEGER PRIMARY KEY,
+                name  TEXT NOT NULL UNIQUE
+            )
+        """)
+
+        # Table for problems from the problemset.problems endpoint. `tag_ids`
+        # holds the ids of the problem's tags, packed by `_pack_tag_ids`.
         await self.conn.execute(
             'CREATE TABLE IF NOT EXISTS problem ('
             'contest_id       INTEGER,'
@@ -49,7 +113,7 @@ class CacheDbConn:
             'type             TEXT,'
             'points           REAL,'
             'rating           INTEGER,'
-            'tags             TEXT,'
+            'tag_ids          BLOB,'
             'PRIMARY KEY (name)'
             ')'
         )
@@ -72,9 +136,33 @@ class CacheDbConn:
                 contest_id
             )
         """)
+        # Covers the lookups by handle and the per-handle aggregates that keep
+        # `latest_rating` current. It replaces an index on handle alone.
+        await self.conn.execute('DROP INDEX IF EXISTS ix_rating_change_handle')
+        await self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS ix_rating_change_handle_time ON rating_change (
+                handle, rating_update_time
+            )
+        """)
+        # Lets the reads in update order walk the index instead of sorting the
+        # table.
+        await self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS ix_rating_change_time ON rating_change (
+                rating_update_time
+            )
+        """)
+
+        # The latest rating and number of rated contests of every handle in
+        # rating_change, kept current by every method that writes rating_change.
         await self.conn.execute("""
-            CREATE INDEX IF NOT EXISTS ix_rating_change_handle ON rating_change (handle)
+            CREATE TABLE IF NOT EXISTS latest_rating (
+                handle         TEXT PRIMARY KEY,
+                rating         INTEGER,
+                time           INTEGER,
+                contest_count  INTEGER
+            )
         """)
+        await self._fill_latest_rating()
 
         # Table for problems fetched from contest.standings endpoint for every
         # contest. This is separate from table problem as it contains the same
@@ -88,13 +176,43 @@ class CacheDbConn:
                 type             TEXT,
                 points           REAL,
                 rating           INTEGER,
-                tags             TEXT,
+                tag_ids          BLOB,
                 PRIMARY KEY (contest_id, [index])
             )
         """)
         await self.conn.execute("""
             CREATE INDEX IF NOT EXISTS ix_problem2_contest_id ON problem2 (contest_id)
         """)
+        await self._migrate_tags()
+
+        # Table for ranklists of monitored contests, so that they survive a
+        # restart. Contest, problems and standings are stored as JSON.
+        await self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS ranklist (
+                contest_id   INTEGER NOT NULL,
+                fetch_time   REAL,
+                is_rated     INTEGER,
+                correction   INTEGER,
+                contest      TEXT,
+                problems     TEXT,
+                standings    TEXT,
+                PRIMARY KEY (contest_id)
+            )
+        """)
+
+        # Table for rating changes predicted for monitored contests, along with
+        # the rating each contestant was predicted from. These are kept after
+        # the final rating changes arrive, to compare the two.
+        await self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS predicted_rating_change (
+                contest_id   INTEGER NOT NULL,
+                handle       TEXT NOT NULL,
+                rating       INTEGER,
+                delta        INTEGER,
+                fetch_time   REAL,
+                UNIQUE (contest_id, handle)
+            )
+        """)
 
     async def cache_contests(self, contests: list[Any]) -> int:
         query = """
@@ -107,55 +225,163 @@ class CacheDbConn:
         await self.conn.commit()
         return rc
 
-    async def fetch_contests(self) -> list[cf.Contest]:
+    async def iter_contests(self) -> AsyncIterator[cf.Contest]:
         query = """
             SELECT id, name, start_time, duration, type, phase, prepared_by FROM contest
         """
-        cursor = await self.conn.execute(query)
-        res = await cursor.fetchall()
-        return [cf.Contest._make(contest) for contest in res]
+        async for rows in self._iter_rows(query):
+            for row in rows:
+                yield cf.Contest._make(row)
+
+    async def fetch_contests(self) -> list[cf.Contest]:
+        return [contest async for contest in self.iter_contests()]
+
+    async def _fill_latest_rating(self) -> None:
+        """Fill latest_rating for databases created before it existed."""
+        cursor = await self.conn.execute('SELECT 1 FROM latest_rating LIMIT 1')
+        if await cursor.fetchone() is not None:
+            return
+        # SQLite takes the bare column new_rating from the row with the maximum.
+        await self.conn.execute("""
+            INSERT INTO latest_rating (handle, rating, time, contest_count)
+            SELECT handle, new_rating, MAX(rating_update_time), COUNT(*)
+            FROM rating_change
+            GROUP BY handle
+        """)
+        await self.conn.commit()
+
+    async def _update_latest_rating(self, handles: set[str]) -> None:
+        """Recompute latest_rating for `handles`, without committing."""
+        params = [(handle,) for handle in handles]
+        await self.conn.executemany(
+            'DELETE FROM latest_rating WHERE handle = ?', params
+        )
+        await self.conn.executemany(
+            """
+            INSERT INTO latest_rating (handle, rating, time, contest_count)
+            SELECT handle, new_rating, MAX(rating_update_time), COUNT(*)
+            FROM rating_change
+            WHERE handle = ?
+            GROUP BY handle
+            """,
+            params,
+        )
+
+    async def _migrate_tags(self) -> None:
+        """Move the tags stored as JSON by older versions to column tag_ids."""
+        for table in ('problem', 'problem2'):
+            cursor = await self.conn.execute(f'PRAGMA table_info({table})')
+            columns = {column[1] for column in await cursor.fetchall()}
+            if 'tag_ids' not in columns:
+                await self.conn.execute(f'ALTER TABLE {table} ADD COLUMN tag_ids BLOB')
+            if 'tags' not in columns:
+                continue
+            cursor = await self.conn.execute(
+                f'SELECT rowid, tags FROM {table} WHERE tags IS NOT NULL'
+            )
+            rows = [
+                (rowid, json.loads(tags)) for rowid, tags in await cursor.fetchall()
+            ]
+            tag_ids = await self._get_tag_ids(rows_tags for _, rows_tags in rows)
+            await self.conn.executemany(
+                f'UPDATE {table} SET tag_ids = ?, tags = NULL WHERE rowid = ?',
+                [
+                    (self._pack_tag_ids([tag_ids[tag] for tag in tags]), rowid)
+                    for rowid, tags in rows
+                ],
+            )
+        await self.conn.commit()
 
     @staticmethod
-    def _squish_tags(problem: cf.Problem) -> tuple[Any, ...]:
-        return (
-            problem.contestId,
-            problem.problemsetName,
-            problem.index,
-            problem.name,
-            problem.type,
-            problem.points,
-            problem.rating,
-            json.dumps(problem.tags),
+    def _pack_tag_ids(tag_ids: list[int]) -> bytes:
+        packed = array('H', tag_ids)
+        if sys.byteorder == 'big':
+            packed.byteswap()
+        return packed.tobytes()
+
+    @staticmethod
+    def _unpack_tag_ids(packed: bytes) -> array:
+        tag_ids = array('H', packed)
+        if sys.byteorder == 'big':
+            tag_ids.byteswap()
+        return tag_ids
+
+    async def _get_tag_ids(self, tag_lists: Iterator[list[str]]) -> dict[str, int]:
+        """Return the id of every tag, adding the tags in `tag_lists` first."""
+        tags = {tag for tag_list in tag_lists for tag in tag_list}
+        await self.conn.executemany(
+            'INSERT OR IGNORE INTO tag (name) VALUES (?)', [(tag,) for tag in tags]
         )
+        cursor = await self.conn.execute('SELECT name, id FROM tag')
+        return dict(await cursor.fetchall())
+
+    async def _get_problem_rows(
+        self, problems: list[cf.Problem]
+    ) -> list[tuple[Any, ...]]:
+        tag_ids = await self._get_tag_ids(problem.tags for problem in problems)
+        return [
+            (
+                problem.contestId,
+                problem.problemsetName,
+                problem.index,
+                problem.name,
+                problem.type,
+                problem.points,
+                problem.rating,
+                self._pack_tag_ids([tag_ids[tag] for tag in problem.tags]),
+            )
+            for problem in problems
+        ]
+
+    async def _iter_problems(
+        self, table: str, where: str = '', params: tuple[Any, ...] = ()
+    ) -> AsyncIterator[cf.Problem]:
+        """Yield the problems stored in `table`.
+
+        Tag names are interned, and problems with the same tags share one list
+        of them.
+        """
+        cursor = await self.conn.execute('SELECT id, name FROM tag')
+        tag_names = {
+            tag_id: sys.intern(name) for tag_id, name in await cursor.fetchall()
+        }
+        tags_by_packed: dict[bytes | None, list[str]] = {None: []}
+        query = f"""
+            SELECT
+                contest_id, problemset_name, [index], name, type, points, rating,
+                tag_ids
+            FROM {table}
+            {where}
+        """
+        async for rows in self._iter_rows(query, params):
+            for *args, packed in rows:
+                tags = tags_by_packed.get(packed)
+                if tags is None:
+                    tags = [
+                        tag_names[tag_id] for tag_id in self._unpack_tag_ids(packed)
+                    ]
+                    tags_by_packed[packed] = tags
+                yield cf.Problem._make((*args, tags))
 
     async def cache_problems(self, problems: list[cf.Problem]) -> int:
         query = """
             INSERT OR REPLACE INTO problem (
-                contest_id, problemset_name, [index], name, type, points, rating, tags
+                contest_id, problemset_name, [index], name, type, points, rating,
+                tag_ids
             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """
         cursor = await self.conn.executemany(
-            query, list(map(self._squish_tags, problems))
+            query, await self._get_problem_rows(problems)
         )
         rc = cursor.rowcount
         await self.conn.commit()
         return rc
 
-    @staticmethod
-    def _unsquish_tags(problem: tuple[Any, ...]) -> cf.Problem:
-        args = problem[:-1]
-        tags: list[str] = json.loads(problem[-1])
-        return cf.Problem._make((*args, tags))
+    def iter_problems(self) -> AsyncIterator[cf.Problem]:
+        return self._iter_problems('problem')
 
     async def fetch_problems(self) -> list[cf.Problem]:
-        query = """
-            SELECT
-                contest_id, problemset_name, [index], name, type, points, rating, tags
-            FROM problem
-        """
-        cursor = await self.conn.execute(query)
-        res = await cursor.fetchall()
-        return list(map(self._unsquish_tags, res))
+        return [problem async for problem in self.iter_problems()]
 
     async def save_rating_changes(self, changes: list[cf.RatingChange]) -> int:
         change_tuples = [
@@ -176,6 +402,7 @@ class CacheDbConn:
         """
         cursor = await self.conn.executemany(query, change_tuples)
         rc = cursor.rowcount
+        await self._update_latest_rating({change.handle for change in changes})
         await self.conn.commit()
         return rc
 
@@ -183,33 +410,18 @@ class CacheDbConn:
         if contest_id is None:
             query = 'DELETE FROM rating_change'
             await self.conn.execute(query)
+            await self.conn.execute('DELETE FROM latest_rating')
         else:
+            cursor = await self.conn.execute(
+                'SELECT handle FROM rating_change WHERE contest_id = ?', (contest_id,)
+            )
+            handles = {handle for (handle,) in await cursor.fetchall()}
             query = 'DELETE FROM rating_change WHERE contest_id = ?'
             await self.conn.execute(query, (contest_id,))
+            await self._update_latest_rating(handles)
         await self.conn.commit()
 
-    async def get_users_with_more_than_n_contests(
-        self, time_cutoff: int, n: int
-    ) -> list[str]:
-        query = """
-            SELECT
-                handle,
-                COUNT(*) AS num_contests
-            FROM rating_change
-            GROUP BY handle
-            HAVING num_contests >= ? AND MAX(rating_update_time) >= ?
-        """
-        cursor = await self.conn.execute(
-            query,
-            (
-                n,
-                time_cutoff,
-            ),
-        )
-        res = await cursor.fetchall()
-        return [user[0] for user in res]
-
-    async def get_all_rating_changes(self) -> Iterator[cf.RatingChange]:
+    async def iter_all_rating_changes(self) -> AsyncIterator[cf.RatingChange]:
         query = """
             SELECT
                 contest_id,
@@ -223,21 +435,48 @@ class CacheDbConn:
             LEFT JOIN contest c ON r.contest_id = c.id
             ORDER BY rating_update_time
         """
-        cursor = await self.conn.execute(query)
-        res = await cursor.fetchall()
-        return (cf.RatingChange._make(change) for change in res)
+        async for rows in self._iter_rows(query):
+            for row in rows:
+                yield cf.RatingChange._make(row)
 
     async def get_latest_rating_by_handle(self) -> dict[str, int]:
-        """Return {handle: latest_new_rating} without loading the full table."""
+        """Return {handle: latest_new_rating} for every handle."""
+        query = 'SELECT handle, rating FROM latest_rating'
+        result: dict[str, int] = {}
+        async for rows in self._iter_rows(query):
+            result.update(rows)
+        return result
+
+    async def get_rating_activity(self) -> list[tuple[int, int, int]]:
+        """Return (rating, time of the last change, number of contests) for
+        every handle."""
+        query = 'SELECT rating, time, contest_count FROM latest_rating'
+        result: list[tuple[int, int, int]] = []
+        async for rows in self._iter_rows(query):
+            result += rows
+        return result
+
+    async def get_latest_rating_version(self) -> tuple[int, int, int]:
+        """Return a value that changes whenever latest_rating does."""
         query = """
-            SELECT handle, new_rating
-            FROM rating_change
-            ORDER BY rating_update_time
+            SELECT COUNT(*), IFNULL(MAX(time), 0), IFNULL(SUM(rating), 0)
+            FROM latest_rating
         """
         cursor = await self.conn.execute(query)
+        return await cursor.fetchone()
+
+    async def get_latest_ratings(self, handles: Iterable[str]) -> dict[str, int]:
+        """Return {handle: latest_new_rating} for the given handles that have
+        rating changes."""
+        handles = list(handles)
         result: dict[str, int] = {}
-        async for handle, new_rating in cursor:
-            result[handle] = new_rating
+        for i in range(0, len(handles), _MAX_PARAMS):
+            batch = handles[i : i + _MAX_PARAMS]
+            query = 'SELECT handle, rating FROM latest_rating WHERE handle IN ({})'
+            cursor = await self.conn.execute(
+                query.format(', '.join('?' * len(batch))), batch
+            )
+            result.update(await cursor.fetchall())
         return result
 
     async def get_rating_changes_for_contest(
@@ -260,6 +499,31 @@ class CacheDbConn:
         res = await cursor.fetchall()
         return [cf.RatingChange._make(change) for change in res]
 
+    async def get_rating_change_columns(
+        self, contest_id: int
+    ) -> list[tuple[str, int, int, int]]:
+        """Return (handle, rank, old_rating, new_rating) of the rating changes
+        of a contest."""
+        query = """
+            SELECT handle, rank, old_rating, new_rating
+            FROM rating_change
+            WHERE contest_id = ?
+        """
+        rows: list[tuple[str, int, int, int]] = []
+        async for batch in self._iter_rows(query, (contest_id,)):
+            rows += batch
+        return rows
+
+    async def get_contest_ids_with_rating_changes(self) -> list[int]:
+        query = """
+            SELECT DISTINCT contest_id
+            FROM rating_change
+            ORDER BY contest_id
+        """
+        cursor = await self.conn.execute(query)
+        res = await cursor.fetchall()
+        return [contest_id for (contest_id,) in res]
+
     async def has_rating_changes_saved(self, contest_id: int) -> bool:
         query = 'SELECT contest_id FROM rating_change WHERE contest_id = ?'
         cursor = await self.conn.execute(query, (contest_id,))
@@ -287,26 +551,23 @@ class CacheDbConn:
     async def cache_problemset(self, problemset: list[cf.Problem]) -> int:
         query = """
             INSERT OR REPLACE INTO problem2 (
-                contest_id, problemset_name, [index], name, type, points, rating, tags
+                contest_id, problemset_name, [index], name, type, points, rating,
+                tag_ids
             )
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """
         cursor = await self.conn.executemany(
-            query, list(map(self._squish_tags, problemset))
+            query, await self._get_problem_rows(problemset)
         )
         rc = cursor.rowcount
         await self.conn.commit()
         return rc
 
+    def iter_problems2(self) -> AsyncIterator[cf.Problem]:
+        return self._iter_problems('problem2')
+
     async def fetch_problems2(self) -> list[cf.Problem]:
-        query = """
-            SELECT
-                contest_id, problemset_name, [index], name, type, points, rating, tags
-            FROM problem2
-        """
-        cursor = await self.conn.execute(query)
-        res = await cursor.fetchall()
-        return list(map(self._unsquish_tags, res))
+        return [problem async for problem in self.iter_problems2()]
 
     async def clear_problemset(self, contest_id: int | None = None) -> None:
         if contest_id is None:
@@ -317,21 +578,153 @@ class CacheDbConn:
             await self.conn.execute(query, (contest_id,))
 
     async def fetch_problemset(self, contest_id: int) -> list[cf.Problem]:
+        return [
+            problem
+            async for problem in self._iter_problems(
+                'problem2', 'WHERE contest_id = ?', (contest_id,)
+            )
+        ]
+
+    async def problemset_empty(self) -> bool:
+        query = 'SELECT 1 FROM problem2'
+        cursor = await self.conn.execute(query)
+        res = await cursor.fetchone()
+        return res is None
+
+    @staticmethod
+    def _unsquish_ranklist_row(row: list[Any]) -> cf.RanklistRow:
+        party, rank, points, penalty, problem_results = row
+        party = cf.Party._make(party)
+        party = party._replace(members=[cf.Member._make(m) for m in party.members])
+        return cf.RanklistRow(
+            party,
+            rank,
+            points,
+            penalty,
+            [cf.ProblemResult._make(result) for result in problem_results],
+        )
+
+    async def save_ranklist(
+        self,
+        contest: cf.Contest,
+        problems: list[cf.Problem],
+        standings: list[cf.RanklistRow],
+        fetch_time: float,
+        is_rated: bool,
+        correction: int | None = None,
+        encoder: RanklistEncoder | None = None,
+    ) -> None:
+        """Save the ranklist of a monitored contest, encoding the standings with
+        `encoder` if given."""
+        query = """
+            INSERT OR REPLACE INTO ranklist (
+                contest_id, fetch_time, is_rated, correction, contest, problems,
+                standings
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        """
+        await self.conn.execute(
+            query,
+            (
+                contest.id,
+                fetch_time,
+                is_rated,
+                correction,
+                json.dumps(contest),
+                json.dumps(problems),
+                json.dumps(standings) if encoder is None else encoder.encode(standings),
+            ),
+        )
+        await self.conn.commit()
+
+    async def fetch_ranklists(self) -> list[SavedRanklist]:
         query = """
             SELECT
-                contest_id, problemset_name, [index], name, type, points, rating, tags
-            FROM problem2
+                contest, problems, standings, fetch_time, is_rated, correction
+            FROM ranklist
+        """
+        cursor = await self.conn.execute(query)
+        res = await cursor.fetchall()
+        return [
+            SavedRanklist(
+                cf.Contest._make(json.loads(contest)),
+                [cf.Problem._make(problem) for problem in json.loads(problems)],
+                list(map(self._unsquish_ranklist_row, json.loads(standings))),
+                fetch_time,
+                bool(is_rated),
+                correction,
+            )
+            for contest, problems, standings, fetch_time, is_rated, correction in res
+        ]
+
+    async def clear_ranklist(self, contest_id: int) -> None:
+        query = 'DELETE FROM ranklist WHERE contest_id = ?'
+        await self.conn.execute(query, (contest_id,))
+        await self.conn.commit()
+
+    async def save_predicted_rating_changes(
+        self,
+        contest_id: int,
+        predictions: list[tuple[str, int, int]],
+        fetch_time: float,
+    ) -> int:
+        """Replace the predictions for a contest with `predictions`, given as
+        (handle, rating, delta)."""
+        await self.conn.execute(
+            'DELETE FROM predicted_rating_change WHERE contest_id = ?', (contest_id,)
+        )
+        query = """
+            INSERT INTO predicted_rating_change (
+                contest_id, handle, rating, delta, fetch_time
+            ) VALUES (?, ?, ?, ?, ?)
+        """
+        cursor = await self.conn.executemany(
+            query,
+            [
+                (contest_id, handle, rating, delta, fetch_time)
+                for handle, rating, delta in predictions
+            ],
+        )
+        rc = cursor.rowcount
+        await self.conn.commit()
+        return rc
+
+    async def get_predicted_rating_changes(
+        self, contest_id: int
+    ) -> list[tuple[str, int, int]]:
+        """Return the (handle, rating, delta) predicted for a contest."""
+        query = """
+            SELECT handle, rating, delta
+            FROM predicted_rating_change
             WHERE contest_id = ?
         """
         cursor = await self.conn.execute(query, (contest_id,))
         res = await cursor.fetchall()
-        return list(map(self._unsquish_tags, res))
+        return list(res)
 
-    async def problemset_empty(self) -> bool:
-        query = 'SELECT 1 FROM problem2'
-        cursor = await self.conn.execute(query)
-        res = await cursor.fetchone()
-        return res is None
+    async def get_prediction_errors(
+        self, contest_id: int
+    ) -> list[tuple[str, int, int]]:
+        """Return the (handle, predicted delta, actual delta) of each contestant
+        of a contest with both a prediction and a final rating change.
+
+        Contestants with no previous rating are left out, since their actual
+        deltas include Codeforces' starting bonus.
+        """
+        query = """
+            SELECT p.handle, p.delta, r.new_rating - r.old_rating
+            FROM predicted_rating_change p
+            JOIN rating_change r
+                ON r.contest_id = p.contest_id AND r.handle = p.handle
+            WHERE p.contest_id = ? AND r.old_rating > 0
+        """
+        cursor = await self.conn.execute(query, (contest_id,))
+        res = await cursor.fetchall()
+        return list(res)
+
+    async def clear_predicted_rating_changes(self, contest_id: int) -> None:
+        query = 'DELETE FROM predicted_rating_change WHERE contest_id = ?'
+        await self.conn.execute(query, (contest_id,))
+        await self.conn.commit()
 
     async def close(self) -> None:
         if self.conn:
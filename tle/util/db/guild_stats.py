@@ -0,0 +1,101 @@
+import bisect
+import itertools
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+
+from tle.util import codeforces_api as cf
+
+# Versions are unique across all guilds and rebuilds, so that they can key
+# cached plots.
+_versions = itertools.count(1)
+
+
+class GuildStats:
+    """The cached Codeforces profiles of the active members of a guild, with
+    counts and ratings by country and rank kept up to date as members change.
+
+    Members whose handle is not in the profile cache have a profile of Nones,
+    like in `UserDbConn.get_cf_users_for_guild`.
+    """
+
+    def __init__(self, users: Iterable[tuple[int, cf.User]] = ()) -> None:
+        self.members: dict[int, cf.User] = {}
+        self.country_counts: Counter[str] = Counter()
+        self.rank_counts: Counter[str] = Counter()
+        # Sorted, rated members only.
+        self._ratings_by_country: defaultdict[str, list[int]] = defaultdict(list)
+        self._user_ids_by_handle: defaultdict[str, set[int]] = defaultdict(set)
+        for user_id, user in users:
+            self._add(user_id, user)
+        self.version = next(_versions)
+
+    def set_member(self, user_id: int, user: cf.User) -> None:
+        self._remove(user_id)
+        self._add(user_id, user)
+        self.version = next(_versions)
+
+    def remove_member(self, user_id: int) -> None:
+        self._remove(user_id)
+        self.version = next(_versions)
+
+    def update_user(self, user: cf.User) -> None:
+        """Replace the profile of the members with the handle of `user`."""
+        user_ids = self._user_ids_by_handle.get(user.handle)
+        if not user_ids:
+            return
+        for user_id in list(user_ids):
+            self._remove(user_id)
+            self._add(user_id, user)
+        self.version = next(_versions)
+
+    def get_ratings(self, country: str) -> list[int]:
+        """Return the sorted ratings of the rated members from `country`."""
+        return self._ratings_by_country.get(country, [])
+
+    def get_members(
+        self, countries: Iterable[str] | None = None
+    ) -> list[tuple[int, cf.User]]:
+        """Return the members, only those from `countries` if given."""
+        if countries is None:
+            return list(self.members.items())
+        countries = set(countries)
+        return [
+            (user_id, user)
+            for user_id, user in self.members.items()
+            if user.country in countries
+        ]
+
+    def _add(self, user_id: int, user: cf.User) -> None:
+        self.members[user_id] = user
+        if user.handle is not None:
+            self._user_ids_by_handle[user.handle].add(user_id)
+        if user.country:
+            self.country_counts[user.country] += 1
+            if user.rating:
+                bisect.insort(self._ratings_by_country[user.country], user.rating)
+        if user.rating is not None:
+            self.rank_counts[cf.rating2rank(user.rating).title] += 1
+
+    def _remove(self, user_id: int) -> None:
+        user = self.members.pop(user_id, None)
+        if user is None:
+            return
+        if user.handle is not None:
+            user_ids = self._user_ids_by_handle[user.handle]
+            user_ids.discard(user_id)
+            if not user_ids:
+                del self._user_ids_by_handle[user.handle]
+        if user.country:
+            self.country_counts[user.country] -= 1
+            if not self.country_counts[user.country]:
+                del self.country_counts[user.country]
+            if user.rating:
+                ratings = self._ratings_by_country[user.country]
+                del ratings[bisect.bisect_left(ratings, user.rating)]
+                if not ratings:
+                    del self._ratings_by_country[user.country]
+        if user.rating is not None:
+            title = cf.rating2rank(user.rating).title
+            self.rank_counts[title] -= 1
+            if not self.rank_counts[title]:
+                del self.rank_counts[title]
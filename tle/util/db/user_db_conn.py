@@ -9,6 +9,7 @@ from discord.ext import commands
 
 from tle import constants
 from tle.util import codeforces_api as cf
+from tle.util.db.guild_stats import GuildStats
 
 _DEFAULT_VC_RATING = 1500
 
@@ -98,6 +99,11 @@ class UserDbConn:
     def __init__(self, dbfile: str) -> None:
         self.db_file = dbfile
         self._conn: aiosqlite.Connection | None = None
+        # Aggregates of the guilds asked for, updated by the writes to
+        # user_handle and cf_user_cache. Writes counted to detect the ones made
+        # while an aggregate is built.
+        self._guild_stats: dict[str, GuildStats] = {}
+        self._guild_stats_writes = 0
 
     @property
     def conn(self) -> aiosqlite.Connection:
@@ -142,6 +148,11 @@ class UserDbConn:
                 title_photo         TEXT
             )
         """)
+        # Handles are looked up case-insensitively.
+        await self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS
+            ix_cf_user_cache_upper_handle ON cf_user_cache (UPPER(handle))
+        """)
         # TODO: Make duel tables guild-aware.
         await self.conn.execute("""
             CREATE TABLE IF NOT EXISTS duelist(
@@ -149,6 +160,9 @@ class UserDbConn:
                 "rating"   INTEGER NOT NULL
             )
         """)
+        await self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS ix_duelist_rating ON duelist (rating)
+        """)
         await self.conn.execute("""
             CREATE TABLE IF NOT EXISTS duel(
                 "id"           INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -165,6 +179,22 @@ class UserDbConn:
                 "type"         INTEGER
             )
         """)
+        await self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS
+            ix_duel_challenger_status ON duel (challenger, status)
+        """)
+        await self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS
+            ix_duel_challengee_status ON duel (challengee, status)
+        """)
+        await self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS
+            ix_duel_status_start_time ON duel (status, start_time)
+        """)
+        await self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS
+            ix_duel_status_type_finish_time ON duel (status, type, finish_time)
+        """)
         await self.conn.execute("""
             CREATE TABLE IF NOT EXISTS "challenge" (
                 "id" INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -178,6 +208,10 @@ class UserDbConn:
                 "status" INTEGER NOT NULL
             )
         """)
+        await self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS
+            ix_challenge_user_id_issue_time ON challenge (user_id, issue_time)
+        """)
         await self.conn.execute("""
             CREATE TABLE IF NOT EXISTS "user_challenge" (
                 "user_id" TEXT,
@@ -220,6 +254,9 @@ class UserDbConn:
                 "guild_id" TEXT
             )
         """)
+        await self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS ix_rated_vcs_status ON rated_vcs (status)
+        """)
 
         # TODO: Do we need to explicitly specify the fk constraint
         #       or just depend on the middleware?
@@ -236,6 +273,10 @@ class UserDbConn:
                 PRIMARY KEY (vc_id, user_id)
             )
         """)
+        await self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS
+            ix_rated_vc_users_user_id ON rated_vc_users (user_id, vc_id)
+        """)
 
         await self.conn.execute("""
             CREATE TABLE IF NOT EXISTS rated_vc_settings (
@@ -272,6 +313,11 @@ class UserDbConn:
                 PRIMARY KEY (original_msg_id, emoji)
             )
          """)
+        await self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS
+            ix_starboard_message_v1_starboard_msg_id
+            ON starboard_message_v1 (starboard_msg_id)
+        """)
 
         # === one-time migration from old tables ===
         cursor = await self.conn.execute(
@@ -550,6 +596,9 @@ class UserDbConn:
         """
         cursor = await self.conn.execute(query, user)
         await self.conn.commit()
+        self._guild_stats_writes += 1
+        for stats in self._guild_stats.values():
+            stats.update_user(cf.User._make(user))
         return cursor.rowcount
 
     async def fetch_cf_user(self, handle: str) -> Any:
@@ -581,6 +630,10 @@ class UserDbConn:
         """
         cursor = await self.conn.execute(query, (user_id, guild_id, handle))
         await self.conn.commit()
+        self._guild_stats_writes += 1
+        stats = self._guild_stats.get(str(guild_id))
+        if stats is not None:
+            stats.set_member(int(user_id), await self._get_cached_profile(handle))
         return cursor.rowcount
 
     async def set_inactive(self, guild_id_user_id_pairs: list[tuple[str, str]]) -> int:
@@ -590,6 +643,11 @@ class UserDbConn:
         """
         cursor = await self.conn.executemany(query, guild_id_user_id_pairs)
         await self.conn.commit()
+        self._guild_stats_writes += 1
+        for guild_id, user_id in guild_id_user_id_pairs:
+            stats = self._guild_stats.get(str(guild_id))
+            if stats is not None:
+                stats.remove_member(int(user_id))
         return cursor.rowcount
 
     async def get_handle(self, user_id: int, guild_id: int) -> str | None:
@@ -617,6 +675,7 @@ class UserDbConn:
         """
         cursor = await self.conn.execute(query, (handle, guild_id))
         await self.conn.commit()
+        self._forget_guild_stats(guild_id)
         return cursor.rowcount
 
     async def get_handles_for_guild(self, guild_id: int) -> list[tuple[int, str]]:
@@ -634,7 +693,7 @@ class UserDbConn:
     async def get_cf_users_for_guild(self, guild_id: int) -> list[Any]:
         query = """
             SELECT
-                u.user_id, c.handle, c.first_name, c.last_name, c.country,
+                u.user_id, u.handle, c.first_name, c.last_name, c.country,
                 c.city, c.organization, c.contribution, c.rating, c.maxRating,
                 c.last_online_time, c.registration_time, c.friend_of_count,
                 c.title_photo
@@ -647,6 +706,39 @@ class UserDbConn:
         res = await cursor.fetchall()
         return [(int(t[0]), cf.User._make(t[1:])) for t in res]
 
+    async def get_guild_stats(self, guild_id: int) -> GuildStats:
+        """Return the aggregates of `get_cf_users_for_guild`, which are built
+        on first use and then kept up to date."""
+        stats = self._guild_stats.get(str(guild_id))
+        if stats is not None:
+            return stats
+        writes = self._guild_stats_writes
+        stats = GuildStats(await self.get_cf_users_for_guild(guild_id))
+        if writes == self._guild_stats_writes:
+            self._guild_stats[str(guild_id)] = stats
+        return stats
+
+    def _forget_guild_stats(self, guild_id: int | str) -> None:
+        self._guild_stats_writes += 1
+        self._guild_stats.pop(str(guild_id), None)
+
+    async def _get_cached_profile(self, handle: str) -> cf.User:
+        """Return the cached profile of `handle` as joined by
+        `get_cf_users_for_guild`."""
+        query = """
+            SELECT
+                handle, first_name, last_name, country, city, organization,
+                contribution, rating, maxRating, last_online_time,
+                registration_time, friend_of_count, title_photo
+            FROM cf_user_cache
+            WHERE handle = ?
+        """
+        cursor = await self.conn.execute(query, (handle,))
+        user = await cursor.fetchone()
+        if user is None:
+            return cf.User._make((handle,) + (None,) * (len(cf.User._fields) - 1))
+        return cf.User._make(user)
+
     async def get_reminder_settings(self, guild_id: int) -> Any:
         query = """
             SELECT channel_id, role_id, before
@@ -1208,6 +1300,7 @@ class UserDbConn:
         """
         await self.conn.execute(inactive_query, (id,))
         await self.conn.commit()
+        self._forget_guild_stats(id)
 
     async def update_status(self, guild_id: str, active_ids: list[str]) -> int:
         placeholders = ', '.join(['?'] * len(active_ids))
@@ -1221,6 +1314,7 @@ class UserDbConn:
         """.format(placeholders)
         cursor = await self.conn.execute(active_query, (*active_ids, guild_id))
         await self.conn.commit()
+        self._forget_guild_stats(guild_id)
         return cursor.rowcount
 
     # Rated VC stuff
@@ -9,7 +9,7 @@ import discord
 from discord.ext import commands
 
 from tle import constants
-from tle.util import codeforces_api as cf, db, tasks
+from tle.util import codeforces_api as cf, db, tasks, workers
 
 logger = logging.getLogger(__name__)
 
@@ -105,7 +105,10 @@ async def bot_error_handler(ctx: commands.Context, exception: Exception) -> None
         await ctx.send(embed=embed_alert('Commands are disabled in private channels'))
     elif isinstance(exception, commands.DisabledCommand):
         await ctx.send(embed=embed_alert('Sorry, this command is temporarily disabled'))
-    elif isinstance(exception, (cf.CodeforcesApiError, commands.UserInputError)):
+    elif isinstance(
+        exception,
+        (cf.CodeforcesApiError, workers.WorkerPoolError, commands.UserInputError),
+    ):
         await ctx.send(embed=embed_alert(exception))
     else:
         msg = 'Ignoring exception in command {}:'.format(ctx.command)
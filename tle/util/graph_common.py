@@ -1,14 +1,25 @@
+import functools
 import io
+import itertools
+import math
+import pickle
 from collections.abc import Sequence
 
 import discord
 import matplotlib
 import matplotlib.font_manager
+import numpy as np
 
 matplotlib.use('agg')  # Explicitly set the backend to avoid issues
 
+import seaborn as sns
 from cycler import cycler
-from matplotlib import pyplot as plt
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.colors import to_rgba_array
+from matplotlib.figure import Figure
+from matplotlib.image import AxesImage
 
 from tle import constants
 from tle.util import codeforces_api as cf
@@ -35,34 +46,141 @@ class StrWrap:
         return self.string
 
 
-def get_current_figure_as_file() -> discord.File:
+def setup_style() -> None:
+    """Set the matplotlib and seaborn defaults used by all plots."""
+    matplotlib.rcParams['figure.figsize'] = 7.0, 3.5
+    sns.set()
+    options = {
+        'axes.edgecolor': '#A0A0C5',
+        'axes.spines.top': False,
+        'axes.spines.right': False,
+    }
+    sns.set_style('darkgrid', options)
+
+
+def new_figure(
+    figsize: tuple[float, float] | None = None,
+    ranks: Sequence[cf.Rank] | None = None,
+) -> tuple[Figure, Axes]:
+    """Return a new figure with a single axes, with the bands of `ranks` in
+    the background if given.
+
+    The figure is drawn on its own Agg canvas and never registered with pyplot,
+    so plots can be rendered concurrently in threads or worker processes and
+    are freed once unreferenced. It is a copy of a template built on first use
+    for the same arguments, with the style `setup_style` had set by then.
+    """
+    ranks = tuple(ranks) if ranks is not None else None
+    fig = pickle.loads(_get_template(figsize, ranks))
+    FigureCanvasAgg(fig)
+    return fig, fig.axes[0]
+
+
+@functools.cache
+def _get_template(
+    figsize: tuple[float, float] | None, ranks: tuple[cf.Rank, ...] | None
+) -> bytes:
+    # Unpickling a figure takes about half as long as building its axes.
+    fig = Figure(figsize=figsize)
+    ax = fig.add_subplot()
+    if ranks is not None:
+        plot_rating_bg(ax, ranks)
+    return pickle.dumps(fig)
+
+
+def figure_to_bytes(fig: Figure) -> bytes:
     buffer = io.BytesIO()
-    plt.savefig(
+    fig.savefig(
         buffer,
         format='png',
-        facecolor=plt.gca().get_facecolor(),
+        facecolor=fig.axes[0].get_facecolor(),
         bbox_inches='tight',
         pad_inches=0.25,
     )
-    plt.close()
-    buffer.seek(0)
-    return discord.File(buffer, filename='plot.png')
-
-
-def plot_rating_bg(ranks: Sequence[cf.Rank]) -> None:
-    ymin, ymax = plt.gca().get_ylim()
-    bgcolor = plt.gca().get_facecolor()
-    for rank in ranks:
-        plt.axhspan(
-            rank.low,
-            rank.high,
-            facecolor=rank.color_graph,
-            alpha=0.8,
-            edgecolor=bgcolor,
-            linewidth=0.5,
-        )
-
-    locs, labels = plt.xticks()
-    for loc in locs:
-        plt.axvline(loc, color=bgcolor, linewidth=0.5)
-    plt.ylim(ymin, ymax)
+    return buffer.getvalue()
+
+
+def bytes_to_file(data: bytes, filename: str = 'plot.png') -> discord.File:
+    return discord.File(io.BytesIO(data), filename=filename)
+
+
+def plot_rating_bg(ax: Axes, ranks: Sequence[cf.Rank]) -> None:
+    """Color the background of `ax` by the bands of `ranks`.
+
+    The bands are one collection spanning the axes horizontally, so they do
+    not change the data limits. They are drawn between the axes background
+    and the vertical grid lines, which are recolored to separate them like
+    the band edges do. Prefer `new_figure(ranks=...)`, which starts from a
+    copy of a figure that has the bands already.
+    """
+    bgcolor = ax.get_facecolor()
+    bands = PolyCollection(
+        [
+            [(0, rank.low), (1, rank.low), (1, rank.high), (0, rank.high)]
+            for rank in ranks
+        ],
+        facecolors=[rank.color_graph for rank in ranks],
+        edgecolors=[bgcolor],
+        linewidths=0.5,
+        alpha=0.8,
+        transform=ax.get_yaxis_transform(),
+        zorder=0.4,
+        # Otherwise legends given only labels would pick the bands.
+        label='_nolegend_',
+    )
+    ax.add_collection(bands, autolim=False)
+    ax.set_axisbelow(True)
+    ax.grid(False, axis='y')
+    ax.grid(True, axis='x', color=bgcolor, linewidth=0.5)
+
+
+# Upper bounds of all ranks but the last, and the colors of all ranks.
+_RANK_HIGHS = np.array([rank.high for rank in cf.RATED_RANKS[:-1]])
+_RANK_COLORS = np.array([rank.color_graph for rank in cf.RATED_RANKS])
+
+
+def rating_colors(ratings: np.ndarray) -> np.ndarray:
+    """Return the `color_graph` of the rank of each rating, as
+    `cf.rating2rank` would."""
+    return _RANK_COLORS[np.searchsorted(_RANK_HIGHS, ratings, side='right')]
+
+
+def scatter_image(
+    ax: Axes, x: np.ndarray, y: np.ndarray, colors: np.ndarray, size: float
+) -> AxesImage:
+    """Draw a scatter plot of square markers `size` points wide on `ax` as a
+    single image with a pixel per pixel of the axes, later points on top.
+
+    The limits of `ax` must be set already. For tens of thousands of markers a
+    few pixels wide this looks like `ax.scatter`, but is drawn in a fraction of
+    the time.
+    """
+    bbox = ax.get_window_extent()
+    width, height = math.ceil(bbox.width), math.ceil(bbox.height)
+    pixels = np.floor(ax.transData.transform(np.column_stack([x, y])) - bbox.p0)
+    pixels = pixels.astype(np.int64)
+    unique_colors, color_ids = np.unique(colors, return_inverse=True)
+    rgba = (to_rgba_array(unique_colors) * 255).astype(np.uint8)[color_ids]
+    image = np.zeros((height, width, 4), dtype=np.uint8)
+    side = max(1, round(size * ax.figure.dpi / 72))
+    for dx, dy in itertools.product(range(side), repeat=2):
+        px = pixels[:, 0] + dx - side // 2
+        py = pixels[:, 1] + dy - side // 2
+        inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+        # Of repeated indices the last assignment wins, so later points stay
+        # on top.
+        image[py[inside], px[inside]] = rgba[inside]
+    (x0, x1), (y0, y1) = ax.get_xlim(), ax.get_ylim()
+    return ax.imshow(
+        image,
+        extent=(
+            x0,
+            x0 + (x1 - x0) * width / bbox.width,
+            y0,
+            y0 + (y1 - y0) * height / bbox.height,
+        ),
+        origin='lower',
+        aspect='auto',
+        interpolation='nearest',
+        zorder=1,
+    )
@@ -1,21 +1,62 @@
-from collections.abc import ItemsView, Iterator
+import sys
+from collections.abc import ItemsView, Iterable, Iterator, ValuesView
 from typing import Any
 
 
+class _HandleItemsView(ItemsView):
+    """Items of a HandleDict, read straight from its store."""
+
+    _mapping: 'HandleDict'
+
+    def __iter__(self) -> Iterator[tuple[str, Any]]:
+        return iter(self._mapping._store.values())
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({list(self)!r})'
+
+
+class _HandleValuesView(ValuesView):
+    _mapping: 'HandleDict'
+
+    def __iter__(self) -> Iterator[Any]:
+        return (value for _, value in self._mapping._store.values())
+
+
 class HandleDict:
-    """A case insensitive dictionary for handling usernames."""
+    """A case insensitive dictionary for handling usernames.
+
+    If `intern` is set, the lowercased keys are interned, so that dictionaries
+    over the same handles share their key strings.
+    """
 
-    def __init__(self) -> None:
-        self._store: dict[str, tuple[str, Any]] = {}
+    def __init__(
+        self, items: Iterable[tuple[str, Any]] = (), *, intern: bool = False
+    ) -> None:
+        self._intern = intern
+        # Inlined lowering, this is the hot path when building large dicts.
+        self._store: dict[str, tuple[str, Any]] = {
+            (
+                (sys.intern(key.lower()) if intern else key.lower())
+                if isinstance(key, str)
+                else key
+            ): (key, value)
+            for key, value in items
+        }
 
     @staticmethod
     def _getlower(key: str) -> str:
         return key.lower() if isinstance(key, str) else key
 
+    def _getlower_for_store(self, key: str) -> str:
+        # Only keys that are stored get interned, lookups are left alone.
+        if self._intern and isinstance(key, str):
+            return sys.intern(key.lower())
+        return self._getlower(key)
+
     def __setitem__(self, key: str, value: Any) -> None:
         # Use the lowercased key for lookups, but store the actual
         # key alongside the value.
-        self._store[self._getlower(key)] = (key, value)
+        self._store[self._getlower_for_store(key)] = (key, value)
 
     def __getitem__(self, key: str) -> Any:
         return self._store[self._getlower(key)][1]
@@ -23,11 +64,24 @@ class HandleDict:
     def __delitem__(self, key: str) -> None:
         del self._store[self._getlower(key)]
 
+    def __contains__(self, key: object) -> bool:
+        return self._getlower(key) in self._store  # type: ignore[arg-type]
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        item = self._store.get(self._getlower(key))
+        return default if item is None else item[1]
+
     def __iter__(self) -> Iterator[str]:
         return (cased_key for cased_key, mapped_value in self._store.values())
 
     def items(self) -> ItemsView[str, Any]:
-        return dict([value for value in self._store.values()]).items()
+        return _HandleItemsView(self)  # type: ignore[arg-type]
+
+    def values(self) -> ValuesView[Any]:
+        return _HandleValuesView(self)  # type: ignore[arg-type]
 
     def __repr__(self) -> str:
-        return str(self.items())
+        return f'{self.__class__.__name__}({dict(self.items())!r})'
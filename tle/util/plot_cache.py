@@ -0,0 +1,199 @@
+"""Cache of rendered plots.
+
+Plots are stored as PNG bytes under a key made from the command, its
+normalized arguments and a version of the data it plots, so a repeated request
+for unchanged data is served without rendering. The most recently used plots
+are kept in memory, and once `initialize` is called also on disk, each bounded
+in total size and evicted least recently used first. Plots on disk are kept
+per render version, so a change to the code that draws them is not hidden by
+images rendered before it.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+
+import matplotlib
+
+from tle.util import workers
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_MAX_MEMORY_BYTES = 32 * 1024 * 1024
+_DEFAULT_MAX_DISK_BYTES = 256 * 1024 * 1024
+
+
+def make_key(command: str, *parts: Any) -> str:
+    """Return a cache key for `command` from the `repr` of `parts`, which
+    should hold the normalized arguments and the version of the data."""
+    digest = hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+    return f'{command}-{digest}'
+
+
+def get_render_version(*modules: ModuleType) -> str:
+    """Return a version of the plots rendered by `modules`, which changes with
+    their source and the matplotlib version."""
+    digest = hashlib.sha256(matplotlib.__version__.encode())
+    for module in modules:
+        assert module.__file__ is not None
+        digest.update(Path(module.__file__).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+@dataclass
+class CacheMetrics:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    memory_bytes: int = 0
+    disk_bytes: int = 0
+
+
+class PlotCache:
+    """An LRU cache of PNG bytes in memory, optionally backed by a directory."""
+
+    def __init__(
+        self,
+        directory: Path | None = None,
+        *,
+        max_memory_bytes: int = _DEFAULT_MAX_MEMORY_BYTES,
+        max_disk_bytes: int = _DEFAULT_MAX_DISK_BYTES,
+    ) -> None:
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.metrics = CacheMetrics()
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        # Sizes of the files on disk, least recently used first.
+        self._disk: OrderedDict[str, int] = OrderedDict()
+        if directory is not None:
+            directory.mkdir(parents=True, exist_ok=True)
+            paths = sorted(directory.glob('*.png'), key=os.path.getmtime)
+            for path in paths:
+                self._disk[path.stem] = path.stat().st_size
+            self.metrics.disk_bytes = sum(self._disk.values())
+            self._evict_disk()
+
+    def _path(self, key: str) -> Path:
+        assert self.directory is not None
+        return self.directory / f'{key}.png'
+
+    def get(self, key: str) -> bytes | None:
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            self.metrics.memory_hits += 1
+            return data
+        if key in self._disk:
+            try:
+                data = self._path(key).read_bytes()
+            except OSError:
+                logger.warning(f'Dropping unreadable cached plot {key}')
+                self._forget_disk(key)
+            else:
+                self._disk.move_to_end(key)
+                os.utime(self._path(key))
+                self.metrics.disk_hits += 1
+                self._put_memory(key, data)
+                return data
+        self.metrics.misses += 1
+        return None
+
+    def put(self, key: str, data: bytes) -> None:
+        self._put_memory(key, data)
+        if self.directory is None or key in self._disk:
+            return
+        try:
+            self._path(key).write_bytes(data)
+        except OSError:
+            logger.warning(f'Failed to write cached plot {key}', exc_info=True)
+            return
+        self._disk[key] = len(data)
+        self.metrics.disk_bytes += len(data)
+        self._evict_disk()
+
+    def clear(self) -> None:
+        self._memory.clear()
+        self.metrics.memory_bytes = 0
+        for key in list(self._disk):
+            self._forget_disk(key)
+
+    def _put_memory(self, key: str, data: bytes) -> None:
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self.metrics.memory_bytes -= len(old)
+        if len(data) > self.max_memory_bytes:
+            return
+        self._memory[key] = data
+        self.metrics.memory_bytes += len(data)
+        while self.metrics.memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self.metrics.memory_bytes -= len(evicted)
+
+    def _evict_disk(self) -> None:
+        while self.metrics.disk_bytes > self.max_disk_bytes:
+            self._forget_disk(next(iter(self._disk)))
+
+    def _forget_disk(self, key: str) -> None:
+        self.metrics.disk_bytes -= self._disk.pop(key)
+        self._path(key).unlink(missing_ok=True)
+
+
+_cache = PlotCache()
+
+
+def initialize(
+    directory: Path,
+    *,
+    version: str,
+    max_memory_bytes: int = _DEFAULT_MAX_MEMORY_BYTES,
+    max_disk_bytes: int = _DEFAULT_MAX_DISK_BYTES,
+) -> None:
+    """Replace the memory-only cache with one that also stores plots in a
+    subdirectory of `directory` for `version`, see `get_render_version`.
+
+    Plots of other versions are deleted.
+    """
+    global _cache
+    directory.mkdir(parents=True, exist_ok=True)
+    for path in directory.iterdir():
+        if path.name == version:
+            continue
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            path.unlink(missing_ok=True)
+    _cache = PlotCache(
+        directory / version,
+        max_memory_bytes=max_memory_bytes,
+        max_disk_bytes=max_disk_bytes,
+    )
+
+
+def get_cache() -> PlotCache:
+    return _cache
+
+
+def get(key: str) -> bytes | None:
+    return _cache.get(key)
+
+
+def put(key: str, data: bytes) -> None:
+    _cache.put(key, data)
+
+
+async def render(key: str, func: Callable[..., bytes], *args: Any) -> bytes:
+    """Return the plot cached under `key`, or render it with `func(*args)` in the
+    worker pool and cache it."""
+    data = _cache.get(key)
+    if data is None:
+        data = await workers.run(func, *args)
+        _cache.put(key, data)
+    return data
@@ -1,11 +1,19 @@
+import bisect
+import operator
+from dataclasses import dataclass
 from typing import Any
 
+import numpy as np
 from discord.ext import commands
 
-from tle.util import codeforces_api as cf
-from tle.util.codeforces_api import RanklistRow, make_from_dict
+from tle.util import codeforces_api as cf, workers
 from tle.util.handledict import HandleDict
-from tle.util.ranklist.rating_calculator import CodeforcesRatingCalculator
+from tle.util.ranklist.rating_calculator import (
+    SeedTable,
+    calculate_inserted_rating_changes,
+    calculate_rating_changes_with_seeds,
+    calculate_subset_rating_changes,
+)
 
 
 class RanklistError(commands.CommandError):
@@ -35,7 +43,39 @@ class DeltasNotPresentError(RanklistError):
         )
 
 
+@dataclass
+class StandingsDiff:
+    """Counts of rows matched by lookup key between two fetches of standings."""
+
+    unchanged: int = 0
+    changed: int = 0
+    added: int = 0
+    removed: int = 0
+
+
+def _get_prediction_key(
+    standings: list[tuple[str, float, int, int]],
+) -> dict[str, tuple[int, int]]:
+    """Return the rank and rating of each rated contestant.
+
+    Predicted deltas depend on nothing else, so equal keys mean equal deltas.
+    """
+    scores = sorted((-points, penalty) for _, points, penalty, _ in standings)
+    return {
+        id_: (bisect.bisect_right(scores, (-points, penalty)), rating)
+        for id_, points, penalty, rating in standings
+    }
+
+
 class Ranklist:
+    """Standings of a contest with their rating changes.
+
+    Standings are held column-wise: one lookup key, rank, points and penalty per
+    row, with rows identified by their position. The parsed `RanklistRow`s are
+    kept as they are and a row with an up to date rank is only built when it is
+    asked for.
+    """
+
     def __init__(
         self,
         contest: cf.Contest,
@@ -47,19 +87,136 @@ class Ranklist:
     ) -> None:
         self.contest = contest
         self.problems = problems
-        self.standings = standings
         self.fetch_time = fetch_time
         self.is_rated = is_rated
         self.delta_by_handle: dict[str, int] | None = None
         self.deltas_status: str | None = None
-        self.standing_by_id: HandleDict | None = None
-        self._create_inverse_standings()
+        self.seed_table: SeedTable | None = None
+        self._prediction_key: dict[str, tuple[int, int]] | None = None
+        # Changes whenever the standings do.
+        self.standings_version = 0
+        self._set_rows(standings)
+
+    def _set_rows(
+        self,
+        rows: list[cf.RanklistRow],
+        ranks: np.ndarray | None = None,
+        *,
+        keys: list[str] | None = None,
+    ) -> None:
+        self._rows = rows
+        self.standings_version += 1
+        self.handles = (
+            [self.get_ranklist_lookup_key(row) for row in rows]
+            if keys is None
+            else keys
+        )
+        self.ranks = (
+            np.array([row.rank for row in rows], dtype=np.int64)
+            if ranks is None
+            else ranks
+        )
+        self.points = np.array([row.points for row in rows], dtype=float)
+        self.penalties = np.array([row.penalty for row in rows], dtype=np.int64)
+        self._index = HandleDict(
+            ((id_, i) for i, id_ in enumerate(self.handles)), intern=True
+        )
 
-    def _create_inverse_standings(self) -> None:
-        self.standing_by_id = HandleDict()
-        for row in self.standings:
-            id_ = self.get_ranklist_lookup_key(row)
-            self.standing_by_id[id_] = row
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, handle: str) -> bool:
+        return handle in self._index
+
+    def _find(self, handle: str) -> int:
+        try:
+            return self._index[handle]  # type: ignore[no-any-return]
+        except KeyError:
+            raise HandleNotPresentError(self.contest, handle)
+
+    def _get_row(self, i: int) -> cf.RanklistRow:
+        row = self._rows[i]
+        rank = int(self.ranks[i])
+        return row if row.rank == rank else row._replace(rank=rank)
+
+    @property
+    def standings(self) -> list[cf.RanklistRow]:
+        return [self._get_row(i) for i in range(len(self._rows))]
+
+    def update_standings(
+        self,
+        contest: cf.Contest,
+        problems: list[cf.Problem],
+        standings: list[cf.RanklistRow],
+        fetch_time: float,
+    ) -> StandingsDiff:
+        """Replace the standings with a newer fetch of the same contest.
+
+        Rows are matched by lookup key, and rows equal to the previous fetch are
+        kept as they are. If the new standings start with the previous rows in
+        the same order, the changed rows are replaced in place and new ones
+        appended, otherwise the columns are rebuilt. Deltas are left as they
+        are, see `repredict_async`.
+        """
+        keys = [self.get_ranklist_lookup_key(row) for row in standings]
+        self.contest = contest
+        self.problems = problems
+        self.fetch_time = fetch_time
+        count = len(self._rows)
+        if keys[:count] == self.handles:
+            return self._update_rows_in_place(standings, keys)
+
+        diff = StandingsDiff()
+        matched = set()
+        rows = []
+        for id_, row in zip(keys, standings, strict=True):
+            i = self._index.get(id_)
+            if i is None or i in matched:
+                diff.added += 1
+                rows.append(row)
+                continue
+            matched.add(i)
+            if self._rows[i] == row:
+                diff.unchanged += 1
+                rows.append(self._rows[i])
+            else:
+                diff.changed += 1
+                rows.append(row)
+        diff.removed = count - len(matched)
+        self._set_rows(rows, keys=keys)
+        return diff
+
+    def _update_rows_in_place(
+        self, standings: list[cf.RanklistRow], keys: list[str]
+    ) -> StandingsDiff:
+        """Update the rows for standings that start with the current rows in
+        the same order."""
+        count = len(self._rows)
+        unchanged = np.fromiter(
+            map(operator.eq, self._rows, standings), dtype=bool, count=count
+        )
+        changed = np.flatnonzero(~unchanged).tolist()
+        for i in changed:
+            self._rows[i] = standings[i]
+        if changed:
+            self.ranks[changed] = [standings[i].rank for i in changed]
+            self.points[changed] = [standings[i].points for i in changed]
+            self.penalties[changed] = [standings[i].penalty for i in changed]
+
+        added = standings[count:]
+        if added:
+            self._rows += added
+            self.handles += keys[count:]
+            for i, id_ in enumerate(keys[count:], count):
+                self._index[id_] = i
+            self.ranks = np.append(self.ranks, [row.rank for row in added])
+            self.points = np.append(self.points, [row.points for row in added])
+            self.penalties = np.append(self.penalties, [row.penalty for row in added])
+        if changed or added:
+            self.standings_version += 1
+        return StandingsDiff(
+            unchanged=count - len(changed), changed=len(changed), added=len(added)
+        )
 
     def remove_unofficial_contestants(self) -> None:
         """Remove unofficial contestants from the ranklist.
@@ -72,28 +229,23 @@ class Ranklist:
         if self.delta_by_handle is None:
             raise DeltasNotPresentError(self.contest)
 
-        official_standings = []
-        current_rated_rank = 1
-        last_rated_rank = 0
-        last_rated_score: tuple[float, int] = (-1, -1)
-        for contestant in self.standings:
-            handle = self.get_ranklist_lookup_key(contestant)
-            if handle in self.delta_by_handle:
-                current_score = (contestant.points, contestant.penalty)
-                assert self.standing_by_id is not None
-                standings_row = self.standing_by_id[handle]._asdict()
-                standings_row['rank'] = (
-                    current_rated_rank
-                    if current_score != last_rated_score
-                    else last_rated_rank
-                )
-                official_standings.append(make_from_dict(RanklistRow, standings_row))
-                last_rated_rank = standings_row['rank']
-                last_rated_score = current_score
-                current_rated_rank += 1
-
-        self.standings = official_standings
-        self._create_inverse_standings()
+        delta_by_handle = self.delta_by_handle
+        keep = np.fromiter(
+            (id_ in delta_by_handle for id_ in self.handles),
+            dtype=bool,
+            count=len(self.handles),
+        )
+        points = self.points[keep]
+        penalties = self.penalties[keep]
+
+        # Rows tied with the row above share its rank.
+        new_score = np.ones(len(points), dtype=bool)
+        new_score[1:] = (points[1:] != points[:-1]) | (penalties[1:] != penalties[:-1])
+        positions = np.arange(1, len(points) + 1)
+        ranks = np.maximum.accumulate(np.where(new_score, positions, 0))
+
+        rows = [row for row, kept in zip(self._rows, keep, strict=True) if kept]
+        self._set_rows(rows, ranks)
 
     def set_deltas(self, delta_by_handle: dict[str, int]) -> None:
         if not self.is_rated:
@@ -101,36 +253,274 @@ class Ranklist:
         self.delta_by_handle = delta_by_handle.copy()
         self.deltas_status = 'Final'
 
-    def predict(self, current_rating: dict[str, int]) -> None:
+    def _get_rated_standings(
+        self,
+        current_rating: dict[str, int],
+        scores: list[tuple[str, float, int]] | None = None,
+    ) -> list[tuple[str, float, int, int]]:
         if not self.is_rated:
             raise ContestNotRatedError(self.contest)
-        assert self.standing_by_id is not None
-        standings = [
-            (id_, row.points, row.penalty, current_rating[id_])
-            for id_, row in self.standing_by_id.items()
+        if scores is None:
+            scores = self._get_scores()
+        return [
+            (id_, points, penalty, current_rating[id_])
+            for id_, points, penalty in scores
             if id_ in current_rating
         ]
+
+    def _get_inserted_standings(
+        self, current_rating: dict[str, int], subject_rating: dict[str, int]
+    ) -> tuple[list[tuple[str, float, int, int]], list[tuple[str, float, int, int]]]:
+        if not self.is_rated:
+            raise ContestNotRatedError(self.contest)
+        standings = []
+        subjects = []
+        for id_, points, penalty in self._get_scores():
+            if id_ in subject_rating:
+                subjects.append((id_, points, penalty, subject_rating[id_]))
+            elif id_ in current_rating:
+                standings.append((id_, points, penalty, current_rating[id_]))
+        return standings, subjects
+
+    def _get_scores(self) -> list[tuple[str, float, int]]:
+        """Return the lookup key, points and penalty of each contestant, with
+        the last row winning for repeated keys."""
+        by_id = dict(
+            zip(
+                self.handles,
+                zip(self.points.tolist(), self.penalties.tolist(), strict=True),
+                strict=True,
+            )
+        )
+        return [(id_, points, penalty) for id_, (points, penalty) in by_id.items()]
+
+    @classmethod
+    def _get_row_scores(
+        cls, rows: list[cf.RanklistRow]
+    ) -> list[tuple[str, float, int]]:
+        """Like `_get_scores`, for rows that are not in the ranklist yet."""
+        by_id = {
+            cls.get_ranklist_lookup_key(row): (row.points, row.penalty) for row in rows
+        }
+        return [(id_, points, penalty) for id_, (points, penalty) in by_id.items()]
+
+    def predict(self, current_rating: dict[str, int]) -> None:
+        standings = self._get_rated_standings(current_rating)
         if standings:
-            self.delta_by_handle = CodeforcesRatingCalculator(
+            self.delta_by_handle, self.seed_table = calculate_rating_changes_with_seeds(
                 standings
-            ).calculate_rating_changes()
+            )
         self.deltas_status = 'Predicted'
+        self._prediction_key = _get_prediction_key(standings)
 
-    def get_delta(self, handle: str) -> int | None:
+    async def predict_async(self, current_rating: dict[str, int]) -> None:
+        """Like `predict`, but runs the calculator in the worker pool."""
+        standings = self._get_rated_standings(current_rating)
+        await self._predict_standings_async(standings, _get_prediction_key(standings))
+
+    async def repredict_async(self, current_rating: dict[str, int]) -> bool:
+        """Like `predict_async`, but skip the calculation if no rated contestant's
+        rank or rating moved since the last prediction.
+
+        Returns whether the deltas were recalculated.
+        """
+        standings = self._get_rated_standings(current_rating)
+        key = _get_prediction_key(standings)
+        if self.deltas_status == 'Predicted' and key == self._prediction_key:
+            return False
+        await self._predict_standings_async(standings, key)
+        return True
+
+    async def update_standings_async(
+        self,
+        contest: cf.Contest,
+        problems: list[cf.Problem],
+        standings: list[cf.RanklistRow],
+        fetch_time: float,
+        current_rating: dict[str, int] | None,
+    ) -> tuple[StandingsDiff, bool]:
+        """`update_standings`, followed by `repredict_async` if `current_rating`
+        is given.
+
+        The deltas are calculated from `standings` before anything is replaced,
+        so if the worker pool fails the ranklist is left as it was. Returns the
+        diff and whether the deltas were recalculated.
+        """
+        prediction = None
+        if current_rating is not None:
+            rated = self._get_rated_standings(
+                current_rating, self._get_row_scores(standings)
+            )
+            key = _get_prediction_key(rated)
+            if self.deltas_status != 'Predicted' or key != self._prediction_key:
+                prediction = (await self._calculate_async(rated), key)
+        diff = self.update_standings(contest, problems, standings, fetch_time)
+        if prediction is not None:
+            result, key = prediction
+            self._set_prediction(result, key)
+        return diff, prediction is not None
+
+    async def _predict_standings_async(
+        self,
+        standings: list[tuple[str, float, int, int]],
+        key: dict[str, tuple[int, int]],
+    ) -> None:
+        self._set_prediction(await self._calculate_async(standings), key)
+
+    @staticmethod
+    async def _calculate_async(
+        standings: list[tuple[str, float, int, int]],
+    ) -> tuple[dict[str, int] | None, SeedTable | None]:
+        if not standings:
+            return None, None
+        return await workers.run(calculate_rating_changes_with_seeds, standings)  # type: ignore[no-any-return]
+
+    def _set_prediction(
+        self,
+        result: tuple[dict[str, int] | None, SeedTable | None],
+        key: dict[str, tuple[int, int]],
+    ) -> None:
+        self.delta_by_handle, self.seed_table = result
+        self.deltas_status = 'Predicted'
+        self._prediction_key = key
+
+    @property
+    def predicted_rating(self) -> dict[str, int] | None:
+        """The rating each rated contestant was predicted from, if the deltas
+        were predicted for everyone."""
+        if self._prediction_key is None:
+            return None
+        return {id_: rating for id_, (_, rating) in self._prediction_key.items()}
+
+    def restore_prediction(
+        self,
+        delta_by_handle: dict[str, int],
+        predicted_rating: dict[str, int],
+        correction: int | None = None,
+    ) -> None:
+        """Restore deltas predicted earlier from `predicted_rating`.
+
+        The deltas are taken as they are. The prediction key is rebuilt from the
+        current standings, so `repredict_async` only recalculates if the rated
+        standings moved since. If `correction` is given the seed table for
+        what-if predictions is rebuilt too.
+        """
+        standings = self._get_rated_standings(predicted_rating)
+        self.delta_by_handle = delta_by_handle.copy()
+        self.deltas_status = 'Predicted'
+        self._prediction_key = _get_prediction_key(standings)
+        self.seed_table = None
+        if correction is not None and standings:
+            ratings = [rating for *_, rating in standings]
+            self.seed_table = SeedTable(
+                SeedTable.from_ratings(ratings).seed, correction
+            )
+
+    def _get_subset_ids(self, handles: list[str]) -> list[str]:
+        return [
+            self.handles[self._index[handle]] for handle in handles if handle in self
+        ]
+
+    def predict_subset(
+        self, current_rating: dict[str, int], handles: list[str]
+    ) -> None:
+        """Predict deltas for `handles` only.
+
+        The deltas are exact, but no other contestant gets one, so this is
+        meant for ranklists that are built to be shown for a few handles.
+        """
+        standings = self._get_rated_standings(current_rating)
+        self.delta_by_handle = calculate_subset_rating_changes(
+            standings, self._get_subset_ids(handles)
+        )
+        self.deltas_status = 'Predicted'
+        self._prediction_key = None
+        self.seed_table = None
+
+    async def predict_subset_async(
+        self, current_rating: dict[str, int], handles: list[str]
+    ) -> None:
+        """Like `predict_subset`, but runs the calculator in the worker pool."""
+        standings = self._get_rated_standings(current_rating)
+        self.delta_by_handle = await workers.run(
+            calculate_subset_rating_changes, standings, self._get_subset_ids(handles)
+        )
+        self.deltas_status = 'Predicted'
+        self._prediction_key = None
+        self.seed_table = None
+
+    def predict_inserted(
+        self, current_rating: dict[str, int], subject_rating: dict[str, int]
+    ) -> None:
+        """Predict deltas for each subject as if it alone joined the rated
+        contestants in `current_rating`.
+
+        Intended for virtual participants, who are each rated against the
+        official standings but not against each other.
+        """
+        standings, subjects = self._get_inserted_standings(
+            current_rating, subject_rating
+        )
+        self.delta_by_handle = calculate_inserted_rating_changes(standings, subjects)
+        self.deltas_status = 'Predicted'
+        self._prediction_key = None
+        self.seed_table = None
+
+    async def predict_inserted_async(
+        self, current_rating: dict[str, int], subject_rating: dict[str, int]
+    ) -> None:
+        """Like `predict_inserted`, but runs the calculator in the worker pool."""
+        standings, subjects = self._get_inserted_standings(
+            current_rating, subject_rating
+        )
+        self.delta_by_handle = await workers.run(
+            calculate_inserted_rating_changes, standings, subjects
+        )
+        self.deltas_status = 'Predicted'
+        self._prediction_key = None
+        self.seed_table = None
+
+    def predict_delta_at_rank(
+        self, handle: str, rank: int, rating: int | None = None
+    ) -> int:
+        """Predict the delta of `handle` had they finished at `rank`, with
+        everyone else's result unchanged.
+
+        `rank` is a rank in this ranklist, which can include unofficial
+        contestants. The delta is predicted at the rank among the rated
+        contestants it corresponds to. Rated contestants are predicted at the
+        rating used for the last prediction, anyone else at `rating`.
+        """
         if not self.is_rated:
             raise ContestNotRatedError(self.contest)
-        assert self.standing_by_id is not None
-        if handle not in self.standing_by_id:
+        if self.seed_table is None or self._prediction_key is None:
+            raise DeltasNotPresentError(self.contest)
+        try:
+            # Standings are case insensitive, the prediction key is not.
+            handle = self.handles[self._index[handle]]
+        except KeyError:
+            pass
+        included = handle in self._prediction_key
+        if included:
+            _, rating = self._prediction_key[handle]
+        elif rating is None:
             raise HandleNotPresentError(self.contest, handle)
+        rated_rank = 1 + sum(
+            1
+            for i in np.flatnonzero(self.ranks < rank)
+            if self.handles[i] != handle and self.handles[i] in self._prediction_key
+        )
+        return self.seed_table.predict_delta(rating, rated_rank, included=included)
+
+    def get_delta(self, handle: str) -> int | None:
+        if not self.is_rated:
+            raise ContestNotRatedError(self.contest)
+        i = self._find(handle)
         assert self.delta_by_handle is not None
-        return self.delta_by_handle.get(handle)
+        return self.delta_by_handle.get(self.handles[i])
 
     def get_standing_row(self, handle: str) -> cf.RanklistRow:
-        assert self.standing_by_id is not None
-        try:
-            return self.standing_by_id[handle]  # type: ignore[no-any-return]
-        except KeyError:
-            raise HandleNotPresentError(self.contest, handle)
+        return self._get_row(self._find(handle))
 
     @staticmethod
     def get_ranklist_lookup_key(contestant: cf.RanklistRow) -> str:
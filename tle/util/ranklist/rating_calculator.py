@@ -9,11 +9,73 @@ from dataclasses import dataclass
 import numpy as np
 from numpy.fft import fft, ifft
 
+MAX = 6144
+
+# The ELO win probability for all possible rating differences, indexed modulo
+# 2 * MAX so that negative differences wrap around, and its FFT. Both depend on
+# nothing but MAX, so they are shared by every calculation in the process.
+ELO_WIN_PROB = np.roll(1 / (1 + pow(10, np.arange(-MAX, MAX) / 400)), -MAX)
+ELO_WIN_PROB.flags.writeable = False
+_ELO_WIN_PROB_FFT = fft(ELO_WIN_PROB)
+_ELO_WIN_PROB_FFT.flags.writeable = False
+
 
 def intdiv(x: int, y: int) -> int:
     return -(-x // y) if x < 0 else x // y
 
 
+def _compute_seed(ratings: np.ndarray) -> np.ndarray:
+    """Return the expected rank of a contestant of each possible rating against
+    contestants with `ratings`, excluding ties with oneself."""
+    # Ratings index the histogram modulo 2 * MAX, like ELO_WIN_PROB.
+    count = np.bincount(ratings % (2 * MAX), minlength=2 * MAX).astype(float)
+    return 1 + ifft(fft(count) * _ELO_WIN_PROB_FFT).real
+
+
+class SeedTable:
+    """Seeds against a fixed set of contestants, for what-if predictions.
+
+    `correction` is the total of the zero-sum corrections applied when the
+    deltas of those contestants were calculated. It is reused as is, which is
+    exact for the contestant's current rank and a close approximation for any
+    other, since moving one contestant shifts everyone else by at most one
+    place.
+    """
+
+    def __init__(self, seed: np.ndarray, correction: int = 0) -> None:
+        self.seed = seed
+        self.correction = correction
+
+    @classmethod
+    def from_ratings(cls, ratings: list[int]) -> 'SeedTable':
+        return cls(_compute_seed(np.array(ratings, dtype=np.int64)))
+
+    def get_seed(self, rating: int, my_rating: int | None = None) -> float:
+        """Get the seed at `rating`, excluding a contestant rated `my_rating`
+        who is among the contestants the table was built from."""
+        seed = self.seed[rating]
+        if my_rating is not None:
+            seed -= ELO_WIN_PROB[rating - my_rating]
+        return float(seed)
+
+    def predict_delta(self, rating: int, rank: float, *, included: bool) -> int:
+        """Predict the delta of a contestant rated `rating` finishing at `rank`.
+
+        `included` tells whether the contestant is one of those the table was
+        built from.
+        """
+        my_rating = rating if included else None
+        mid_rank = (rank * self.get_seed(rating, my_rating)) ** 0.5
+        left, right = 1, 8000
+        while right - left > 1:
+            mid = (left + right) // 2
+            if self.get_seed(mid, my_rating) < mid_rank:
+                right = mid
+            else:
+                left = mid
+        return intdiv(left - rating, 2) + self.correction
+
+
 @dataclass
 class Contestant:
     party: str
@@ -34,6 +96,7 @@ class CodeforcesRatingCalculator:
             Contestant(handle, points, penalty, rating)
             for handle, points, penalty, rating in standings
         ]
+        self.correction = 0
         self._precalc_seed()
         self._reassign_ranks()
         self._process()
@@ -50,19 +113,14 @@ class CodeforcesRatingCalculator:
             seed -= self.elo_win_prob[rating - me.rating]
         return float(seed)
 
-    def _precalc_seed(self) -> None:
-        MAX = 6144
-
-        # Precompute the ELO win probability for all possible rating differences.
-        self.elo_win_prob = np.roll(1 / (1 + pow(10, np.arange(-MAX, MAX) / 400)), -MAX)
-
-        # Compute the rating histogram.
-        count = np.zeros(2 * MAX)
-        for a in self.contestants:
-            count[a.rating] += 1
+    def get_seed_table(self) -> SeedTable:
+        return SeedTable(self.seed, self.correction)
 
-        # Precompute the seed for all possible ratings using FFT.
-        self.seed = 1 + ifft(fft(count) * fft(self.elo_win_prob)).real
+    def _precalc_seed(self) -> None:
+        self.elo_win_prob = ELO_WIN_PROB
+        self.seed = _compute_seed(
+            np.array([a.rating for a in self.contestants], dtype=np.int64)
+        )
 
     def _reassign_ranks(self) -> None:
         """Find the rank of each contestant."""
@@ -109,6 +167,180 @@ class CodeforcesRatingCalculator:
 
         zero_sum_count = min(4 * round(n**0.5), n)
         delta_sum = -sum(contestants[i].delta for i in range(zero_sum_count))
-        correction = min(0, max(-10, intdiv(delta_sum, zero_sum_count)))
+        top_correction = min(0, max(-10, intdiv(delta_sum, zero_sum_count)))
         for contestant in contestants:
-            contestant.delta += correction
+            contestant.delta += top_correction
+        self.correction = correction + top_correction
+
+
+def calculate_rating_changes(
+    standings: list[tuple[str, float, int, int]],
+) -> dict[str, int]:
+    """Return a mapping between contestants in `standings` and their delta."""
+    return CodeforcesRatingCalculator(standings).calculate_rating_changes()
+
+
+def calculate_rating_changes_with_seeds(
+    standings: list[tuple[str, float, int, int]],
+) -> tuple[dict[str, int], SeedTable]:
+    """Like `calculate_rating_changes`, but also return the seed table."""
+    calculator = CodeforcesRatingCalculator(standings)
+    return calculator.calculate_rating_changes(), calculator.get_seed_table()
+
+
+def _vector_intdiv(x: np.ndarray, y: int) -> np.ndarray:
+    return np.where(x < 0, -(-x // y), x // y)
+
+
+def _get_ranks(points: np.ndarray, penalties: np.ndarray) -> np.ndarray:
+    """Return the rank of each contestant, which is the number of contestants
+    with a score at least as good, including ties."""
+    n = len(points)
+    ranks = np.zeros(n, dtype=np.int64)
+    if n:
+        order = np.lexsort((penalties, -points))
+        sorted_points, sorted_penalties = points[order], penalties[order]
+        group_end = np.ones(n, dtype=bool)
+        group_end[:-1] = (sorted_points[1:] != sorted_points[:-1]) | (
+            sorted_penalties[1:] != sorted_penalties[:-1]
+        )
+        ends = np.flatnonzero(group_end)
+        ranks[order] = ends[np.searchsorted(ends, np.arange(n))] + 1
+    return ranks
+
+
+def calculate_subset_rating_changes(
+    standings: list[tuple[str, float, int, int]], handles: list[str]
+) -> dict[str, int]:
+    """Return the deltas of the contestants in `standings` named in `handles`.
+
+    The result matches `calculate_rating_changes` for those contestants. The
+    first correction depends on the sum of everyone's uncorrected delta, so
+    the binary search still covers the whole standings, but it runs once per
+    distinct (rank, rating) pair and is vectorized. The second correction only
+    needs the top rated sample. Deltas are only built for `handles`.
+    """
+    wanted = set(handles)
+    if not standings or not wanted:
+        return {}
+
+    n = len(standings)
+    points = np.array([row[1] for row in standings], dtype=float)
+    penalties = np.array([row[2] for row in standings], dtype=np.int64)
+    ratings = np.array([row[3] for row in standings], dtype=np.int64)
+    seed = _compute_seed(ratings)
+    ranks = _get_ranks(points, penalties)
+
+    # Contestants with the same rank and rating get the same delta.
+    pairs, inverse = np.unique(np.stack((ranks, ratings)), axis=1, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    pair_ranks, pair_ratings = pairs
+
+    def get_seeds(at: np.ndarray) -> np.ndarray:
+        # Same as `get_seed` with `me` rated `pair_ratings`.
+        return seed[at] - ELO_WIN_PROB[at - pair_ratings]
+
+    mid_ranks = np.sqrt(pair_ranks * get_seeds(pair_ratings))
+    left = np.ones(len(pair_ratings), dtype=np.int64)
+    right = np.full(len(pair_ratings), 8000, dtype=np.int64)
+    active = right - left > 1
+    while active.any():
+        mid = (left + right) // 2
+        below = get_seeds(mid) < mid_ranks
+        right = np.where(active & below, mid, right)
+        left = np.where(active & ~below, mid, left)
+        active = right - left > 1
+
+    deltas = _vector_intdiv(left - pair_ratings, 2)[inverse]
+    correction = intdiv(-int(deltas.sum()), n) - 1
+
+    zero_sum_count = min(4 * round(n**0.5), n)
+    top = np.lexsort((penalties, -points, -ratings))[:zero_sum_count]
+    delta_sum = -int((deltas[top] + correction).sum())
+    correction += min(0, max(-10, intdiv(delta_sum, zero_sum_count)))
+
+    return {
+        row[0]: int(delta) + correction
+        for row, delta in zip(standings, deltas, strict=True)
+        if row[0] in wanted
+    }
+
+
+def calculate_inserted_rating_changes(
+    standings: list[tuple[str, float, int, int]],
+    subjects: list[tuple[str, float, int, int]],
+) -> dict[str, int]:
+    """Return the delta of each subject as if it alone were added to `standings`.
+
+    This matches running `CodeforcesRatingCalculator` once per subject on
+    `standings` plus that subject, but all subjects share one seed table. The
+    subject's contribution to everyone else's seed is added analytically, the
+    same way `get_seed` removes `me`, and the binary searches are vectorized
+    over the whole standings.
+    """
+    if not subjects:
+        return {}
+
+    elo_win_prob = ELO_WIN_PROB
+
+    n = len(standings)
+    points = np.array([row[1] for row in standings], dtype=float)
+    penalties = np.array([row[2] for row in standings], dtype=np.int64)
+    ratings = np.array([row[3] for row in standings], dtype=np.int64)
+
+    seed = _compute_seed(ratings)
+
+    ranks = _get_ranks(points, penalties)
+    by_rating = np.lexsort((penalties, -points, -ratings))
+
+    zero_sum_count = min(4 * round((n + 1) ** 0.5), n + 1)
+
+    def get_seeds(at: np.ndarray, all_ratings: np.ndarray) -> np.ndarray:
+        # The subject is stored last. Its contribution is added to every seed
+        # and each contestant's own contribution removed, which cancels out for
+        # the subject itself.
+        return (
+            seed[at]
+            + elo_win_prob[at - all_ratings[-1]]
+            - elo_win_prob[at - all_ratings]
+        )
+
+    delta_by_subject = {}
+    for handle, sub_points, sub_penalty, sub_rating in subjects:
+        beats_or_ties_subject = (points > sub_points) | (
+            (points == sub_points) & (penalties <= sub_penalty)
+        )
+        subject_beats_or_ties = (points < sub_points) | (
+            (points == sub_points) & (penalties >= sub_penalty)
+        )
+        all_ratings = np.append(ratings, sub_rating)
+        all_ranks = np.append(
+            ranks + subject_beats_or_ties, 1 + np.count_nonzero(beats_or_ties_subject)
+        )
+
+        mid_ranks = np.sqrt(all_ranks * get_seeds(all_ratings, all_ratings))
+        left = np.ones(n + 1, dtype=np.int64)
+        right = np.full(n + 1, 8000, dtype=np.int64)
+        active = right - left > 1
+        while active.any():
+            mid = (left + right) // 2
+            below = get_seeds(mid, all_ratings) < mid_ranks
+            right = np.where(active & below, mid, right)
+            left = np.where(active & ~below, mid, left)
+            active = right - left > 1
+
+        deltas = _vector_intdiv(left - all_ratings, 2)
+        deltas += intdiv(-int(deltas.sum()), n + 1) - 1
+
+        subject_pos = np.count_nonzero(
+            (ratings > sub_rating) | ((ratings == sub_rating) & beats_or_ties_subject)
+        )
+        if subject_pos < zero_sum_count:
+            top = np.append(by_rating[: zero_sum_count - 1], n)
+        else:
+            top = by_rating[:zero_sum_count]
+        delta_sum = -int(deltas[top].sum())
+        correction = min(0, max(-10, intdiv(delta_sum, zero_sum_count)))
+        delta_by_subject[handle] = int(deltas[n]) + correction
+
+    return delta_by_subject
@@ -0,0 +1,153 @@
+"""Replay contests stored in the cache database through the rating calculator.
+
+Every contest in the `rating_change` table is rebuilt from its rated
+contestants' old ratings and ranks, the deltas are predicted and compared with
+the deltas Codeforces actually gave. This measures both how accurate and how
+fast the calculator is on real contests.
+
+Usage:
+    python -m tle.util.ranklist.replay data/db/cache.db --output report.json
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+from tle.util import codeforces_api as cf
+from tle.util.db.cache_db_conn import CacheDbConn
+from tle.util.ranklist.rating_calculator import calculate_rating_changes
+
+
+@dataclass
+class ContestReplay:
+    contest_id: int
+    contest_name: str | None
+    contestants: int
+    # Contestants with no previous rating are excluded from the errors, since
+    # their displayed deltas include Codeforces' starting bonus.
+    compared: int
+    mean_abs_error: float
+    max_abs_error: int
+    exact: int
+    runtime: float
+
+
+def replay_contest(changes: list[cf.RatingChange]) -> ContestReplay:
+    """Predict the deltas of one contest and compare them with `changes`.
+
+    The calculator only looks at the order of scores, so a contestant's rank
+    is used as their score. Unrated contestants are predicted at
+    `cf.DEFAULT_RATING`, as the live ranklist does.
+    """
+    standings = [
+        (change.handle, -change.rank, 0, change.oldRating or cf.DEFAULT_RATING)
+        for change in changes
+    ]
+    start = time.perf_counter()
+    predicted = calculate_rating_changes(standings) if standings else {}
+    runtime = time.perf_counter() - start
+
+    errors = np.array(
+        [
+            predicted[change.handle] - (change.newRating - change.oldRating)
+            for change in changes
+            if change.oldRating
+        ],
+        dtype=np.int64,
+    )
+    abs_errors = np.abs(errors)
+    return ContestReplay(
+        contest_id=changes[0].contestId if changes else 0,
+        contest_name=changes[0].contestName if changes else None,
+        contestants=len(changes),
+        compared=len(errors),
+        mean_abs_error=float(abs_errors.mean()) if len(errors) else 0.0,
+        max_abs_error=int(abs_errors.max()) if len(errors) else 0,
+        exact=int(np.count_nonzero(errors == 0)),
+        runtime=runtime,
+    )
+
+
+def summarize(replays: list[ContestReplay]) -> dict[str, float | int]:
+    compared = sum(replay.compared for replay in replays)
+    return {
+        'contests': len(replays),
+        'contestants': sum(replay.contestants for replay in replays),
+        'compared': compared,
+        'mean_abs_error': (
+            sum(replay.mean_abs_error * replay.compared for replay in replays)
+            / compared
+            if compared
+            else 0.0
+        ),
+        'max_abs_error': max((replay.max_abs_error for replay in replays), default=0),
+        'exact': sum(replay.exact for replay in replays),
+        'runtime': sum(replay.runtime for replay in replays),
+    }
+
+
+async def replay(
+    conn: CacheDbConn, contest_ids: list[int] | None = None
+) -> list[ContestReplay]:
+    """Replay the given contests, or every contest with stored rating changes."""
+    if contest_ids is None:
+        contest_ids = await conn.get_contest_ids_with_rating_changes()
+    replays = []
+    for contest_id in contest_ids:
+        changes = await conn.get_rating_changes_for_contest(contest_id)
+        if changes:
+            replays.append(replay_contest(changes))
+    return replays
+
+
+async def _main(args: argparse.Namespace) -> None:
+    conn = CacheDbConn(args.db)
+    await conn.connect()
+    try:
+        replays = await replay(conn, args.contest or None)
+    finally:
+        await conn.close()
+
+    summary = summarize(replays)
+    report = {
+        'summary': summary,
+        'contests': [asdict(contest_replay) for contest_replay in replays],
+    }
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(
+            f'Replayed {summary["contests"]} contests with '
+            f'{summary["contestants"]} contestants in {summary["runtime"]:.2f}s, '
+            f'mean abs error {summary["mean_abs_error"]:.3f}, '
+            f'max abs error {summary["max_abs_error"]}'
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Replay stored contests through the rating calculator.'
+    )
+    parser.add_argument('db', help='path to the cache database')
+    parser.add_argument(
+        '--contest',
+        type=int,
+        action='append',
+        help='contest id to replay, may be repeated (default: all)',
+    )
+    parser.add_argument(
+        '--output', default='-', help='file for the JSON report (default: stdout)'
+    )
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
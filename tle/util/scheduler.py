@@ -0,0 +1,189 @@
+"""Adaptive refresh intervals for the periodic tasks of the caches.
+
+A `RefreshSchedule` starts from a base delay that its owner sets from what it
+knows, such as the phase of a contest, and adjusts it:
+
+- Keys nobody asked about for a while refresh less often, keys in demand more
+  often, for schedules created with `demand_aware`.
+- Everything refreshes less often while the Codeforces API is busy.
+- Errors back off exponentially until the next success.
+
+The result is clamped to the schedule's bounds. A schedule can track several
+keys, for example one per contest, sharing one task that only refreshes the
+keys that are due. Every schedule is registered by name so that the chosen
+intervals can be inspected.
+"""
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import Hashable
+from dataclasses import dataclass
+
+from tle.util import codeforces_api as cf
+
+# Demand is counted over this many seconds.
+_DEMAND_WINDOW = 10 * 60
+# Keys with at least this much demand refresh at `_BUSY_FACTOR` times the base
+# delay, keys with none at `_IDLE_FACTOR` times.
+_BUSY_DEMAND = 5
+_BUSY_FACTOR = 0.5
+_IDLE_FACTOR = 2.0
+# Delays are doubled while more than this fraction of the API budget is used.
+_BUSY_API_LOAD = 0.5
+# Floor for the wait between runs of a task tracking several keys, in case a run
+# leaves a due key alone.
+_MIN_WAIT = 10
+
+_schedules: dict[str, 'RefreshSchedule'] = {}
+
+
+@dataclass
+class KeyMetrics:
+    base_delay: float
+    delay: float
+    demand: int = 0
+    errors: int = 0
+    last_refresh: float | None = None
+
+
+class RefreshSchedule:
+    """Refresh intervals for one task, optionally per key."""
+
+    def __init__(
+        self,
+        name: str,
+        base_delay: float,
+        *,
+        min_delay: float | None = None,
+        max_delay: float | None = None,
+        demand_aware: bool = False,
+        load_aware: bool = True,
+    ) -> None:
+        """Initialize the schedule and register it under `name`.
+
+        `min_delay` and `max_delay` default to a quarter and eight times the
+        base delay. The base delay of the `None` key is used whenever no key
+        is tracked.
+        """
+        self.name = name
+        self.min_delay = min_delay if min_delay is not None else base_delay / 4
+        self.max_delay = max_delay if max_delay is not None else base_delay * 8
+        self.demand_aware = demand_aware
+        self.load_aware = load_aware
+        self._base_delay: dict[Hashable, float] = {None: base_delay}
+        self._demand: dict[Hashable, deque[float]] = {}
+        self._errors: dict[Hashable, int] = {}
+        self._last_refresh: dict[Hashable, float] = {}
+        self._delay: dict[Hashable, float] = {}
+        _schedules[name] = self
+
+    @property
+    def keys(self) -> list[Hashable]:
+        """The keys tracked besides `None`."""
+        return [key for key in self._base_delay if key is not None]
+
+    def set_base_delay(self, delay: float, key: Hashable = None) -> None:
+        """Set the delay `key` would refresh at if nothing else mattered, and
+        start tracking it."""
+        self._base_delay[key] = delay
+
+    def forget(self, key: Hashable) -> None:
+        """Stop tracking `key`."""
+        assert key is not None
+        for state in (
+            self._base_delay,
+            self._demand,
+            self._errors,
+            self._last_refresh,
+            self._delay,
+        ):
+            state.pop(key, None)
+
+    def record_demand(self, key: Hashable = None) -> None:
+        """Record that a user asked for the data of `key`."""
+        self._demand.setdefault(key, deque()).append(time.time())
+
+    def record_success(self, key: Hashable = None) -> None:
+        self._errors.pop(key, None)
+        self._last_refresh[key] = time.time()
+
+    def record_error(self, key: Hashable = None) -> None:
+        self._errors[key] = self._errors.get(key, 0) + 1
+        self._last_refresh[key] = time.time()
+
+    def get_demand(self, key: Hashable = None) -> int:
+        demand = self._demand.get(key)
+        if demand is None:
+            return 0
+        cutoff = time.time() - _DEMAND_WINDOW
+        while demand and demand[0] < cutoff:
+            demand.popleft()
+        return len(demand)
+
+    def get_delay(self, key: Hashable = None) -> float:
+        """Return the delay between refreshes of `key`."""
+        base_delay = self._base_delay.get(key, self._base_delay[None])
+        delay = base_delay
+        if self.demand_aware:
+            demand = self.get_demand(key)
+            if demand >= _BUSY_DEMAND:
+                delay *= _BUSY_FACTOR
+            elif demand == 0:
+                delay *= _IDLE_FACTOR
+        if self.load_aware and cf.get_api_load() > _BUSY_API_LOAD:
+            delay *= 2
+        delay = min(max(delay, self.min_delay), self.max_delay)
+
+        errors = self._errors.get(key, 0)
+        if errors:
+            # The first retry comes after the base delay, regardless of demand
+            # and load.
+            delay = min(base_delay * 2 ** (errors - 1), max(self.max_delay, base_delay))
+
+        self._delay[key] = delay
+        return delay
+
+    def get_time_left(self, key: Hashable = None, now: float | None = None) -> float:
+        """Return how long until `key` is due, zero if it is due already."""
+        last_refresh = self._last_refresh.get(key)
+        if last_refresh is None:
+            return 0.0
+        now = time.time() if now is None else now
+        return max(last_refresh + self.get_delay(key) - now, 0.0)
+
+    def is_due(self, key: Hashable = None, now: float | None = None) -> bool:
+        return self.get_time_left(key, now) == 0
+
+    def get_wait(self) -> float:
+        """Return how long to wait until the next key is due, or the delay of
+        the `None` key if no key is tracked."""
+        keys = self.keys
+        if not keys:
+            return self.get_delay()
+        now = time.time()
+        return max(min(self.get_time_left(key, now) for key in keys), _MIN_WAIT)
+
+    async def wait(self) -> float:
+        """Sleep until the next refresh is due and return the time waited."""
+        delay = self.get_wait()
+        await asyncio.sleep(delay)
+        return delay
+
+    def get_metrics(self) -> dict[Hashable, KeyMetrics]:
+        """Return the last chosen delay and what it depended on, per key."""
+        keys = self.keys or [None]
+        return {
+            key: KeyMetrics(
+                base_delay=self._base_delay.get(key, self._base_delay[None]),
+                delay=self._delay.get(key, self.get_delay(key)),
+                demand=self.get_demand(key),
+                errors=self._errors.get(key, 0),
+                last_refresh=self._last_refresh.get(key),
+            )
+            for key in keys
+        }
+
+
+def get_schedules() -> list[RefreshSchedule]:
+    return list(_schedules.values())
@@ -0,0 +1,213 @@
+"""Worker pool for running CPU-heavy jobs off the event loop.
+
+Jobs are plain functions and arguments which must be picklable, since they run
+in separate processes. Until `initialize` is called jobs run inline on the event
+loop, which keeps tests and scripts free of subprocesses.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import multiprocessing
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from discord.ext import commands
+
+logger = logging.getLogger(__name__)
+
+# Every worker imports the plotting libraries, so a few are enough.
+_DEFAULT_MAX_WORKERS = 2
+_DEFAULT_MAX_PENDING = 32
+_DEFAULT_TIMEOUT = 60
+
+
+class WorkerPoolError(commands.CommandError):
+    pass
+
+
+class WorkerPoolBusy(WorkerPoolError):
+    def __init__(self) -> None:
+        super().__init__('The bot is busy right now, please try again in a while')
+
+
+class JobTimedOut(WorkerPoolError):
+    def __init__(self, name: str, timeout: float) -> None:
+        super().__init__(f'Job `{name}` did not finish within {timeout} seconds')
+        self.name = name
+        self.timeout = timeout
+
+
+@dataclass
+class PoolMetrics:
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    timed_out: int = 0
+    rejected: int = 0
+    pending: int = 0
+    total_runtime: float = 0.0
+    max_runtime: float = 0.0
+
+    @property
+    def mean_runtime(self) -> float:
+        finished = self.completed + self.failed
+        return self.total_runtime / finished if finished else 0.0
+
+
+class WorkerPool:
+    """A process pool with a bounded queue, per-job timeouts and metrics."""
+
+    def __init__(
+        self,
+        *,
+        max_workers: int = _DEFAULT_MAX_WORKERS,
+        max_pending: int = _DEFAULT_MAX_PENDING,
+        default_timeout: float = _DEFAULT_TIMEOUT,
+        inline: bool = False,
+        initializer: Callable[[], None] | None = None,
+    ) -> None:
+        """Initialize the pool.
+
+        `max_pending` bounds the number of jobs queued or running at once, jobs
+        submitted beyond that are rejected. A job that timed out still counts
+        until its worker is done with it. `inline` runs every job directly on
+        the event loop instead of in a worker process.
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.default_timeout = default_timeout
+        self.inline = inline
+        self.initializer = initializer
+        self.metrics = PoolMetrics()
+        self._executor: concurrent.futures.ProcessPoolExecutor | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def start(self) -> None:
+        if self.inline or self._executor is not None:
+            return
+        # Forking a process with a running event loop and database threads is
+        # not safe, so workers are always spawned fresh.
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=self.initializer,
+        )
+        logger.info(f'Worker pool started with {self._executor._max_workers} workers')
+
+    async def run(
+        self, func: Callable[..., Any], *args: Any, timeout: float | None = None
+    ) -> Any:
+        """Run `func(*args)` in a worker and return its result."""
+        if self.metrics.pending >= self.max_pending:
+            self.metrics.rejected += 1
+            raise WorkerPoolBusy()
+
+        timeout = self.default_timeout if timeout is None else timeout
+        self.metrics.submitted += 1
+        self.metrics.pending += 1
+        start = time.perf_counter()
+        if self._executor is None:
+            try:
+                result = func(*args)
+            except Exception:
+                self._record(start, failed=True)
+                raise
+            finally:
+                self.metrics.pending -= 1
+            self._record(start, failed=False)
+            return result
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self.metrics.pending -= 1
+            self._record(start, failed=True)
+            raise
+        future.add_done_callback(lambda _: self._release(loop))
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            # A job that already started cannot be interrupted, it will run to
+            # completion and its result is discarded. One still queued is
+            # cancelled.
+            self.metrics.timed_out += 1
+            raise JobTimedOut(func.__name__, timeout)
+        except Exception:
+            self._record(start, failed=True)
+            raise
+        self._record(start, failed=False)
+        return result
+
+    def _release(self, loop: asyncio.AbstractEventLoop) -> None:
+        # Called from the thread of the executor once the job is done.
+        try:
+            loop.call_soon_threadsafe(self._decrement_pending)
+        except RuntimeError:
+            # The loop is closed, nothing is counting anymore.
+            pass
+
+    def _decrement_pending(self) -> None:
+        self.metrics.pending -= 1
+
+    def _record(self, start: float, *, failed: bool) -> None:
+        runtime = time.perf_counter() - start
+        if failed:
+            self.metrics.failed += 1
+        else:
+            self.metrics.completed += 1
+        self.metrics.total_runtime += runtime
+        self.metrics.max_runtime = max(self.metrics.max_runtime, runtime)
+
+    async def shutdown(self) -> None:
+        if self._executor is None:
+            return
+        executor, self._executor = self._executor, None
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: executor.shutdown(wait=True, cancel_futures=True)
+        )
+        logger.info('Worker pool shut down')
+
+
+_pool = WorkerPool(inline=True)
+
+
+def initialize(
+    *,
+    max_workers: int = _DEFAULT_MAX_WORKERS,
+    max_pending: int = _DEFAULT_MAX_PENDING,
+    default_timeout: float = _DEFAULT_TIMEOUT,
+    initializer: Callable[[], None] | None = None,
+) -> None:
+    """Replace the inline pool with one backed by worker processes."""
+    global _pool
+    _pool = WorkerPool(
+        max_workers=max_workers,
+        max_pending=max_pending,
+        default_timeout=default_timeout,
+        initializer=initializer,
+    )
+    _pool.start()
+
+
+async def run(
+    func: Callable[..., Any], *args: Any, timeout: float | None = None
+) -> Any:
+    """Run `func(*args)` in the current pool and return its result."""
+    return await _pool.run(func, *args, timeout=timeout)
+
+
+def get_pool() -> WorkerPool:
+    return _pool
+
+
+async def shutdown() -> None:
+    global _pool
+    await _pool.shutdown()
+    _pool = WorkerPool(inline=True)